@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Benchmark how long it takes to import and configure Warehouse from cold.
+
+    python -m tests.benchmarks.boot --runs 5 --budget 5.0
+
+Boots Warehouse in a fresh interpreter several times, both with every subsystem
+and with every optional subsystem disabled, exiting with an error if the median
+time for a full boot exceeds the budget. See ``warehouse profile-boot`` for
+where that time goes.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from warehouse.cli.boot import BOOT
+from warehouse.config import OPTIONAL_SUBSYSTEMS
+
+
+def _boot(disabled_subsystems: list[str]) -> float:
+    env = dict(os.environ)
+    if disabled_subsystems:
+        env["WAREHOUSE_DISABLED_SUBSYSTEMS"] = ",".join(disabled_subsystems)
+    result = subprocess.run(
+        [sys.executable, "-c", BOOT],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=5.0, help="seconds")
+    args = parser.parse_args(argv)
+
+    results = {
+        "full": [_boot([]) for _ in range(args.runs)],
+        "minimal": [_boot(list(OPTIONAL_SUBSYSTEMS)) for _ in range(args.runs)],
+    }
+
+    for name, timings in results.items():
+        print(
+            f"{name + ':':9}median={statistics.median(timings):.3f}s "
+            f"min={min(timings):.3f}s max={max(timings):.3f}s"
+        )
+
+    if statistics.median(results["full"]) > args.budget:
+        print(f"median boot time exceeds the {args.budget}s budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
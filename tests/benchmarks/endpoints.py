@@ -0,0 +1,483 @@
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Benchmark our hottest endpoints end to end, against a seeded synthetic database.
+
+    python -m tests.benchmarks.endpoints --scale 100k --baseline endpoints.json
+
+Creates (and migrates, and seeds) a database of the given scale alongside the
+one in DATABASE_URL the first time it's run, reusing it afterwards. Each scale
+also has one project with 10k files. Every endpoint is requested in process,
+through the whole WSGI stack, and reported with its p50/p99 latency, the queries
+it made, and the peak RSS of this process afterwards.
+
+With --save-baseline the results are written to the baseline, otherwise they're
+compared against it, exiting with an error if any endpoint has regressed by more
+than the tolerance. Baselines are only comparable on the machine, and at the
+scale, they were recorded with. Search needs OpenSearch running with an index
+built from the seeded database (``warehouse search reindex``).
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import resource
+import secrets
+import statistics
+import sys
+import tarfile
+import time
+import xmlrpc.client
+import zipfile
+
+import alembic.command
+import sqlalchemy
+import webtest
+
+from sqlalchemy import orm
+
+from warehouse.accounts.services import DatabaseUserService
+from warehouse.config import configure
+from warehouse.macaroons import caveats
+from warehouse.macaroons.services import DatabaseMacaroonService
+from warehouse.metrics import NullMetrics
+from warehouse.utils import readme
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Every project has a single release, with an sdist and a wheel, except for one
+# which has 1k releases of 10 files each.
+WIDE_RELEASES = 1_000
+WIDE_FILES = 10
+
+UPLOAD_SIZES = {"10k": 10 * 1024, "1m": 1024 * 1024, "10m": 10 * 1024 * 1024}
+UPLOAD_PROJECT = "benchupload"
+
+UPLOADER = "bench-uploader"
+LOGIN_USER = "bench-login"
+PASSWORD = "benchmark password"
+REMOTE_ADDR = "127.0.0.1"
+
+# Make sure that nothing we're benchmarking is rate limited.
+RATELIMITS = [
+    "warehouse.account.user_login_ratelimit_string",
+    "warehouse.account.ip_login_ratelimit_string",
+    "warehouse.account.global_login_ratelimit_string",
+    "warehouse.packaging.project_create_user_ratelimit_string",
+    "warehouse.packaging.project_create_ip_ratelimit_string",
+    "warehouse.search.ratelimit_string",
+    "warehouse.xmlrpc.client.ratelimit_string",
+]
+
+SERVER_TIMING_RE = re.compile(r'\bdb;[^,]*desc="(\d+) quer')
+
+SEED = [
+    """
+    INSERT INTO projects (id, name, normalized_name, created)
+    SELECT md5(:prefix || '-' || p)::uuid, :prefix || '-' || p, :prefix || '-' || p,
+           now()
+    FROM generate_series(1, :projects) AS p
+    """,
+    """
+    INSERT INTO release_descriptions (id, raw, html, rendered_by)
+    SELECT md5(:prefix || '-' || p || '-' || r || '-description')::uuid,
+           'A synthetic project.', '<p>A synthetic project.</p>', :rendered_by
+    FROM generate_series(1, :projects) AS p, generate_series(1, :releases) AS r
+    """,
+    """
+    INSERT INTO releases (
+        id, project_id, version, canonical_version, _pypi_ordering, description_id,
+        summary, created
+    )
+    SELECT md5(:prefix || '-' || p || '-' || r)::uuid, md5(:prefix || '-' || p)::uuid,
+           r::text, r::text, r,
+           md5(:prefix || '-' || p || '-' || r || '-description')::uuid,
+           'A synthetic project.', now()
+    FROM generate_series(1, :projects) AS p, generate_series(1, :releases) AS r
+    """,
+    """
+    INSERT INTO release_files (
+        release_id, python_version, packagetype, filename, path, size, md5_digest,
+        sha256_digest, blake2_256_digest, upload_time
+    )
+    SELECT release_id, python_version, packagetype::package_type, filename,
+           substr(blake2, 1, 2) || '/' || substr(blake2, 3, 2) || '/'
+               || substr(blake2, 5) || '/' || filename,
+           10240, md5(filename), encode(sha256(convert_to(filename, 'UTF8')), 'hex'),
+           blake2, now()
+    FROM (
+        SELECT md5(:prefix || '-' || p || '-' || r)::uuid AS release_id,
+               CASE WHEN f = 1 THEN 'source' ELSE 'py3' END AS python_version,
+               CASE WHEN f = 1 THEN 'sdist' ELSE 'bdist_wheel' END AS packagetype,
+               replace(:prefix, '-', '_') || '_' || p || '-' || r
+                   || CASE WHEN f = 1 THEN '.tar.gz'
+                           ELSE '-' || f || '-py3-none-any.whl'
+                      END AS filename,
+               encode(
+                   sha256(convert_to(:prefix || '-' || p || '-' || r || '-' || f,
+                                     'UTF8')),
+                   'hex'
+               ) AS blake2
+        FROM generate_series(1, :projects) AS p,
+             generate_series(1, :releases) AS r,
+             generate_series(1, :files) AS f
+    ) AS files
+    """,
+    """
+    INSERT INTO journals (name, version, action, submitted_date)
+    SELECT :prefix || '-' || p, r::text, 'new release', now()
+    FROM generate_series(1, :projects) AS p, generate_series(1, :releases) AS r
+    ORDER BY p, r
+    """,
+]
+
+
+def _create_database(url):
+    engine = sqlalchemy.create_engine(
+        url.set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    with engine.connect() as connection:
+        exists = connection.scalar(
+            sqlalchemy.text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            {"name": url.database},
+        )
+        if not exists:
+            connection.execute(sqlalchemy.text(f'CREATE DATABASE "{url.database}"'))
+    engine.dispose()
+
+
+def _seed(engine, projects: int):
+    with orm.Session(engine) as session, session.begin():
+        connection = session.connection()
+        seeded = connection.scalar(
+            sqlalchemy.text("SELECT count(*) FROM projects WHERE name LIKE 'bench-%'")
+        )
+        if seeded == projects + 1:
+            return
+        if seeded:
+            raise RuntimeError(
+                f"{engine.url.database} was seeded with {seeded} projects, not "
+                f"{projects + 1}"
+            )
+
+        print(f"seeding {projects} projects...", file=sys.stderr)
+        for prefix, count, releases, files in [
+            ("bench", projects, 1, 2),
+            ("bench-wide", 1, WIDE_RELEASES, WIDE_FILES),
+        ]:
+            for statement in SEED:
+                connection.execute(
+                    sqlalchemy.text(statement),
+                    {
+                        "prefix": prefix,
+                        "projects": count,
+                        "releases": releases,
+                        "files": files,
+                        "rendered_by": readme.renderer_version(),
+                    },
+                )
+
+        users = DatabaseUserService(
+            session, metrics=NullMetrics(), remote_addr=REMOTE_ADDR
+        )
+        for username in [UPLOADER, LOGIN_USER]:
+            user = users.create_user(username, username, PASSWORD)
+            users.add_email(
+                user.id,
+                f"{username}@example.com",
+                primary=True,
+                verified=True,
+                ratelimit=False,
+            )
+            # Uploading requires two factor authentication to be enabled, even
+            # though the token we upload with means it's never used.
+            if username == UPLOADER:
+                user.totp_secret = os.urandom(20)
+
+
+def _upload_token(engine) -> str:
+    with orm.Session(engine) as session, session.begin():
+        user_id = DatabaseUserService(
+            session, metrics=NullMetrics(), remote_addr=REMOTE_ADDR
+        ).find_userid(UPLOADER)
+        serialized, _ = DatabaseMacaroonService(session).create_macaroon(
+            "localhost",
+            f"benchmark {secrets.token_hex(4)}",
+            [caveats.RequestUser(user_id=str(user_id))],
+            user_id=user_id,
+        )
+    return base64.b64encode(f"__token__:{serialized}".encode()).decode()
+
+
+def _record_hash(data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _wheel(version: str, padding: bytes) -> bytes:
+    dist_info = f"{UPLOAD_PROJECT}-{version}.dist-info"
+    files = {
+        f"{UPLOAD_PROJECT}/data.bin": padding,
+        f"{dist_info}/METADATA": (
+            f"Metadata-Version: 2.1\nName: {UPLOAD_PROJECT}\nVersion: {version}\n"
+        ).encode(),
+        f"{dist_info}/WHEEL": (
+            b"Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+        ),
+    }
+    record = "".join(
+        f"{name},sha256={_record_hash(data)},{len(data)}\n"
+        for name, data in files.items()
+    )
+    files[f"{dist_info}/RECORD"] = (record + f"{dist_info}/RECORD,,\n").encode()
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zfp:
+        for name, data in files.items():
+            zfp.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _sdist(version: str, padding: bytes) -> bytes:
+    top_level = f"{UPLOAD_PROJECT}-{version}"
+    files = {
+        f"{top_level}/PKG-INFO": (
+            f"Metadata-Version: 2.1\nName: {UPLOAD_PROJECT}\nVersion: {version}\n"
+        ).encode(),
+        f"{top_level}/data.bin": padding,
+    }
+
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _endpoints(app, engine, projects: int, rng: random.Random):
+    """
+    Each endpoint prepares (untimed) the request that will be timed.
+    """
+
+    def project():
+        return f"bench-{rng.randint(1, projects)}"
+
+    with engine.connect() as connection:
+        serial = connection.scalar(sqlalchemy.text("SELECT max(id) FROM journals"))
+
+    endpoints = {
+        "simple-index": lambda: ("GET", "/simple/", {}),
+        "simple-detail": lambda: ("GET", f"/simple/{project()}/", {}),
+        "simple-detail-wide": lambda: ("GET", "/simple/bench-wide-1/", {}),
+        "json-project": lambda: ("GET", f"/pypi/{project()}/json", {}),
+        "json-project-wide": lambda: ("GET", "/pypi/bench-wide-1/json", {}),
+        "json-release": lambda: ("GET", f"/pypi/{project()}/1/json", {}),
+        "json-release-wide": lambda: ("GET", "/pypi/bench-wide-1/1/json", {}),
+        "changelog-since-serial": lambda: (
+            "POST",
+            "/pypi",
+            {
+                "params": xmlrpc.client.dumps(
+                    (serial - 1_000,), "changelog_since_serial"
+                ),
+                "content_type": "text/xml",
+            },
+        ),
+        "search": lambda: ("GET", "/search/", {"params": {"q": project()}}),
+    }
+
+    def login():
+        app.reset()
+        form = app.get("/account/login/").forms["login-form"]
+        return (
+            "POST",
+            "/account/login/",
+            {
+                "params": {
+                    "username": LOGIN_USER,
+                    "password": PASSWORD,
+                    "csrf_token": form["csrf_token"].value,
+                }
+            },
+        )
+
+    endpoints["login"] = login
+
+    credentials = _upload_token(engine)
+    run = int(time.time())
+    uploads = iter(range(sys.maxsize))
+
+    def upload(filetype, size):
+        def prepare():
+            app.reset()
+            version = f"{run}.{next(uploads)}"
+            padding = rng.randbytes(size)
+            if filetype == "sdist":
+                filename = f"{UPLOAD_PROJECT}-{version}.tar.gz"
+                content = _sdist(version, padding)
+            else:
+                filename = f"{UPLOAD_PROJECT}-{version}-py3-none-any.whl"
+                content = _wheel(version, padding)
+            return (
+                "POST",
+                "/legacy/",
+                {
+                    "headers": {"Authorization": f"Basic {credentials}"},
+                    "params": {
+                        ":action": "file_upload",
+                        "protocol_version": "1",
+                        "metadata_version": "2.1",
+                        "name": UPLOAD_PROJECT,
+                        "version": version,
+                        "filetype": filetype,
+                        "pyversion": "source" if filetype == "sdist" else "py3",
+                        "sha256_digest": hashlib.sha256(content).hexdigest(),
+                    },
+                    "upload_files": [("content", filename, content)],
+                },
+            )
+
+        return prepare
+
+    for filetype, label in [("bdist_wheel", "wheel"), ("sdist", "sdist")]:
+        for size_label, size in UPLOAD_SIZES.items():
+            endpoints[f"upload-{label}-{size_label}"] = upload(filetype, size)
+
+    return endpoints
+
+
+def _measure(app, prepare, requests: int) -> dict:
+    timings, queries, errors = [], [], 0
+    # The first request is a warm up, which isn't recorded.
+    for i in range(requests + 1):
+        method, url, kwargs = prepare()
+        start = time.perf_counter()
+        response = app.request(url, method=method, expect_errors=True, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i == 0:
+            continue
+
+        timings.append(elapsed)
+        if response.status_int >= 400:
+            errors += 1
+        if m := SERVER_TIMING_RE.search(response.headers.get("Server-Timing", "")):
+            queries.append(int(m.group(1)))
+
+    return {
+        "p50": statistics.median(timings),
+        "p99": statistics.quantiles(timings, n=100)[98],
+        "queries": max(queries) if queries else None,
+        # Linux reports this in KiB.
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "errors": errors,
+    }
+
+
+def _regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if (base := baseline.get(name)) is None:
+            continue
+        for metric in ["p50", "p99", "peak_rss"]:
+            if result[metric] > base[metric] * tolerance:
+                regressions.append(
+                    f"{name}: {metric} is {result[metric]:.1f}, was {base[metric]:.1f}"
+                )
+        if (
+            result["queries"] is not None
+            and base["queries"] is not None
+            and result["queries"] > base["queries"]
+        ):
+            regressions.append(
+                f"{name}: makes {result['queries']} queries, made {base['queries']}"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(
+                f"{name}: {result['errors']} requests failed, {base['errors']} did"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--endpoint", action="append", help="default: all of them")
+    parser.add_argument("--baseline", help="a JSON file of results")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args(argv)
+    if args.database_url is None:
+        parser.error("--database-url or DATABASE_URL is required")
+    if args.requests < 2:
+        parser.error("--requests must be at least 2")
+
+    url = sqlalchemy.engine.make_url(args.database_url).set(
+        database=f"warehouse_benchmark_{args.scale}"
+    )
+    _create_database(url)
+
+    settings = {
+        "database.url": url.render_as_string(hide_password=False),
+        "enforce_https": False,
+        "warehouse.db.server_timing": True,
+        "breached_passwords.backend": (
+            "warehouse.accounts.services.NullPasswordBreachedService"
+        ),
+    }
+    settings.update(dict.fromkeys(RATELIMITS, "1000000 per second"))
+    config = configure(settings=settings)
+    engine = config.registry["sqlalchemy.engine"]
+
+    alembic.command.upgrade(config.alembic_config(), "head")
+    _seed(engine, SCALES[args.scale])
+
+    app = webtest.TestApp(
+        config.make_wsgi_app(), extra_environ={"REMOTE_ADDR": REMOTE_ADDR}
+    )
+    endpoints = _endpoints(app, engine, SCALES[args.scale], random.Random(args.seed))
+    for name in args.endpoint or []:
+        if name not in endpoints:
+            parser.error(f"unknown endpoint {name!r}, choose from {list(endpoints)}")
+
+    results = {}
+    for name, prepare in endpoints.items():
+        if args.endpoint and name not in args.endpoint:
+            continue
+        results[name] = result = _measure(app, prepare, args.requests)
+        print(
+            f"{name + ':':24}p50={result['p50']:.1f}ms p99={result['p99']:.1f}ms "
+            f"queries={result['queries']} peak_rss={result['peak_rss']:.0f}MiB "
+            f"errors={result['errors']}"
+        )
+
+    if args.baseline is None:
+        return 0
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fp:
+            json.dump({"scale": args.scale, "results": results}, fp, indent=2)
+        return 0
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    if baseline["scale"] != args.scale:
+        parser.error(f"the baseline was recorded at the {baseline['scale']} scale")
+
+    regressions = _regressions(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Benchmark the overhead of setting up, and tearing down, the request a task runs with.
+
+    python -m tests.benchmarks.task_requests --iterations 10000
+
+Compares building a new request for every task, as we used to, against taking
+one from a worker's pool of them, exiting with an error if the pool isn't at
+least the given factor faster.
+"""
+
+import argparse
+import hashlib
+import statistics
+import sys
+import time
+
+import pyramid.scripting
+import transaction
+
+from warehouse.config import configure
+from warehouse.metrics import IMetricsService
+from warehouse.tasks import TaskRequestPool
+
+
+def _prepare(registry):
+    # This is how every task got its request, before they were pooled.
+    env = pyramid.scripting.prepare(registry=registry)
+    env["request"].tm = transaction.TransactionManager(explicit=True)
+    env["request"].timings = {"new_request_start": time.time() * 1000}
+    env["request"].remote_addr = "127.0.0.1"
+    env["request"].remote_addr_hashed = hashlib.sha256(
+        ("127.0.0.1" + registry.settings["warehouse.ip_salt"]).encode("utf8")
+    ).hexdigest()
+    return env
+
+
+def _measure(acquire, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        env = acquire()
+        # Every task looks up the metrics service, and runs in a transaction.
+        env["request"].find_service(IMetricsService, context=None)
+        with env["request"].tm:
+            pass
+        env["request"]._process_finished_callbacks()
+        env["closer"]()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--min-speedup", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    registry = configure().registry
+    pool = TaskRequestPool(registry)
+
+    results = {
+        "prepare": _measure(lambda: _prepare(registry), args.iterations),
+        "pooled": _measure(pool.acquire, args.iterations),
+    }
+
+    for name, timings in results.items():
+        p50 = statistics.median(timings)
+        p99 = statistics.quantiles(timings, n=100)[98]
+        print(f"{name + ':':9}p50={p50:.1f}us p99={p99:.1f}us max={max(timings):.1f}us")
+
+    speedup = statistics.median(results["prepare"]) / statistics.median(
+        results["pooled"]
+    )
+    print(f"speedup: {speedup:.1f}x")
+
+    if speedup < args.min_speedup:
+        print(f"speedup is less than {args.min_speedup}x", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Benchmark the typo-squatting checks against a large synthetic corpus.
+
+    python -m tests.benchmarks.typosnyper --corpus-size 100000
+
+Follows the same path as production: the corpus is a mapping of names to their
+number of dependents, which is indexed and serialized as by the task that computes
+it, then every check goes through `get_index` as an upload would.
+
+Reports how long it takes to build and to load the index, and the latency of
+checking names against it, exiting with an error if the p99 latency exceeds the
+budget.
+"""
+
+import argparse
+import random
+import resource
+import statistics
+import sys
+import time
+
+import orjson
+
+from warehouse.packaging import typosnyper
+from warehouse.packaging.typosnyper import TypoIndex, get_index, typo_check_name
+
+WORDS = [
+    "async",
+    "aws",
+    "client",
+    "core",
+    "data",
+    "django",
+    "flask",
+    "http",
+    "json",
+    "lib",
+    "py",
+    "pytest",
+    "sdk",
+    "tools",
+    "utils",
+    "web",
+]
+CHARACTERS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def _random_name(rng: random.Random) -> str:
+    words = [
+        rng.choice(WORDS) if rng.random() < 0.5 else _random_word(rng)
+        for _ in range(rng.randint(1, 4))
+    ]
+    return "-".join(words)
+
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(CHARACTERS) for _ in range(rng.randint(3, 10)))
+
+
+def _typo(rng: random.Random, name: str) -> str:
+    idx = rng.randrange(len(name))
+    match rng.randrange(4):
+        case 0:
+            return name[:idx] + name[idx + 1 :]
+        case 1:
+            return name[:idx] + name[idx] + name[idx:]
+        case 2:
+            return name[:idx] + rng.choice(CHARACTERS) + name[idx + 1 :]
+        case _:
+            return "-".join(reversed(name.split("-")))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-size", type=int, default=100_000)
+    parser.add_argument("--checks", type=int, default=10_000)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    corpus: dict[str, int] = {}
+    while len(corpus) < args.corpus_size:
+        corpus[_random_name(rng)] = rng.randint(1, 10_000)
+    population = sorted(corpus)
+    names = [
+        # Mix names that should match something with ones that (likely) won't.
+        _typo(rng, rng.choice(population)) if i % 2 else _random_name(rng)
+        for i in range(args.checks)
+    ]
+
+    # What `compute_top_dependents_corpus` does, and stores in the cache
+    start = time.perf_counter()
+    index = TypoIndex(corpus)
+    version = index.version
+    serialized = orjson.dumps(index.to_dict())
+    build = time.perf_counter() - start
+
+    # What the first check in each process does after the corpus is recomputed
+    start = time.perf_counter()
+    get_index(version, lambda: orjson.loads(serialized))
+    load = time.perf_counter() - start
+    # ru_maxrss is reported in KiB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    timings = []
+    matches = 0
+    for name in names:
+        start = time.perf_counter()
+        index = get_index(version, lambda: orjson.loads(serialized))
+        if typo_check_name(name, corpus=index) is not None:
+            matches += 1
+        timings.append((time.perf_counter() - start) * 1000)
+    assert typosnyper._cached_index is index
+
+    p50 = statistics.median(timings)
+    p99 = statistics.quantiles(timings, n=100)[98]
+
+    print(f"corpus:  {len(corpus)} names")
+    print(f"index:   {build:.2f}s to build, {len(serialized) / 2**20:.1f} MiB cached")
+    print(f"load:    {load * 1000:.1f}ms, {peak:.1f} MiB peak RSS")
+    print(f"checks:  {len(names)} names, {matches} matched")
+    print(f"latency: p50={p50:.3f}ms p99={p99:.3f}ms max={max(timings):.3f}ms")
+
+    if p99 > args.budget_ms:
+        print(f"p99 latency exceeds budget of {args.budget_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
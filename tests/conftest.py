@@ -347,6 +347,7 @@ def get_app_config(database, nondefaults=None):
         "warehouse.oidc.audience": "pypi",
         "oidc.backend": "warehouse.oidc.services.NullOIDCPublisherService",
         "captcha.backend": "warehouse.captcha.hcaptcha.Service",
+        "warehouse.db.enforce_query_budgets": True,
     }
 
     if nondefaults:
@@ -1902,6 +1902,12 @@ class TestNullDomainStatusService:
         svc = services.NullDomainStatusService()
         assert svc.get_domain_status("example.com") == ["active"]
 
+    def test_get_domain_statuses(self):
+        svc = services.NullDomainStatusService()
+        assert svc.get_domain_statuses(
+            ["example.com", "example.org", "example.com"]
+        ) == {"example.com": ["active"], "example.org": ["active"]}
+
     def test_factory(self):
         context = pretend.stub()
         request = pretend.stub()
@@ -1984,6 +1990,45 @@ class TestDomainrDomainStatusService:
             )
         ]
 
+    @pytest.mark.parametrize("max_workers", [1, 8])
+    def test_get_domain_statuses(self, max_workers):
+        def get(url, params, timeout):
+            domain = params["domain"]
+            return pretend.stub(
+                json=lambda: {"status": [{"domain": domain, "status": domain[:6]}]},
+                raise_for_status=lambda: None,
+            )
+
+        session = pretend.stub(get=pretend.call_recorder(get))
+        svc = services.DomainrDomainStatusService(
+            session=session, client_id="some_client_id", max_workers=max_workers
+        )
+
+        assert svc.get_domain_statuses(["active.com", "parked.com", "active.com"]) == {
+            "active.com": ["active"],
+            "parked.com": ["parked"],
+        }
+        assert sorted(
+            call.kwargs["params"]["domain"] for call in session.get.calls
+        ) == [
+            "active.com",
+            "parked.com",
+        ]
+
+    def test_get_domain_statuses_single(self):
+        response = pretend.stub(
+            json=lambda: {"status": [{"domain": "example.com", "status": "active"}]},
+            raise_for_status=lambda: None,
+        )
+        session = pretend.stub(get=pretend.call_recorder(lambda *a, **kw: response))
+        svc = services.DomainrDomainStatusService(
+            session=session, client_id="some_client_id"
+        )
+
+        assert svc.get_domain_statuses(["example.com"]) == {"example.com": ["active"]}
+        assert svc.get_domain_statuses([]) == {}
+        assert len(session.get.calls) == 1
+
     def test_factory(self):
         context = pretend.stub()
         request = pretend.stub(
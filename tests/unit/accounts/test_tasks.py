@@ -28,7 +28,10 @@ def test_notify_users_of_tos_update(db_request, user_service, monkeypatch):
     # Users we should not notify because they don't have a primary/verified email
     UserFactory.create_batch(7)
 
-    send_email = pretend.call_recorder(lambda request, user: None)
+    batches = []
+    send_email = pretend.call_recorder(
+        lambda request, user: batches.append(request._email_batch)
+    )
     monkeypatch.setattr(tasks, "send_user_terms_of_service_updated", send_email)
 
     user_service.record_tos_engagement = pretend.call_recorder(
@@ -37,6 +40,9 @@ def test_notify_users_of_tos_update(db_request, user_service, monkeypatch):
 
     notify_users_of_tos_update(db_request)
 
+    # All of the emails are sent as part of a single batch.
+    assert len(set(map(id, batches))) == 1
+    assert not hasattr(db_request, "_email_batch")
     assert sorted(send_email.calls, key=lambda x: x.args[1]) == sorted(
         [pretend.call(db_request, u) for u in users_to_notify], key=lambda x: x.args[1]
     )
@@ -126,7 +132,7 @@ def _create_old_users_and_releases():
         )
 
 
-def test_compute_user_metrics(db_request, metrics):
+def test_compute_user_metrics(db_request, metrics, query_recorder):
     # Create an active user with no email
     UserFactory.create()
     # Create an inactive user
@@ -157,7 +163,11 @@ def test_compute_user_metrics(db_request, metrics):
     # Create active users with unverified emails and releases over two years
     _create_old_users_and_releases()
 
-    compute_user_metrics(db_request)
+    with query_recorder:
+        compute_user_metrics(db_request)
+
+    # Every metric is computed by a single query
+    assert len(query_recorder.queries) == 1
 
     assert metrics.gauge.calls == [
         pretend.call("warehouse.users.count", 10),
@@ -226,6 +236,39 @@ def test_update_email_domain_status(db_request, domain_status_service, mocker):
     assert under_threshold.domain_last_status is None  # no default, not updated
 
 
+def test_update_email_domain_status_checks_each_domain_once(
+    db_request, domain_status_service, mocker
+):
+    mocker.patch.object(
+        domain_status_service,
+        "get_domain_status",
+        side_effect=lambda domain: {
+            "shared.com": ["active"],
+            "expired.com": ["undelegated", "inactive"],
+        }.get(domain),
+    )
+    shared = [
+        EmailFactory.create(email="one@shared.com"),
+        EmailFactory.create(email="two@Shared.com"),
+    ]
+    expired = EmailFactory.create(email="me@expired.com")
+    failed = EmailFactory.create(email="me@failed.com")
+
+    batch_update_email_domain_status(db_request)
+
+    assert sorted(
+        call.args[0] for call in domain_status_service.get_domain_status.call_args_list
+    ) == ["expired.com", "failed.com", "shared.com"]
+
+    for email in shared:
+        assert email.domain_last_status == ["active"]
+        assert email.domain_last_checked is not None
+    assert expired.domain_last_status == ["undelegated", "inactive"]
+    assert expired.domain_last_checked == shared[0].domain_last_checked
+    assert failed.domain_last_status is None
+    assert failed.domain_last_checked is None
+
+
 def test_update_email_domain_status_does_not_update_if_not_needed(
     db_request, domain_status_service, mocker
 ):
@@ -79,6 +79,52 @@ CONTENT_TYPE_PARAMS = [
 ]
 
 
+class TestSimpleETags:
+    @pytest.mark.parametrize(
+        "content_type",
+        [
+            simple.MIME_TEXT_HTML,
+            simple.MIME_PYPI_SIMPLE_V1_HTML,
+            simple.MIME_PYPI_SIMPLE_V1_JSON,
+        ],
+    )
+    def test_index(self, db_request, content_type):
+        db_request.accept = content_type
+        db_request.registry.settings = {"warehouse.commit": "abc123"}
+        assert simple._simple_index_etag(None, db_request) == (
+            f"0:{content_type}:abc123"
+        )
+
+        je = JournalEntryFactory.create(submitted_by=UserFactory.create())
+        assert simple._simple_index_etag(None, db_request) == (
+            f"{je.id}:{content_type}:abc123"
+        )
+
+    def test_detail(self, pyramid_request):
+        project = pretend.stub(
+            normalized_name="foo",
+            last_serial=42,
+            project_status=pretend.stub(value="archived"),
+            alternate_repositories=[
+                pretend.stub(url="https://b.example.com/"),
+                pretend.stub(url="https://a.example.com/"),
+            ],
+        )
+        pyramid_request.accept = simple.MIME_PYPI_SIMPLE_V1_JSON
+        pyramid_request.registry.settings = {"warehouse.commit": "abc123"}
+
+        assert simple._simple_detail_etag(project, pyramid_request) == (
+            "42:archived:https://a.example.com/:https://b.example.com/:"
+            "application/vnd.pypi.simple.v1+json:abc123"
+        )
+
+    def test_detail_redirects(self, pyramid_request):
+        project = pretend.stub(normalized_name="foo")
+        pyramid_request.matchdict["name"] = "Foo"
+
+        assert simple._simple_detail_etag(project, pyramid_request) is None
+
+
 class TestSimpleIndex:
     @pytest.mark.parametrize(
         ("content_type", "renderer_override"),
@@ -2,6 +2,7 @@
 
 import json
 import re
+import threading
 
 import pretend
 import pytest
@@ -69,6 +70,23 @@ class TestIntegrityService:
         service = services.IntegrityService.create_service(None, db_request)
         assert isinstance(service, services.IntegrityService)
 
+    def test_create_service_settings(self, metrics):
+        request = pretend.stub(
+            db=pretend.stub(),
+            find_service=lambda *a, **kw: metrics,
+            registry=pretend.stub(
+                settings={
+                    "integrity.verify_workers": 4,
+                    "integrity.verify_timeout": 10,
+                }
+            ),
+        )
+
+        service = services.IntegrityService.create_service(None, request)
+
+        assert service.verify_workers == 4
+        assert service.verify_timeout == 10
+
     def test_parse_attestations_fails_no_publisher(self, db_request):
         integrity_service = services.IntegrityService(
             metrics=pretend.stub(),
@@ -172,7 +190,9 @@ class TestIntegrityService:
 
         monkeypatch.setattr(Verifier, "production", lambda: pretend.stub())
         monkeypatch.setattr(
-            Attestation, "verify", lambda *args: (AttestationType.PYPI_PUBLISH_V1, {})
+            Attestation,
+            "verify",
+            lambda *args, **kwargs: (AttestationType.PYPI_PUBLISH_V1, {}),
         )
 
         with pytest.raises(
@@ -229,7 +249,7 @@ class TestIntegrityService:
             [dummy_attestation]
         )
 
-        def failing_verify(_self, _policy, _dist):
+        def failing_verify(_self, _policy, _dist, offline):
             raise verify_exception("error")
 
         monkeypatch.setattr(Attestation, "verify", failing_verify)
@@ -261,7 +281,7 @@ class TestIntegrityService:
 
         monkeypatch.setattr(Verifier, "production", lambda: pretend.stub())
         monkeypatch.setattr(
-            Attestation, "verify", lambda *args: ("wrong-predicate", {})
+            Attestation, "verify", lambda *args, **kwargs: ("wrong-predicate", {})
         )
 
         with pytest.raises(
@@ -296,7 +316,9 @@ class TestIntegrityService:
 
         monkeypatch.setattr(Verifier, "production", lambda: pretend.stub())
         monkeypatch.setattr(
-            Attestation, "verify", lambda *args: (AttestationType.PYPI_PUBLISH_V1, {})
+            Attestation,
+            "verify",
+            lambda *args, **kwargs: (AttestationType.PYPI_PUBLISH_V1, {}),
         )
 
         attestations = integrity_service.parse_attestations(
@@ -305,6 +327,120 @@ class TestIntegrityService:
         )
         assert attestations == [dummy_attestation]
 
+    def test_parse_attestations_parallel(self, metrics, monkeypatch, dummy_attestation):
+        integrity_service = services.IntegrityService(
+            metrics=metrics, session=pretend.stub(), verify_workers=2
+        )
+        request = pretend.stub(
+            oidc_publisher=pretend.stub(attestation_identity=pretend.stub()),
+            find_service=lambda *a, **kw: metrics,
+            POST={
+                "attestations": TypeAdapter(list[Attestation]).dump_json(
+                    [dummy_attestation] * 2
+                )
+            },
+        )
+
+        predicate_types = iter(services.SUPPORTED_ATTESTATION_TYPES)
+        verify_threads = set()
+
+        def verify(*args, **kwargs):
+            verify_threads.add(threading.current_thread().name)
+            return next(predicate_types), {}
+
+        monkeypatch.setattr(Attestation, "verify", verify)
+
+        attestations = integrity_service.parse_attestations(request, pretend.stub())
+
+        assert attestations == [dummy_attestation] * 2
+        assert all(name.startswith("attestations") for name in verify_threads)
+        assert [call.args[0] for call in metrics.timing.calls] == [
+            "warehouse.upload.attestations.parse",
+            "warehouse.upload.attestations.verify",
+            "warehouse.upload.attestations.verify",
+        ]
+
+    @pytest.mark.parametrize(("workers", "count"), [(2, 2), (1, 1), (2, 1)])
+    def test_parse_attestations_timeout(
+        self, metrics, monkeypatch, dummy_attestation, workers, count
+    ):
+        integrity_service = services.IntegrityService(
+            metrics=metrics,
+            session=pretend.stub(),
+            verify_workers=workers,
+            verify_timeout=0.01,
+        )
+        request = pretend.stub(
+            oidc_publisher=pretend.stub(attestation_identity=pretend.stub()),
+            find_service=lambda *a, **kw: metrics,
+            POST={
+                "attestations": TypeAdapter(list[Attestation]).dump_json(
+                    [dummy_attestation] * count
+                )
+            },
+        )
+
+        released = threading.Event()
+
+        def verify(*args, **kwargs):
+            released.wait()
+            return AttestationType.PYPI_PUBLISH_V1, {}
+
+        monkeypatch.setattr(Attestation, "verify", verify)
+
+        try:
+            executor = services._get_executor(workers)
+            with pytest.raises(AttestationUploadError, match="Timed out"):
+                integrity_service.parse_attestations(request, pretend.stub())
+
+            # The stuck verifications are left with the old pool, so they don't
+            # hold up the next upload.
+            assert services._get_executor(workers) is not executor
+            monkeypatch.setattr(
+                Attestation,
+                "verify",
+                lambda *args, **kwargs: (AttestationType.PYPI_PUBLISH_V1, {}),
+            )
+            request.POST["attestations"] = TypeAdapter(list[Attestation]).dump_json(
+                [dummy_attestation]
+            )
+            assert integrity_service.parse_attestations(request, pretend.stub()) == [
+                dummy_attestation
+            ]
+        finally:
+            released.set()
+
+        assert metrics.increment.calls == [
+            pretend.call("warehouse.upload.attestations.failed_timeout")
+        ]
+
+    def test_verify_attestation_caches_trust_root(self, metrics, monkeypatch):
+        monkeypatch.setattr(services, "_trust_root_refresh_after", 0.0)
+        now = 1000.0
+        monkeypatch.setattr(services.time, "monotonic", lambda: now)
+
+        attestation = pretend.stub(
+            verify=pretend.call_recorder(lambda identity, dist, offline: ("a", {}))
+        )
+
+        for _ in range(2):
+            assert services._verify_attestation(
+                metrics, attestation, "identity", "dist"
+            ) == ("a", {})
+        now += services.TRUST_ROOT_REFRESH_INTERVAL
+        services._verify_attestation(metrics, attestation, "identity", "dist")
+
+        assert attestation.verify.calls == [
+            pretend.call("identity", "dist", offline=False),
+            pretend.call("identity", "dist", offline=True),
+            pretend.call("identity", "dist", offline=False),
+        ]
+        assert [call.kwargs["tags"] for call in metrics.timing.calls] == [
+            ["trust_root:refreshed"],
+            ["trust_root:cached"],
+            ["trust_root:refreshed"],
+        ]
+
     @pytest.mark.parametrize(
         "publisher_factory",
         [GitHubPublisherFactory, GitLabPublisherFactory, GooglePublisherFactory],
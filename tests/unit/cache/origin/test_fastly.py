@@ -12,6 +12,7 @@ import requests
 
 from zope.interface.verify import verifyClass
 
+from warehouse import db
 from warehouse.cache.origin import fastly
 from warehouse.cache.origin.interfaces import IOriginCache
 from warehouse.metrics.interfaces import IMetricsService
@@ -159,6 +160,37 @@ class TestFastlyCache:
         assert cacher.service_id == "the service id"
         assert cacher._purger is purge_key.delay
 
+    @pytest.mark.parametrize(
+        ("settings", "countdown"),
+        [
+            ({}, db.DEFAULT_REPLICA_MAX_LAG + db.REPLICA_LAG_INTERVAL),
+            ({"database.replica_max_lag": 30}, 30 + db.REPLICA_LAG_INTERVAL),
+        ],
+    )
+    def test_create_service_with_replica(self, settings, countdown):
+        purge_key = pretend.stub(
+            delay=pretend.stub(),
+            apply_async=pretend.call_recorder(lambda args, countdown: None),
+        )
+        request = pretend.stub(
+            registry=pretend.stub(
+                settings={
+                    "origin_cache.api_key": "the api key",
+                    "origin_cache.service_id": "the service id",
+                    "database.replica_url": "postgresql://replica/warehouse",
+                    **settings,
+                }
+            ),
+            task=lambda f: purge_key,
+        )
+        cacher = fastly.FastlyCache.create_service(None, request)
+        assert cacher._purger is purge_key.delay
+
+        cacher._delayed_purger("one")
+        assert purge_key.apply_async.calls == [
+            pretend.call(("one",), countdown=countdown)
+        ]
+
     def test_adds_surrogate_key(self):
         request = pretend.stub()
         response = pretend.stub(headers={})
@@ -277,6 +309,23 @@ class TestFastlyCache:
 
         assert purge_delay.calls == [pretend.call("one"), pretend.call("two")]
 
+    def test_purge_again_later(self):
+        purge_delay = pretend.call_recorder(lambda *a, **kw: None)
+        purge_later = pretend.call_recorder(lambda *a, **kw: None)
+        cacher = fastly.FastlyCache(
+            api_endpoint=None,
+            api_connect_via=None,
+            api_key="an api key",
+            service_id="the-service-id",
+            purger=purge_delay,
+            delayed_purger=purge_later,
+        )
+
+        cacher.purge(["one", "two"])
+
+        assert purge_delay.calls == [pretend.call("one"), pretend.call("two")]
+        assert purge_later.calls == [pretend.call("one"), pretend.call("two")]
+
     @pytest.mark.parametrize(
         ("connect_via", "forced_ip_https_adapter_calls"),
         [(None, []), ("172.16.0.1", [pretend.call(dest_ip="172.16.0.1")])],
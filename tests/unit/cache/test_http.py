@@ -1,14 +1,22 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+
 import pretend
 import pytest
 
+from pyramid.httpexceptions import HTTPMovedPermanently, HTTPOk
+from webob.etag import ETagMatcher, NoETag
+
 from warehouse.cache.http import (
     add_vary,
     cache_control,
     conditional_http_tween_factory,
+    etag,
+    fast_etag,
     includeme,
 )
+from warehouse.utils.compression import encoded_etag
 
 
 @pytest.mark.parametrize("vary", [None, [], ["wat"]])
@@ -117,6 +125,90 @@ class TestCacheControl:
         assert response is response_obj
 
 
+def test_fast_etag():
+    assert fast_etag(b"foo") == "3-8c73652102820145"
+    assert fast_etag(b"foo") != fast_etag(b"bar")
+    assert fast_etag(b"") != fast_etag(b"\x00")
+
+
+class TestETag:
+    def test_sets_etag(self):
+        response = HTTPOk()
+        request = pretend.stub(method="GET", if_none_match=NoETag)
+        context = pretend.stub()
+        validator = pretend.call_recorder(lambda context, request: "foo")
+
+        @etag(validator)
+        def view(context, request):
+            return response
+
+        assert view(context, request) is response
+        assert response.etag == hashlib.blake2b(b"foo", digest_size=16).hexdigest()
+        assert validator.calls == [pretend.call(context, request)]
+
+    def test_doesnt_set_etag_no_200(self):
+        response = HTTPMovedPermanently("/foo/")
+        request = pretend.stub(method="GET", if_none_match=NoETag)
+
+        @etag(lambda context, request: "foo")
+        def view(context, request):
+            return response
+
+        assert view(pretend.stub(), request) is response
+        assert response.etag is None
+
+    def test_no_validator(self):
+        response = HTTPOk()
+        request = pretend.stub(method="GET", if_none_match=NoETag)
+
+        @etag(lambda context, request: None)
+        def view(context, request):
+            return response
+
+        assert view(pretend.stub(), request) is response
+        assert response.etag is None
+
+    @pytest.mark.parametrize("method", ["GET", "HEAD"])
+    @pytest.mark.parametrize("encoding", [None, "gzip", "br", "zstd"])
+    def test_not_modified(self, method, encoding):
+        tag = hashlib.blake2b(b"foo", digest_size=16).hexdigest()
+        if encoding is not None:
+            tag = encoded_etag(tag, encoding)
+        request = pretend.stub(
+            method=method, if_none_match=ETagMatcher.parse(f'"other", "{tag}"')
+        )
+
+        @etag(lambda context, request: "foo")
+        def view(context, request):
+            raise AssertionError("The view should not be called")
+
+        response = view(pretend.stub(), request)
+
+        assert response.status_code == 304
+        assert response.etag == tag
+
+    def test_modified(self):
+        response = HTTPOk()
+        request = pretend.stub(method="GET", if_none_match=ETagMatcher.parse('"bar"'))
+
+        @etag(lambda context, request: "foo")
+        def view(context, request):
+            return response
+
+        assert view(pretend.stub(), request) is response
+
+    def test_not_modified_wrong_method(self):
+        response = HTTPOk()
+        tag = hashlib.blake2b(b"foo", digest_size=16).hexdigest()
+        request = pretend.stub(method="POST", if_none_match=ETagMatcher.parse(tag))
+
+        @etag(lambda context, request: "foo")
+        def view(context, request):
+            return response
+
+        assert view(pretend.stub(), request) is response
+
+
 class TestConditionalHTTPTween:
     def test_has_last_modified(self):
         response = pretend.stub(
@@ -158,8 +250,8 @@ class TestConditionalHTTPTween:
             last_modified=None,
             etag=None,
             conditional_response=False,
-            md5_etag=pretend.call_recorder(lambda: None),
             app_iter=[b"foo"],
+            body=b"foo",
             status_code=200,
         )
         handler = pretend.call_recorder(lambda request: response)
@@ -170,7 +262,7 @@ class TestConditionalHTTPTween:
         assert tween(request) is response
         assert handler.calls == [pretend.call(request)]
         assert response.conditional_response
-        assert response.md5_etag.calls == [pretend.call()]
+        assert response.etag == fast_etag(b"foo")
 
     @pytest.mark.parametrize("method", ["GET", "HEAD"])
     def test_implicit_etag_buffers_streaming(self, method):
@@ -178,7 +270,6 @@ class TestConditionalHTTPTween:
             last_modified=None,
             etag=None,
             conditional_response=False,
-            md5_etag=pretend.call_recorder(lambda: None),
             app_iter=iter([b"foo"]),
             body=b"foo",
             content_length=3,
@@ -192,7 +283,7 @@ class TestConditionalHTTPTween:
         assert tween(request) is response
         assert handler.calls == [pretend.call(request)]
         assert response.conditional_response
-        assert response.md5_etag.calls == [pretend.call()]
+        assert response.etag == fast_etag(b"foo")
 
     @pytest.mark.parametrize("method", ["GET", "HEAD"])
     def test_no_implicit_etag_no_200(self, method):
@@ -200,7 +291,6 @@ class TestConditionalHTTPTween:
             last_modified=None,
             etag=None,
             conditional_response=False,
-            md5_etag=pretend.call_recorder(lambda: None),
             app_iter=[b"foo"],
             status_code=201,
         )
@@ -212,7 +302,7 @@ class TestConditionalHTTPTween:
         assert tween(request) is response
         assert handler.calls == [pretend.call(request)]
         assert not response.conditional_response
-        assert response.md5_etag.calls == []
+        assert response.etag is None
 
     @pytest.mark.parametrize("method", ["POST", "PUT"])
     def test_no_implicit_etag_wrong_method(self, method):
@@ -220,7 +310,6 @@ class TestConditionalHTTPTween:
             last_modified=None,
             etag=None,
             conditional_response=False,
-            md5_etag=pretend.call_recorder(lambda: None),
             app_iter=[b"foo"],
             status_code=200,
         )
@@ -232,7 +321,7 @@ class TestConditionalHTTPTween:
         assert tween(request) is response
         assert handler.calls == [pretend.call(request)]
         assert not response.conditional_response
-        assert response.md5_etag.calls == []
+        assert response.etag is None
 
     def test_no_etag(self):
         response = pretend.stub(
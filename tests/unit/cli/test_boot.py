@@ -0,0 +1,85 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import subprocess
+import sys
+
+import pretend
+
+from warehouse.cli import boot
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:      1500 |       1500 |     sqlalchemy.sql
+import time:      2500 |       4000 |   sqlalchemy
+import time:       300 |        300 |     warehouse.admin.flags
+import time:      4000 |       4300 |   warehouse.admin.views.core
+import time:      1000 |       1000 |   warehouse.admin
+import time:       700 |       5000 | warehouse.config
+some other output
+"""
+
+
+def test_parse_importtime():
+    assert boot.parse_importtime(IMPORTTIME) == {
+        "_io": 120,
+        "sqlalchemy.sql": 1500,
+        "sqlalchemy": 2500,
+        "warehouse.admin.flags": 300,
+        "warehouse.admin.views.core": 4000,
+        "warehouse.admin": 1000,
+        "warehouse.config": 700,
+    }
+
+
+def test_group_timings():
+    assert boot.group_timings(boot.parse_importtime(IMPORTTIME)) == {
+        "_io": 120,
+        "sqlalchemy": 4000,
+        "warehouse.admin": 5300,
+        "warehouse.config": 700,
+    }
+
+
+def test_profile_boot(monkeypatch, cli):
+    run = pretend.call_recorder(
+        lambda *a, **kw: pretend.stub(returncode=0, stdout="1.25\n", stderr=IMPORTTIME)
+    )
+    monkeypatch.setattr(subprocess, "run", run)
+
+    result = cli.invoke(boot.profile_boot, ["--limit", "2"])
+
+    assert result.exit_code == 0
+    assert result.output == (
+        "Configured in 1.250s, imports took 0.010s in total.\n"
+        "\n"
+        "       5.3ms  warehouse.admin\n"
+        "       4.0ms  sqlalchemy\n"
+    )
+    assert run.calls == [
+        pretend.call(
+            [sys.executable, "-X", "importtime", "-c", boot.BOOT],
+            capture_output=True,
+            text=True,
+        )
+    ]
+
+
+def test_profile_boot_fails(monkeypatch, cli):
+    run = pretend.call_recorder(
+        lambda *a, **kw: pretend.stub(
+            returncode=1,
+            stdout="",
+            stderr=IMPORTTIME + "KeyError: 'warehouse.token'\n",
+        )
+    )
+    monkeypatch.setattr(subprocess, "run", run)
+
+    result = cli.invoke(boot.profile_boot)
+
+    assert result.exit_code == 1
+    assert result.output == (
+        "Error: Could not configure Warehouse:\n"
+        "some other output\n"
+        "KeyError: 'warehouse.token'\n"
+    )
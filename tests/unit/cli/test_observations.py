@@ -0,0 +1,26 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pretend
+
+from warehouse.cli.observations import reevaluate_quarantine
+from warehouse.observations.tasks import reevaluate_projects_for_quarantine
+
+
+class TestCLIObservations:
+    def test_reevaluate_quarantine(self, cli):
+        request = pretend.stub()
+        task = pretend.stub(
+            get_request=pretend.call_recorder(lambda *a, **kw: request),
+            run=pretend.call_recorder(lambda *a, **kw: None),
+        )
+        config = pretend.stub(task=pretend.call_recorder(lambda *a, **kw: task))
+
+        result = cli.invoke(reevaluate_quarantine, obj=config)
+
+        assert result.exit_code == 0
+        assert config.task.calls == [
+            pretend.call(reevaluate_projects_for_quarantine),
+            pretend.call(reevaluate_projects_for_quarantine),
+        ]
+        assert task.get_request.calls == [pretend.call()]
+        assert task.run.calls == [pretend.call(request)]
@@ -0,0 +1,19 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pretend
+
+from warehouse.cli import templates as cli_templates
+from warehouse.utils import templates
+
+
+def test_compile(monkeypatch, cli):
+    registry = pretend.stub()
+    config = pretend.stub(registry=registry)
+    compile_templates = pretend.call_recorder(lambda registry: 365)
+    monkeypatch.setattr(templates, "compile_templates", compile_templates)
+
+    result = cli.invoke(cli_templates.compile_, obj=config)
+
+    assert result.exit_code == 0
+    assert result.output == "Loaded 365 templates into the bytecode cache.\n"
+    assert compile_templates.calls == [pretend.call(registry)]
@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import datetime
+import uuid
 
 import celery.exceptions
 import pretend
@@ -81,6 +82,26 @@ def test_redact_ip(unauthenticated_userid, user, remote_addr, expected):
     assert email._redact_ip(request, user_email) == expected
 
 
+def test_redact_ips(pyramid_request):
+    pyramid_request.db = pretend.stub(
+        query=lambda *a: pretend.stub(
+            filter=lambda *a: [
+                ("mine@example.com", "the_users_id"),
+                ("theirs@example.com", "some_other_id"),
+            ]
+        )
+    )
+    pyramid_request._unauthenticated_userid = "the_users_id"
+
+    assert email._redact_ips(
+        pyramid_request, ["mine@example.com", "theirs@example.com", "gone@example.com"]
+    ) == {
+        "mine@example.com": False,
+        "theirs@example.com": True,
+        "gone@example.com": False,
+    }
+
+
 def test_redact_ip_email_not_found():
     request = pretend.stub(
         db=pretend.stub(
@@ -523,6 +544,273 @@ class TestSendEmail:
         assert task.retry.calls == []
 
 
+class TestSendEmails:
+    def test_send_emails(self, db_request, monkeypatch):
+        sent = []
+        sender = pretend.stub(send=lambda recipient, msg: sent.append((recipient, msg)))
+        db_request.find_service = lambda *a, **kw: sender
+
+        user = UserFactory.create()
+        deleted_user_id = str(uuid.uuid4())
+        record_event = pretend.call_recorder(lambda **kw: None)
+        monkeypatch.setattr(type(user), "record_event", record_event)
+
+        def _event(user_id, to):
+            return {
+                "tag": "account:email:sent",
+                "user_id": user_id,
+                "additional": {"to": to, "subject": "subject", "redact_ip": False},
+            }
+
+        email.send_emails(
+            db_request,
+            [{"subject": "subject", "body_text": "body", "body_html": None}],
+            [
+                (
+                    "user <user@example.com>",
+                    0,
+                    _event(str(user.id), "user@example.com"),
+                ),
+                (
+                    "gone <gone@example.com>",
+                    0,
+                    _event(deleted_user_id, "gone@example.com"),
+                ),
+            ],
+        )
+
+        assert [recipient for recipient, _ in sent] == [
+            "user <user@example.com>",
+            "gone <gone@example.com>",
+        ]
+        assert {msg.subject for _, msg in sent} == {"subject"}
+        assert record_event.calls == [
+            pretend.call(
+                request=db_request,
+                tag="account:email:sent",
+                additional={
+                    "to": "user@example.com",
+                    "subject": "subject",
+                    "redact_ip": False,
+                },
+            )
+        ]
+
+    def test_send_emails_failure_retries_individually(self, db_request, monkeypatch):
+        exc = Exception()
+        sentry_sdk = pretend.stub(
+            capture_exception=pretend.call_recorder(lambda s: None)
+        )
+        monkeypatch.setattr(email, "sentry_sdk", sentry_sdk)
+
+        sender = pretend.stub(send=pretend.raiser(exc))
+        db_request.find_service = lambda *a, **kw: sender
+        task = pretend.stub(delay=pretend.call_recorder(lambda *a: None))
+        db_request.task = pretend.call_recorder(lambda fn: task)
+
+        message = {"subject": "subject", "body_text": "body", "body_html": None}
+        event = {"tag": "account:email:sent", "user_id": str(uuid.uuid4())}
+
+        email.send_emails(
+            db_request, [message], [("someone <someone@example.com>", 0, event)]
+        )
+
+        assert sentry_sdk.capture_exception.calls == [pretend.call(exc)]
+        assert db_request.task.calls == [pretend.call(email.send_email)]
+        assert task.delay.calls == [
+            pretend.call("someone <someone@example.com>", message, event)
+        ]
+
+
+class TestEmailBatch:
+    @pytest.fixture
+    def batch_request(self, pyramid_request, monkeypatch):
+        monkeypatch.setattr(
+            email, "_redact_ips", lambda request, emails: dict.fromkeys(emails, False)
+        )
+        task = pretend.stub(delay=pretend.call_recorder(lambda *a: None))
+        pyramid_request.task = pretend.call_recorder(lambda fn: task)
+        pyramid_request.registry.settings = {"mail.sender": "noreply@example.com"}
+        return pyramid_request
+
+    @staticmethod
+    def _user(address, id_):
+        return pretend.stub(
+            name="",
+            username=address.split("@")[0],
+            primary_email=pretend.stub(email=address, verified=True),
+            id=id_,
+        )
+
+    def test_batches_sends(self, batch_request, monkeypatch):
+        monkeypatch.setattr(email, "EMAIL_BATCH_SIZE", 2)
+        users = [self._user(f"user{i}@example.com", i) for i in range(3)]
+        msg = EmailMessage(subject="My Subject", body_text="My Body")
+
+        with email.email_batch(batch_request):
+            for user in users:
+                email._send_email_to_user(batch_request, user, msg)
+                # Sending the same email twice only sends it once.
+                email._send_email_to_user(batch_request, user, msg)
+
+            assert batch_request.task.calls == []
+
+        assert not hasattr(batch_request, "_email_batch")
+        assert batch_request.task.calls == [
+            pretend.call(email.send_emails),
+            pretend.call(email.send_emails),
+        ]
+
+        message = {
+            "subject": "My Subject",
+            "body_text": "My Body",
+            "body_html": None,
+            "sender": None,
+        }
+
+        def _delivery(user):
+            return (
+                f"{user.username} <{user.primary_email.email}>",
+                0,
+                {
+                    "tag": "account:email:sent",
+                    "user_id": user.id,
+                    "additional": {
+                        "from_": "noreply@example.com",
+                        "to": user.primary_email.email,
+                        "subject": "My Subject",
+                        "redact_ip": False,
+                    },
+                },
+            )
+
+        task = batch_request.task(email.send_emails)
+        assert task.delay.calls == [
+            pretend.call([message], [_delivery(users[0]), _delivery(users[1])]),
+            pretend.call([message], [_delivery(users[2])]),
+        ]
+
+    def test_nested_batches_send_once(self, batch_request):
+        user = self._user("user@example.com", 1)
+        msg = EmailMessage(subject="My Subject", body_text="My Body")
+
+        with email.email_batch(batch_request) as outer:
+            with email.email_batch(batch_request) as inner:
+                email._send_email_to_user(batch_request, user, msg)
+            assert inner is outer
+            assert batch_request.task.calls == []
+
+        assert batch_request.task.calls == [pretend.call(email.send_emails)]
+
+    def test_empty_batch_sends_nothing(self, batch_request):
+        with email.email_batch(batch_request):
+            pass
+
+        assert batch_request.task.calls == []
+
+    def test_skips_recently_sent(self, batch_request, pyramid_services):
+        now = datetime.datetime.now()
+        sender = pretend.stub(
+            last_sent_many=pretend.call_recorder(
+                lambda to, subject: {
+                    "recent@example.com": now - datetime.timedelta(seconds=69),
+                    "old@example.com": now - datetime.timedelta(days=1),
+                }
+            )
+        )
+        pyramid_services.register_service(sender, IEmailSender, None, name="")
+
+        recent = self._user("recent@example.com", 1)
+        old = self._user("old@example.com", 2)
+        never = self._user("never@example.com", 3)
+        msg = EmailMessage(subject="My Subject", body_text="My Body")
+
+        with email.email_batch(batch_request):
+            for user in [recent, old, never]:
+                email._send_email_to_user(
+                    batch_request,
+                    user,
+                    msg,
+                    repeat_window=datetime.timedelta(seconds=420),
+                )
+
+        assert sender.last_sent_many.calls == [
+            pretend.call(
+                to=["recent@example.com", "old@example.com", "never@example.com"],
+                subject="My Subject",
+            )
+        ]
+        (call,) = batch_request.task(email.send_emails).delay.calls
+        messages, deliveries = call.args
+        assert [d[2]["additional"]["to"] for d in deliveries] == [
+            "old@example.com",
+            "never@example.com",
+        ]
+
+    def test_all_recently_sent(self, batch_request, pyramid_services):
+        sender = pretend.stub(
+            last_sent_many=lambda to, subject: dict.fromkeys(
+                to, datetime.datetime.now()
+            )
+        )
+        pyramid_services.register_service(sender, IEmailSender, None, name="")
+        msg = EmailMessage(subject="My Subject", body_text="My Body")
+
+        with email.email_batch(batch_request):
+            email._send_email_to_user(
+                batch_request,
+                self._user("user@example.com", 1),
+                msg,
+                repeat_window=datetime.timedelta(seconds=420),
+            )
+
+        assert batch_request.task.calls == []
+
+    def test_distinct_messages(self, batch_request):
+        first = EmailMessage(subject="First", body_text="Body")
+        second = EmailMessage(subject="Second", body_text="Body")
+
+        with email.email_batch(batch_request):
+            email._send_email_to_user(
+                batch_request, self._user("a@example.com", 1), first
+            )
+            email._send_email_to_user(
+                batch_request, self._user("b@example.com", 2), second
+            )
+            email._send_email_to_user(
+                batch_request, self._user("c@example.com", 3), first
+            )
+
+        (call,) = batch_request.task(email.send_emails).delay.calls
+        messages, deliveries = call.args
+        assert [m["subject"] for m in messages] == ["First", "Second"]
+        assert [d[1] for d in deliveries] == [0, 1, 0]
+
+    @pytest.mark.parametrize(
+        ("recipients", "expected_task"),
+        [(1, email.send_email), (2, email.send_emails)],
+    )
+    def test_many_recipients_are_batched(
+        self, batch_request, metrics, monkeypatch, recipients, expected_task
+    ):
+        monkeypatch.setattr(email, "EMAIL_BATCH_THRESHOLD", 2)
+        monkeypatch.setattr(email, "_redact_ip", lambda request, email: False)
+        msg = EmailMessage(subject="My Subject", body_text="My Body")
+        monkeypatch.setattr(
+            EmailMessage, "from_template", lambda *a, **kw: msg, raising=True
+        )
+
+        @email._email("test")
+        def send_test_email(request, users):
+            return {}
+
+        users = [self._user(f"user{i}@example.com", i) for i in range(recipients)]
+        send_test_email(batch_request, users)
+
+        assert set(batch_request.task.calls) == {pretend.call(expected_task)}
+        assert len(metrics.increment.calls) == recipients
+
+
 class TestSendPasswordResetEmail:
     @pytest.mark.parametrize(
         "email_addr",
@@ -151,6 +151,12 @@ class TestSMTPEmailSender:
 
         assert service.last_sent(to=pretend.stub(), subject=pretend.stub) is None
 
+    def test_last_sent_many(self, sender_class):
+        mailer = DummyMailer()
+        service = sender_class(mailer, sender="DevPyPI <noreply@example.com>")
+
+        assert service.last_sent_many(to=[pretend.stub()], subject=pretend.stub) == {}
+
 
 class TestConsoleAndSMTPEmailSender:
     def test_send(self, capsys):
@@ -372,3 +378,31 @@ class TestSESEmailSender:
         sender = SESEmailSender(pretend.stub(), sender=pretend.stub(), db=db_session)
 
         assert sender.last_sent(to, subject) is None
+
+    def test_last_sent_many(self, db_session):
+        subject = "I care about this"
+        resps = iter({"MessageId": str(uuid.uuid4()) + "-ses"} for _ in range(5))
+        aws_client = pretend.stub(send_raw_email=lambda *a, **kw: next(resps))
+        sender = SESEmailSender(
+            aws_client, sender="DevPyPI <noreply@example.com>", db=db_session
+        )
+        for address, subject_ in [
+            ("me@example.com", subject),
+            ("me@example.com", subject),
+            ("you@example.com", subject),
+            ("you@example.com", "I do not care about this"),
+            ("them@example.com", subject),
+        ]:
+            sender.send(
+                f"Foobar <{address}>",
+                EmailMessage(subject=subject_, body_text="This is a plain text body"),
+            )
+
+        last_sent = sender.last_sent_many(
+            ["me@example.com", "you@example.com", "nobody@example.com"], subject
+        )
+
+        assert last_sent == {
+            "me@example.com": sender.last_sent("me@example.com", subject),
+            "you@example.com": sender.last_sent("you@example.com", subject),
+        }
@@ -0,0 +1,20 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pretend
+
+from celery.schedules import crontab
+
+from warehouse import events
+from warehouse.events.tasks import manage_event_partitions
+
+
+def test_includeme():
+    config = pretend.stub(
+        add_periodic_task=pretend.call_recorder(lambda crontab, task: None),
+    )
+
+    events.includeme(config)
+
+    assert config.add_periodic_task.calls == [
+        pretend.call(crontab(minute=15, hour=2), manage_event_partitions)
+    ]
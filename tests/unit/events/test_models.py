@@ -1,11 +1,15 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import pretend
 import pytest
+import zope.sqlalchemy
 
+from warehouse.events import models
 from warehouse.events.models import GeoIPInfo, UserAgentInfo
 from warehouse.events.tags import EventTag
+from warehouse.packaging.models import Project
 
-from ...common.db.packaging import FileFactory
+from ...common.db.packaging import FileFactory, ProjectFactory
 
 
 class TestGeoIPInfo:
@@ -324,3 +328,94 @@ class TestUserAgentInfo:
         file = FileFactory.create()
         file.record_event(tag=EventTag.File.FileAdd, request=db_request)
         assert file.events[0].user_agent_info == expected
+
+    def test_caches_parsed_user_agents(self, monkeypatch):
+        models._parse_user_agent.cache_clear()
+        parsed = pretend.stub(installer=None, implementation=None, system=None)
+        parse = pretend.call_recorder(lambda user_agent: parsed)
+        monkeypatch.setattr(models.linehaul_user_agent_parser, "parse", parse)
+
+        for _ in range(3):
+            assert models._parse_user_agent("some-client/1.0") == {
+                "installer": None,
+                "implementation": None,
+                "system": None,
+            }
+
+        assert parse.calls == [pretend.call("some-client/1.0")]
+        models._parse_user_agent.cache_clear()
+
+
+class TestPendingEvents:
+    def test_inserts_events_together(self, db_request, query_recorder):
+        project = ProjectFactory.create()
+        files = FileFactory.create_batch(2)
+
+        with query_recorder:
+            project.record_event(tag=EventTag.Project.ProjectCreate, request=db_request)
+            for file in files:
+                file.record_event(tag=EventTag.File.FileAdd, request=db_request)
+            # Nothing is written until we next query the database
+            assert query_recorder.queries == []
+
+            assert [event.tag for event in project.events] == [
+                EventTag.Project.ProjectCreate
+            ]
+
+        # One INSERT for each kind of event, and then our query
+        assert len(query_recorder.queries) == 3
+        for file in files:
+            assert [event.tag for event in file.events] == [EventTag.File.FileAdd]
+        assert models.PENDING_EVENTS_KEY not in db_request.db.info
+
+    def test_inserts_events_on_commit(self, db_request):
+        project = ProjectFactory.create()
+        project_id = project.id
+        zope.sqlalchemy.register(db_request.db, transaction_manager=db_request.tm)
+
+        # Recording the event is the only thing that this transaction does.
+        project.record_event(tag=EventTag.Project.ProjectCreate, request=db_request)
+        db_request.tm.commit()
+        db_request.tm.begin()
+
+        assert (
+            db_request.db.query(Project.Event).filter_by(source_id=project_id).count()
+            == 1
+        )
+
+    def test_skips_events_for_deleted_sources(self, db_request):
+        project = ProjectFactory.create()
+        project.record_event(tag=EventTag.Project.ProjectCreate, request=db_request)
+        db_request.db.delete(project)
+
+        assert db_request.db.query(project.Event).count() == 0
+
+    def test_inserts_events_before_commit(self, db_request, monkeypatch):
+        insert = pretend.call_recorder(lambda session: None)
+        monkeypatch.setattr(models, "_insert_pending_events", insert)
+
+        models.insert_pending_events_before_commit(None, db_request.db)
+
+        assert insert.calls == [pretend.call(db_request.db)]
+
+    def test_no_inserts_while_flushing(self, db_request, monkeypatch):
+        insert = pretend.call_recorder(lambda session: None)
+        monkeypatch.setattr(models, "_insert_pending_events", insert)
+        db_request.db.info[models.PENDING_EVENTS_KEY] = [pretend.stub()]
+        state = pretend.stub(
+            session=pretend.stub(
+                info=db_request.db.info, autoflush=True, _flushing=True
+            )
+        )
+
+        models.insert_pending_events_before_query(None, state)
+
+        assert insert.calls == []
+        db_request.db.info.pop(models.PENDING_EVENTS_KEY)
+
+    def test_discards_events_on_rollback(self):
+        session = pretend.stub(info={models.PENDING_EVENTS_KEY: [pretend.stub()]})
+
+        models.discard_pending_events(None, session, pretend.stub())
+
+        assert session.info == {}
@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import contextlib
+import datetime
+
+import freezegun
+import pretend
+import zope.sqlalchemy
+
+from sqlalchemy.exc import OperationalError
+
+from warehouse.accounts.models import User
+from warehouse.events import tasks
+from warehouse.events.models import HasEvents
+
+from ...common.db.accounts import UserFactory
+
+
+def test_add_months():
+    assert tasks._add_months(datetime.date(2026, 1, 1), 1) == datetime.date(2026, 2, 1)
+    assert tasks._add_months(datetime.date(2026, 11, 1), 3) == datetime.date(2027, 2, 1)
+    assert tasks._add_months(datetime.date(2026, 3, 1), -3) == datetime.date(
+        2025, 12, 1
+    )
+
+
+class TestManageEventPartitions:
+    def test_creates_partitions_ahead(self, db_request, monkeypatch):
+        monkeypatch.setattr(tasks, "PARTITION_MONTHS_AHEAD", 12)
+        db_request.registry.settings = {}
+
+        tasks.manage_event_partitions(db_request)
+
+        this_month = datetime.date.today().replace(day=1)
+        horizon = datetime.datetime.combine(
+            tasks._add_months(this_month, 13), datetime.time()
+        )
+        for model in HasEvents.__subclasses__():
+            table_name = model.Event.__tablename__
+            partitions = tasks._partitions(db_request.db, table_name)
+            assert max(partitions.values()) == horizon
+            assert f"{table_name}_legacy" in partitions
+
+        # Running it again has nothing left to do.
+        tasks.manage_event_partitions(db_request)
+
+    def test_partitions_are_committed(self, db_request, monkeypatch):
+        monkeypatch.setattr(tasks, "PARTITION_MONTHS_AHEAD", 12)
+        db_request.registry.settings = {}
+        zope.sqlalchemy.register(db_request.db, transaction_manager=db_request.tm)
+
+        tasks.manage_event_partitions(db_request)
+        db_request.tm.commit()
+        db_request.tm.begin()
+
+        this_month = datetime.date.today().replace(day=1)
+        horizon = datetime.datetime.combine(
+            tasks._add_months(this_month, 13), datetime.time()
+        )
+        for model in HasEvents.__subclasses__():
+            partitions = tasks._partitions(db_request.db, model.Event.__tablename__)
+            assert max(partitions.values()) == horizon
+
+    def test_events_are_written_to_partitions(self, db_request):
+        user = UserFactory.create()
+        user.record_event(tag="account:login:success", request=db_request)
+
+        assert db_request.db.query(User.Event).filter_by(source=user).count() == 1
+
+    def test_without_retention_keeps_partitions(self, db_request):
+        db_request.registry.settings = {}
+        partitions = tasks._partitions(db_request.db, User.Event.__tablename__)
+
+        later = datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=3650)
+        with freezegun.freeze_time(later):
+            tasks.manage_event_partitions(db_request)
+
+        assert (
+            partitions.keys()
+            <= tasks._partitions(db_request.db, User.Event.__tablename__).keys()
+        )
+
+    def test_drops_expired_partitions(self, db_request):
+        db_request.registry.settings = {"events.retention_days": 365}
+        user = UserFactory.create()
+        user.record_event(tag="account:login:success", request=db_request)
+
+        later = datetime.datetime.now(datetime.UTC) + datetime.timedelta(days=730)
+        with freezegun.freeze_time(later):
+            tasks.manage_event_partitions(db_request)
+
+        for model in HasEvents.__subclasses__():
+            table_name = model.Event.__tablename__
+            partitions = tasks._partitions(db_request.db, table_name)
+            assert f"{table_name}_legacy" not in partitions
+            assert min(partitions.values()) > later.replace(tzinfo=None) - (
+                datetime.timedelta(days=365)
+            )
+
+        assert db_request.db.query(User.Event).count() == 0
+
+
+def test_skips_partitions_it_cannot_lock(monkeypatch):
+    monkeypatch.setattr(zope.sqlalchemy, "mark_changed", lambda *a, **kw: None)
+    monkeypatch.setattr(
+        tasks,
+        "_partitions",
+        lambda db, table_name: {
+            f"{table_name}_legacy": datetime.datetime(2000, 1, 1),
+            f"{table_name}_y2100m01": datetime.datetime(2100, 2, 1),
+        },
+    )
+
+    executed = []
+
+    def execute(statement):
+        executed.append(str(statement))
+        if str(statement).startswith("DROP"):
+            raise OperationalError(str(statement), {}, Exception("lock timeout"))
+
+    request = pretend.stub(
+        db=pretend.stub(execute=execute, begin_nested=contextlib.nullcontext),
+        tm=pretend.stub(),
+        registry=pretend.stub(settings={"events.retention_days": 365}),
+    )
+
+    tasks.manage_event_partitions(request)
+
+    assert executed == [
+        f"SET LOCAL lock_timeout = '{tasks.PARTITION_LOCK_TIMEOUT}'",
+        *(
+            f"DROP TABLE {model.Event.__tablename__}_legacy"
+            for model in HasEvents.__subclasses__()
+        ),
+    ]
+
+
+def test_partitions_ignores_default_partition():
+    db = pretend.stub(
+        execute=lambda *a, **kw: [
+            ("foo_events_default", "DEFAULT"),
+            (
+                "foo_events_y2026m11",
+                "FOR VALUES FROM ('2026-11-01 00:00:00') TO ('2026-12-01 00:00:00')",
+            ),
+            (
+                "foo_events_legacy",
+                "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00')",
+            ),
+        ]
+    )
+
+    assert tasks._partitions(db, "foo_events") == {
+        "foo_events_y2026m11": datetime.datetime(2026, 12, 1),
+        "foo_events_legacy": datetime.datetime(2026, 11, 1),
+    }
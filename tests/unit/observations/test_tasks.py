@@ -7,6 +7,7 @@ from warehouse.observations.models import ObservationKind
 from warehouse.observations.tasks import (
     evaluate_project_for_quarantine,
     react_to_observation_created,
+    reevaluate_projects_for_quarantine,
     report_observation_to_helpscout,
 )
 from warehouse.packaging.models import LifecycleStatus
@@ -226,3 +227,69 @@ class TestAutoQuarantineProject:
                 "Auto-quarantining project due to multiple malware observations."
             ),
         ]
+
+
+class TestReevaluateProjectsForQuarantine:
+    def test_reevaluates_projects_with_open_malware_reports(
+        self, db_request, notification_service, monkeypatch
+    ):
+        task = pretend.stub(name="dummy_task")
+        observer = UserFactory.create(is_observer=True)
+        users = UserFactory.create_batch(2)
+        db_request.route_url = pretend.call_recorder(
+            lambda *args, **kw: "/project/spam/"
+        )
+        db_request.user = observer
+
+        def _observe(project, actor, kind=ObservationKind.IsMalware):
+            return project.record_observation(
+                request=db_request,
+                kind=kind,
+                summary="Project Observation",
+                payload={},
+                actor=actor,
+            )
+
+        # Reported by an observer and another user, so should be quarantined
+        malware = ProjectFactory.create()
+        ReleaseFactory.create(project=malware)
+        _observe(malware, observer)
+        _observe(malware, users[0])
+
+        # Reported twice, but only by users that aren't observers
+        no_observer = ProjectFactory.create()
+        _observe(no_observer, users[0])
+        _observe(no_observer, users[1])
+
+        # Reported twice, but by the same observer
+        one_observer = ProjectFactory.create()
+        _observe(one_observer, observer)
+        _observe(one_observer, observer)
+
+        # Reported by an observer and another user, but not as malware
+        not_malware = ProjectFactory.create()
+        _observe(not_malware, observer, kind=ObservationKind.IsSpam)
+        _observe(not_malware, users[0], kind=ObservationKind.IsSpam)
+
+        # Reported, but already quarantined
+        quarantined = ProjectFactory.create(
+            lifecycle_status=LifecycleStatus.QuarantineEnter
+        )
+        _observe(quarantined, observer)
+
+        db_request.db.flush()
+
+        ns_svc_spy = pretend.call_recorder(lambda *args, **kwargs: None)
+        monkeypatch.setattr(notification_service, "send_notification", ns_svc_spy)
+
+        reevaluate_projects_for_quarantine(task, db_request)
+
+        assert len(ns_svc_spy.calls) == 1
+        assert malware.lifecycle_status == LifecycleStatus.QuarantineEnter
+        for project in [no_observer, one_observer, not_malware]:
+            assert project.lifecycle_status != LifecycleStatus.QuarantineEnter
+        assert sorted(call.args[0] for call in db_request.log.info.calls) == [
+            "Auto-quarantining project due to multiple malware observations.",
+            "Project has fewer than 2 observers. Not quarantining.",
+            "Project has no `User.is_observer` Observers. Not quarantining.",
+        ]
@@ -149,6 +149,40 @@ class TestGitHubPublisher:
                 == workflow
             )
 
+    @pytest.mark.parametrize(
+        ("environment", "expected"),
+        [
+            (None, ""),
+            ("Staging", "staging"),
+            ("production", "production"),
+            ("missing", ""),
+        ],
+    )
+    def test_lookup_selects_environment(self, db_request, environment, expected):
+        for publisher_environment in ["", "staging", "production"]:
+            GitHubPublisherFactory(
+                repository_owner="foo",
+                repository_name="bar",
+                repository_owner_id="1234",
+                workflow_filename="release.yml",
+                environment=publisher_environment,
+            )
+        signed_claims = {
+            "repository": "foo/bar",
+            "job_workflow_ref": (
+                "foo/bar/.github/workflows/release.yml@refs/heads/main"
+            ),
+            "repository_owner_id": "1234",
+        }
+        if environment:
+            signed_claims["environment"] = environment
+
+        publisher = github.GitHubPublisher.lookup_by_claims(
+            db_request.db, signed_claims
+        )
+
+        assert publisher.environment == expected
+
     def test_lookup_no_matching_publishers(self, db_request):
         GitHubPublisherFactory(
             id="aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
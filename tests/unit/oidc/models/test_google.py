@@ -198,6 +198,23 @@ class TestGooglePublisher:
                 )
             assert str(e.value) == "Check failed for optional claim 'sub'"
 
+    @pytest.mark.parametrize(
+        ("sub", "expected"),
+        [(None, ""), ("fakesubject", "fakesubject"), ("othersubject", "")],
+    )
+    def test_lookup_selects_sub(self, db_request, sub, expected):
+        for publisher_sub in ["", "fakesubject", "anothersubject"]:
+            GooglePublisherFactory(email="fake@example.com", sub=publisher_sub)
+        signed_claims = {"email": "fake@example.com", "email_verified": True}
+        if sub:
+            signed_claims["sub"] = sub
+
+        publisher = google.GooglePublisher.lookup_by_claims(
+            db_request.db, signed_claims
+        )
+
+        assert publisher.sub == expected
+
     def test_lookup_no_matching_publishers(self, db_request):
         signed_claims = {
             "email": "fake@example.com",
@@ -17,6 +17,12 @@ from warehouse.oidc import errors, interfaces, services
 from warehouse.oidc.interfaces import SignedClaims
 
 
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    services._redis_clients.clear()
+    services._key_cache.clear()
+
+
 def test_oidc_publisher_service_factory(metrics):
     factory = services.OIDCPublisherServiceFactory(
         publisher="example", issuer_url="https://example.com"
@@ -650,6 +656,53 @@ class TestOIDCPublisherService:
 
         assert metrics.increment.calls == []
 
+    def test_get_key_cached_in_process(self, metrics, monkeypatch):
+        service = services.OIDCPublisherService(
+            session=pretend.stub(),
+            publisher="example",
+            issuer_url="https://example.com",
+            audience="fakeaudience",
+            cache_url="rediss://fake.example.com",
+            metrics=metrics,
+        )
+
+        keyset = {
+            "fake-key-id": {
+                "kid": "fake-key-id",
+                "n": "ZHVtbXkK",
+                "kty": "RSA",
+                "alg": "RS256",
+                "e": "AQAB",
+            }
+        }
+        get_keyset = pretend.call_recorder(lambda: (keyset, True))
+        monkeypatch.setattr(service, "_get_keyset", get_keyset)
+        monkeypatch.setattr(services.time, "monotonic", lambda: 1000)
+
+        key = service._get_key("fake-key-id")
+        assert service._get_key("fake-key-id") is key
+        assert get_keyset.calls == [pretend.call()]
+
+        # Other publishers don't share our keys, even with the same key ID.
+        other = services.OIDCPublisherService(
+            session=pretend.stub(),
+            publisher="other",
+            issuer_url="https://other.example.com",
+            audience="fakeaudience",
+            cache_url="rediss://fake.example.com",
+            metrics=metrics,
+        )
+        monkeypatch.setattr(other, "_get_keyset", lambda: ({}, True))
+        monkeypatch.setattr(other, "_refresh_keyset", lambda: {})
+        assert other._get_key("fake-key-id") is None
+
+        # Once our cached key expires, we check the shared keyset again.
+        monkeypatch.setattr(
+            services.time, "monotonic", lambda: 1000 + services.KEY_CACHE_TTL
+        )
+        assert service._get_key("fake-key-id") is not key
+        assert get_keyset.calls == [pretend.call(), pretend.call()]
+
     def test_get_key_refresh_fails(self, metrics, monkeypatch):
         service = services.OIDCPublisherService(
             session=pretend.stub(),
@@ -757,6 +810,24 @@ class TestOIDCPublisherService:
 
         assert service.jwt_identifier_exists(jwt_identifier) is True
 
+    def test_redis_client_reused(self, metrics, monkeypatch):
+        client = pretend.stub(exists=lambda key: False)
+        strict_redis = pretend.stub(from_url=pretend.call_recorder(lambda url: client))
+        monkeypatch.setattr(services.redis, "StrictRedis", strict_redis)
+
+        for publisher in ["example", "other"]:
+            service = services.OIDCPublisherService(
+                session=pretend.stub(),
+                publisher=publisher,
+                issuer_url=pretend.stub(),
+                audience="fakeaudience",
+                cache_url="redis://fake.example.com",
+                metrics=metrics,
+            )
+            assert service.jwt_identifier_exists("fake-jti-token") is False
+
+        assert strict_redis.from_url.calls == [pretend.call("redis://fake.example.com")]
+
 
 class TestNullOIDCPublisherService:
     def test_interface_matches(self):
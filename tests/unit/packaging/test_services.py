@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import gzip
 import hashlib
 import io
 import os.path
@@ -14,6 +15,7 @@ from zope.interface.verify import verifyClass
 
 import warehouse.packaging.services
 
+from warehouse.packaging import typosnyper
 from warehouse.packaging.interfaces import (
     IDocsStorage,
     IFileStorage,
@@ -41,6 +43,7 @@ from warehouse.packaging.services import (
     S3FileStorage,
     project_service_factory,
 )
+from warehouse.packaging.typosnyper import TypoIndex
 
 from ...common.db.packaging import ProhibitedProjectFactory, ProjectFactory
 
@@ -976,6 +979,50 @@ class TestGCSSimpleStorage:
 
         assert blob.metadata == meta
 
+    def test_create_service_with_content_encoding(self):
+        bucket = pretend.stub()
+        service = pretend.stub(get_bucket=lambda bucket_name: bucket)
+        request = pretend.stub(
+            find_service=lambda name: service,
+            registry=pretend.stub(
+                settings={
+                    "simple.bucket": "froblob",
+                    "simple.content_encoding": "gzip",
+                }
+            ),
+        )
+        storage = GCSSimpleStorage.create_service(None, request)
+
+        assert storage.bucket is bucket
+        assert storage.content_encoding == "gzip"
+
+    def test_unsupported_content_encoding(self):
+        with pytest.raises(ValueError, match="Unsupported content encoding: 'br'"):
+            GCSSimpleStorage(pretend.stub(), content_encoding="br")
+
+    def test_stores_compressed_file(self, tmpdir):
+        filename = str(tmpdir.join("testfile.txt"))
+        with open(filename, "wb") as fp:
+            fp.write(b"Test File!")
+
+        uploaded = []
+
+        def upload_from_filename(file_path):
+            with open(file_path, "rb") as fp:
+                uploaded.append(fp.read())
+
+        blob = pretend.stub(
+            upload_from_filename=upload_from_filename, exists=lambda: False
+        )
+        bucket = pretend.stub(blob=pretend.call_recorder(lambda path: blob))
+        storage = GCSSimpleStorage(bucket, content_encoding="gzip")
+        storage.store("foo/bar.txt", filename, meta={"foo": "bar"})
+
+        assert bucket.blob.calls == [pretend.call("foo/bar.txt")]
+        assert blob.metadata == {"foo": "bar"}
+        assert blob.content_encoding == "gzip"
+        assert [gzip.decompress(body) for body in uploaded] == [b"Test File!"]
+
 
 class TestGenericLocalBlobStorage:
     def test_notimplementederror(self):
@@ -1049,6 +1096,23 @@ class TestProjectService:
         with pytest.raises(ProjectNameUnavailableTypoSquattingError):
             service.check_project_name("numpi")
 
+    def test_check_project_name_typosquatting_cached_index(
+        self, db_session, monkeypatch
+    ):
+        monkeypatch.setattr(typosnyper, "_cached_index", None)
+        index = TypoIndex({"flask"})
+        service = ProjectService(
+            session=db_session,
+            query_results_cache={
+                "top_dependents_corpus_version": index.version,
+                "top_dependents_corpus_index": index.to_dict(),
+            },
+        )
+
+        with pytest.raises(ProjectNameUnavailableTypoSquattingError) as exc:
+            service.check_project_name("flaskk")
+        assert exc.value.existing_project_name == "flask"
+
     def test_check_project_name_ok(self, db_session):
         service = ProjectService(session=db_session)
 
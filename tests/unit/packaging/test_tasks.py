@@ -13,6 +13,7 @@ from wtforms import Field, Form, StringField
 import warehouse.packaging.tasks
 
 from warehouse.accounts.models import WebAuthn
+from warehouse.cache.interfaces import IQueryResultsCache
 from warehouse.packaging.models import DependencyKind, Description
 from warehouse.packaging.tasks import (
     check_file_cache_tasks_outstanding,
@@ -24,6 +25,7 @@ from warehouse.packaging.tasks import (
     update_description_html,
     update_release_description,
 )
+from warehouse.packaging.typosnyper import TypoIndex
 from warehouse.utils import readme
 from warehouse.utils.row_counter import compute_row_counts
 
@@ -751,3 +753,8 @@ def test_compute_top_dependents_corpus(db_request, project_name, specifier_strin
     results = compute_top_dependents_corpus(db_request)
 
     assert results == {base_proj.normalized_name: 2}
+
+    cache = db_request.find_service(IQueryResultsCache)
+    index = TypoIndex.from_dict(cache.get("top_dependents_corpus_index"))
+    assert index.version == cache.get("top_dependents_corpus_version")
+    assert index.names == {base_proj.normalized_name}
@@ -1,8 +1,23 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import orjson
+import pretend
 import pytest
 
-from warehouse.packaging.typosnyper import typo_check_name
+from warehouse.packaging import typosnyper
+from warehouse.packaging.typosnyper import TypoIndex, get_index, typo_check_name
+
+# Set known entries corpus entries for testing
+TEST_NAMES_CORPUS = frozenset(
+    {
+        "numpy",
+        "requests",
+        "sphinx",
+        "beautifulsoup4",
+        "jinja2",
+        "python-dateutil",
+    }
+)
 
 
 @pytest.mark.parametrize(
@@ -23,14 +38,109 @@ from warehouse.packaging.typosnyper import typo_check_name
     ],
 )
 def test_typo_check_name(name, expected):
-    # Set known entries corpus entries for testing
-    test_names_corpus = {
-        "numpy",
-        "requests",
-        "sphinx",
-        "beautifulsoup4",
-        "jinja2",
+    assert typo_check_name(name, corpus=TEST_NAMES_CORPUS) == expected
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("nuumpy", ("repeated_characters", "numpy")),
+        ("sphnx", ("omitted_characters", "sphinx")),
+        ("dateutil-python", ("swapped_words", "python-dateutil")),
+        ("numpi", ("common_typos", "numpy")),
+        ("python-dateutil", None),
+    ],
+)
+def test_typo_check_name_hash_collisions(monkeypatch, name, expected):
+    # Every variant collides, so every indexed name is a candidate
+    monkeypatch.setattr(typosnyper, "_variant_hash", lambda variant: 0)
+
+    assert typo_check_name(name, corpus=TypoIndex(TEST_NAMES_CORPUS)) == expected
+
+
+def test_typo_check_name_default_corpus():
+    assert typo_check_name("reqeusts") == ("swapped_characters", "requests")
+
+
+@pytest.mark.parametrize(
+    ("name", "corpus", "expected"),
+    [
+        # Inserting at the earliest position wins
+        ("abcde", {"abcdef", "xabcde"}, ("omitted_characters", "xabcde")),
+        # Then the earliest allowed character
+        ("abcde", {"abcdez", "abcdea"}, ("omitted_characters", "abcdea")),
+        # Then the earliest permutation of words
+        ("c-b-a", {"a-b-c", "a-c-b", "b-a-c"}, ("swapped_words", "b-a-c")),
+        ("a-b-a", {"a-a-b", "b-a-a"}, ("swapped_words", "a-a-b")),
+        # There is no limit on the number of words
+        (
+            "a-b-c-d-e-f-g-h-i",
+            {"i-h-g-f-e-d-c-b-a"},
+            ("swapped_words", "i-h-g-f-e-d-c-b-a"),
+        ),
+    ],
+)
+def test_typo_check_name_ordering(name, corpus, expected):
+    assert typo_check_name(name, corpus=corpus) == expected
+
+
+def test_typo_index_too_large(monkeypatch):
+    monkeypatch.setattr(typosnyper, "_NAME_MASK", 1)
+
+    with pytest.raises(ValueError, match="Corpus is too large"):
+        TypoIndex({"a", "b"})
+
+
+def test_typo_index_round_trip():
+    index = TypoIndex(TEST_NAMES_CORPUS)
+    loaded = TypoIndex.from_dict(orjson.loads(orjson.dumps(index.to_dict())))
+
+    assert loaded.version == index.version
+    assert loaded.names == TEST_NAMES_CORPUS
+    assert typo_check_name("sphnx", corpus=loaded) == ("omitted_characters", "sphinx")
+    assert typo_check_name("dateutil-python", corpus=loaded) == (
+        "swapped_words",
         "python-dateutil",
-    }
+    )
+
+
+def test_typo_index_version():
+    index = TypoIndex(TEST_NAMES_CORPUS)
+
+    assert TypoIndex(dict.fromkeys(TEST_NAMES_CORPUS, 1)).version == index.version
+    assert TypoIndex(TEST_NAMES_CORPUS | {"flask"}).version != index.version
+
+
+class TestGetIndex:
+    @pytest.fixture(autouse=True)
+    def reset_cached_index(self, monkeypatch):
+        monkeypatch.setattr(typosnyper, "_cached_index", None)
+
+    def test_reuses_index(self):
+        data = TypoIndex(TEST_NAMES_CORPUS).to_dict()
+        load = pretend.call_recorder(lambda: data)
+
+        index = get_index(data["version"], load)
+
+        assert get_index(data["version"], load) is index
+        assert index.names == TEST_NAMES_CORPUS
+        assert load.calls == [pretend.call()]
+
+    def test_reloads_changed_index(self):
+        data = TypoIndex(TEST_NAMES_CORPUS).to_dict()
+        changed_data = TypoIndex(TEST_NAMES_CORPUS | {"flask"}).to_dict()
+
+        index = get_index(data["version"], lambda: data)
+        changed = get_index(changed_data["version"], lambda: changed_data)
+
+        assert changed is not index
+        assert changed.names == TEST_NAMES_CORPUS | {"flask"}
+
+    def test_no_version(self):
+        load = pretend.call_recorder(lambda: None)
+
+        assert get_index(None, load) is None
+        assert load.calls == []
 
-    assert typo_check_name(name, corpus=test_names_corpus) == expected
+    def test_no_index(self):
+        assert get_index("missing", lambda: None) is None
@@ -12,6 +12,7 @@ from ...common.db.accounts import UserFactory
 from ...common.db.classifiers import ClassifierFactory
 from ...common.db.packaging import (
     DescriptionFactory,
+    FileEventFactory,
     FileFactory,
     ProjectFactory,
     ReleaseFactory,
@@ -200,21 +201,25 @@ class TestReleaseDetail:
 
         result = views.release_detail(releases[1], db_request)
 
+        all_versions = [
+            (r.version, r.created, r.is_prerelease, r.yanked, r.yanked_reason)
+            for r in reversed(releases)
+        ]
+
         assert result == {
             "project": project,
             "release": releases[1],
             "files": [files[1]],
             "sdists": [files[1]],
             "bdists": [],
+            "trusted_publisher_files": set(),
             "description": "rendered description",
-            "latest_version": project.latest_version,
-            "all_versions": [
-                (r.version, r.created, r.is_prerelease, r.yanked, r.yanked_reason)
-                for r in reversed(releases)
-            ],
+            "latest_version": all_versions[2],
+            "all_versions": all_versions,
             "maintainers": sorted(users, key=lambda u: u.username.lower()),
             "license": None,
             "PEP740AttestationViewer": views.PEP740AttestationViewer,
+            "wheel_filters": {},
             "wheel_filters_all": {"interpreters": [], "abis": [], "platforms": []},
             "wheel_filters_params": {
                 "filename": "",
@@ -253,6 +258,75 @@ class TestReleaseDetail:
             {"interpreters": ["cp39"], "abis": ["none"], "platforms": ["any"]},
             {"interpreters": ["cp27"], "abis": ["none"], "platforms": ["any"]},
         ]
+        assert [result["wheel_filters"][file.filename] for file in result["files"]] == [
+            file.wheel_filters for file in result["files"]
+        ]
+        assert result["wheel_filters_all"] == {
+            "interpreters": ["cp27", "cp310", "cp39"],
+            "abis": ["none"],
+            "platforms": ["any"],
+        }
+
+    def test_detail_trusted_publisher_files(self, db_request):
+        project = ProjectFactory.create()
+        release = ReleaseFactory.create(project=project, version="1.0")
+        files = [
+            FileFactory.create(
+                release=release,
+                filename=f"{project.name}-1.0-py{n}-none-any.whl",
+                packagetype="bdist_wheel",
+            )
+            for n in range(4)
+        ]
+        FileEventFactory.create(
+            source=files[0], additional={"uploaded_via_trusted_publisher": True}
+        )
+        FileEventFactory.create(
+            source=files[1], additional={"publisher_url": "https://example.com"}
+        )
+        FileEventFactory.create(
+            source=files[2], additional={"uploaded_via_trusted_publisher": False}
+        )
+
+        result = views.release_detail(release, db_request)
+
+        assert result["trusted_publisher_files"] == {files[0].id, files[1].id}
+        assert {f.id for f in files if f.uploaded_via_trusted_publisher} == result[
+            "trusted_publisher_files"
+        ]
+
+    @pytest.mark.parametrize("num_files", [1, 25])
+    def test_detail_query_budget(self, db_request, query_recorder, num_files):
+        project = ProjectFactory.create()
+        releases = [
+            ReleaseFactory.create(project=project, version=f"{n}.0") for n in range(5)
+        ]
+        release = releases[-1]
+        FileFactory.create(
+            release=release,
+            filename=f"{project.name}-{release.version}.tar.gz",
+            packagetype="sdist",
+        )
+        for n in range(num_files):
+            file_ = FileFactory.create(
+                release=release,
+                filename=f"{project.name}-{release.version}-cp3{n}-none-any.whl",
+                packagetype="bdist_wheel",
+            )
+            FileEventFactory.create(
+                source=file_, additional={"uploaded_via_trusted_publisher": True}
+            )
+        for _ in range(3):
+            RoleFactory.create(project=project)
+        db_request.db.flush()
+        db_request.db.expire_all()
+
+        with query_recorder:
+            views.release_detail(release, db_request)
+
+        # The number of queries needed to load the release detail page must not
+        # depend on the number of files, versions, or maintainers.
+        assert len(query_recorder.queries) <= views.RELEASE_DETAIL_QUERY_BUDGET
 
     def test_license_from_classifier(self, db_request):
         """A license label is added when a license classifier exists."""
@@ -324,6 +398,32 @@ class TestReleaseDetail:
         )
 
 
+class TestLatestVersion:
+    @pytest.mark.parametrize(
+        ("all_versions", "expected"),
+        [
+            ([], None),
+            (
+                [("3.0", True, False), ("2.0", False, False), ("1.0", False, False)],
+                "2.0",
+            ),
+            ([("2.0", True, False), ("1.0", True, False)], "2.0"),
+            ([("3.0", False, True), ("2.0", True, False)], "2.0"),
+            ([("2.0", None, False), ("1.0", True, False)], "1.0"),
+            ([("2.0", False, True)], None),
+        ],
+    )
+    def test_latest_version(self, all_versions, expected):
+        all_versions = [
+            pretend.stub(version=v, is_prerelease=p, yanked=y)
+            for v, p, y in all_versions
+        ]
+
+        latest = views._latest_version(all_versions)
+
+        assert (latest.version if latest is not None else None) == expected
+
+
 class TestPEP740AttestationViewer:
 
     @pytest.fixture
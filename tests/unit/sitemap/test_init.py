@@ -0,0 +1,44 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import pretend
+
+from celery.schedules import crontab
+
+from warehouse import sitemap
+from warehouse.sitemap.interfaces import ISitemapStorage
+from warehouse.sitemap.tasks import generate_sitemaps
+
+
+def test_includeme():
+    storage_class = pretend.stub(create_service=pretend.stub())
+    config = pretend.stub(
+        maybe_dotted=pretend.call_recorder(lambda path: storage_class),
+        register_service_factory=pretend.call_recorder(lambda factory, iface: None),
+        add_periodic_task=pretend.call_recorder(lambda crontab, task: None),
+        registry=pretend.stub(settings={"sitemap.backend": "foo.bar"}),
+    )
+
+    sitemap.includeme(config)
+
+    assert config.maybe_dotted.calls == [pretend.call("foo.bar")]
+    assert config.register_service_factory.calls == [
+        pretend.call(storage_class.create_service, ISitemapStorage)
+    ]
+    assert config.add_periodic_task.calls == [
+        pretend.call(crontab(minute=30), generate_sitemaps)
+    ]
+
+
+def test_includeme_without_backend():
+    config = pretend.stub(
+        maybe_dotted=pretend.call_recorder(lambda path: None),
+        register_service_factory=pretend.call_recorder(lambda factory, iface: None),
+        add_periodic_task=pretend.call_recorder(lambda crontab, task: None),
+        registry=pretend.stub(settings={}),
+    )
+
+    sitemap.includeme(config)
+
+    assert config.maybe_dotted.calls == []
+    assert config.register_service_factory.calls == []
+    assert config.add_periodic_task.calls == []
@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import google.api_core.exceptions
+import pretend
+import pytest
+
+from zope.interface.verify import verifyClass
+
+from warehouse.sitemap.interfaces import ISitemapStorage
+from warehouse.sitemap.services import GCSSitemapStorage, LocalSitemapStorage
+
+
+class TestLocalSitemapStorage:
+    def test_verify_service(self):
+        assert verifyClass(ISitemapStorage, LocalSitemapStorage)
+
+    def test_create_service(self):
+        request = pretend.stub(
+            registry=pretend.stub(settings={"sitemap.path": "/sitemap/one/two/"})
+        )
+        storage = LocalSitemapStorage.create_service(None, request)
+        assert storage.base == "/sitemap/one/two/"
+
+    def test_stores_and_gets_file(self, tmpdir):
+        filename = str(tmpdir.join("testfile.txt"))
+        with open(filename, "wb") as fp:
+            fp.write(b"Test File!")
+
+        storage = LocalSitemapStorage(str(tmpdir.join("storage")))
+        storage.store("0a.sitemap.xml", filename)
+
+        assert storage.get("0a.sitemap.xml").read() == b"Test File!"
+
+    def test_removes_file(self, tmpdir):
+        tmpdir.join("0a.sitemap.xml").write("<urlset/>")
+        storage = LocalSitemapStorage(str(tmpdir))
+
+        storage.remove("0a.sitemap.xml")
+        storage.remove("1f.sitemap.xml")
+
+        assert not tmpdir.join("0a.sitemap.xml").exists()
+
+
+class TestGCSSitemapStorage:
+    def test_verify_service(self):
+        assert verifyClass(ISitemapStorage, GCSSitemapStorage)
+
+    def test_create_service(self):
+        service = pretend.stub(
+            get_bucket=pretend.call_recorder(lambda bucket_name: pretend.stub())
+        )
+        request = pretend.stub(
+            find_service=pretend.call_recorder(lambda name: service),
+            registry=pretend.stub(
+                settings={"sitemap.bucket": "froblob", "sitemap.prefix": "sitemap/"}
+            ),
+        )
+        storage = GCSSitemapStorage.create_service(None, request)
+
+        assert request.find_service.calls == [pretend.call(name="gcloud.gcs")]
+        assert service.get_bucket.calls == [pretend.call("froblob")]
+        assert storage.prefix == "sitemap/"
+
+    def test_gets_file(self):
+        blob = pretend.stub(download_as_bytes=lambda: b"<urlset/>")
+        bucket = pretend.stub(blob=pretend.call_recorder(lambda path: blob))
+        storage = GCSSitemapStorage(bucket, prefix="sitemap/")
+
+        assert storage.get("0a.sitemap.xml").read() == b"<urlset/>"
+        assert bucket.blob.calls == [pretend.call("sitemap/0a.sitemap.xml")]
+
+    def test_gets_missing_file(self):
+        def download_as_bytes():
+            raise google.api_core.exceptions.NotFound("gone")
+
+        blob = pretend.stub(download_as_bytes=download_as_bytes)
+        storage = GCSSitemapStorage(pretend.stub(blob=lambda path: blob))
+
+        with pytest.raises(FileNotFoundError):
+            storage.get("0a.sitemap.xml")
+
+    def test_stores_file_overwriting(self, tmpdir):
+        filename = str(tmpdir.join("testfile.txt"))
+        with open(filename, "wb") as fp:
+            fp.write(b"Test File!")
+
+        blob = pretend.stub(
+            upload_from_filename=pretend.call_recorder(lambda file_path: None),
+            exists=lambda: True,
+        )
+        bucket = pretend.stub(blob=pretend.call_recorder(lambda path: blob))
+        storage = GCSSitemapStorage(bucket)
+        storage.store("sitemap.xml", filename, meta={"foo": "bar"})
+
+        assert bucket.blob.calls == [pretend.call("sitemap.xml")]
+        assert blob.upload_from_filename.calls == [pretend.call(filename)]
+        assert blob.metadata == {"foo": "bar"}
+
+    def test_removes_file(self):
+        blob = pretend.stub(delete=pretend.call_recorder(lambda: None))
+        bucket = pretend.stub(blob=pretend.call_recorder(lambda path: blob))
+        storage = GCSSitemapStorage(bucket, prefix="sitemap/")
+
+        storage.remove("0a.sitemap.xml")
+
+        assert bucket.blob.calls == [pretend.call("sitemap/0a.sitemap.xml")]
+        assert blob.delete.calls == [pretend.call()]
+
+    def test_removes_missing_file(self):
+        def delete():
+            raise google.api_core.exceptions.NotFound("gone")
+
+        blob = pretend.stub(delete=delete)
+        storage = GCSSitemapStorage(pretend.stub(blob=lambda path: blob))
+
+        storage.remove("0a.sitemap.xml")
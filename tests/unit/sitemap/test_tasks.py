@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import json
+
+import pretend
+
+from warehouse.cache.origin.interfaces import IOriginCache
+from warehouse.metrics import IMetricsService
+from warehouse.sitemap import tasks
+from warehouse.sitemap.interfaces import ISitemapStorage
+from warehouse.sitemap.services import LocalSitemapStorage
+from warehouse.sitemap.utils import Bucket
+
+
+def _request(storage, metrics, cacher=None):
+    def find_service(iface, **kwargs):
+        if iface is ISitemapStorage:
+            return storage
+        if iface is IMetricsService:
+            return metrics
+        if iface is IOriginCache and cacher is not None:
+            return cacher
+        raise LookupError
+
+    return pretend.stub(db=pretend.stub(), find_service=find_service)
+
+
+def _patch(monkeypatch, buckets):
+    monkeypatch.setattr(tasks, "sitemap_buckets", lambda db: buckets)
+    sitemap_bucket_urls = pretend.call_recorder(lambda request, bucket: [f"/{bucket}/"])
+    monkeypatch.setattr(tasks, "sitemap_bucket_urls", sitemap_bucket_urls)
+    render = pretend.call_recorder(lambda template, value, request: repr(value))
+    monkeypatch.setattr(tasks, "render", render)
+    return sitemap_bucket_urls, render
+
+
+def test_sitemap_bucket_path():
+    assert tasks.sitemap_bucket_path("0a") == "0a.sitemap.xml"
+
+
+def test_generate_sitemaps_first_run(monkeypatch, tmpdir, metrics):
+    storage = LocalSitemapStorage(str(tmpdir))
+    cacher = pretend.stub(purge=pretend.call_recorder(lambda keys: None))
+    modified = datetime.datetime(2020, 1, 1)
+    buckets = {
+        "0a": (Bucket("0a", modified=modified), "fp-0a"),
+        "1f": (Bucket("1f", modified=None), "fp-1f"),
+    }
+    sitemap_bucket_urls, render = _patch(monkeypatch, buckets)
+    request = _request(storage, metrics, cacher)
+
+    tasks.generate_sitemaps(request)
+
+    assert sitemap_bucket_urls.calls == [
+        pretend.call(request, "0a"),
+        pretend.call(request, "1f"),
+    ]
+    assert storage.get("0a.sitemap.xml").read() == b"{'urls': ['/0a/']}"
+    assert storage.get("1f.sitemap.xml").read() == b"{'urls': ['/1f/']}"
+    assert render.calls[-1] == pretend.call(
+        "warehouse:templates/sitemap/index.xml",
+        {"buckets": [bucket for bucket, _ in buckets.values()]},
+        request=request,
+    )
+    assert storage.get("sitemap.xml").read()
+    assert json.loads(storage.get("sitemap.json").read()) == {
+        "0a": "fp-0a",
+        "1f": "fp-1f",
+    }
+    assert cacher.purge.calls == [pretend.call(["sitemap"])]
+    assert metrics.gauge.calls == [pretend.call("warehouse.sitemap.buckets.total", 2)]
+    assert metrics.increment.calls == [
+        pretend.call("warehouse.sitemap.buckets.rebuilt", 2)
+    ]
+
+
+def test_generate_sitemaps_only_changed(monkeypatch, tmpdir, metrics):
+    storage = LocalSitemapStorage(str(tmpdir))
+    tmpdir.join("sitemap.json").write(json.dumps({"0a": "fp-0a", "1f": "old"}))
+    buckets = {
+        "0a": (Bucket("0a", modified=None), "fp-0a"),
+        "1f": (Bucket("1f", modified=None), "fp-1f"),
+    }
+    sitemap_bucket_urls, _ = _patch(monkeypatch, buckets)
+    request = _request(storage, metrics)
+
+    tasks.generate_sitemaps(request)
+
+    assert sitemap_bucket_urls.calls == [pretend.call(request, "1f")]
+    assert not tmpdir.join("0a.sitemap.xml").exists()
+    assert json.loads(storage.get("sitemap.json").read()) == {
+        "0a": "fp-0a",
+        "1f": "fp-1f",
+    }
+
+
+def test_generate_sitemaps_removed_bucket(monkeypatch, tmpdir, metrics):
+    storage = LocalSitemapStorage(str(tmpdir))
+    tmpdir.join("sitemap.json").write(json.dumps({"0a": "fp-0a", "1f": "fp-1f"}))
+    tmpdir.join("0a.sitemap.xml").write("<urlset/>")
+    tmpdir.join("1f.sitemap.xml").write("<urlset/>")
+    buckets = {"0a": (Bucket("0a", modified=None), "fp-0a")}
+    sitemap_bucket_urls, render = _patch(monkeypatch, buckets)
+    request = _request(storage, metrics)
+
+    tasks.generate_sitemaps(request)
+
+    assert sitemap_bucket_urls.calls == []
+    assert render.calls == [
+        pretend.call(
+            "warehouse:templates/sitemap/index.xml",
+            {"buckets": [Bucket("0a", modified=None)]},
+            request=request,
+        )
+    ]
+    assert json.loads(storage.get("sitemap.json").read()) == {"0a": "fp-0a"}
+    assert tmpdir.join("0a.sitemap.xml").exists()
+    assert not tmpdir.join("1f.sitemap.xml").exists()
+
+
+def test_generate_sitemaps_unchanged(monkeypatch, tmpdir, metrics):
+    storage = LocalSitemapStorage(str(tmpdir))
+    tmpdir.join("sitemap.json").write(json.dumps({"0a": "fp-0a"}))
+    cacher = pretend.stub(purge=pretend.call_recorder(lambda keys: None))
+    buckets = {"0a": (Bucket("0a", modified=None), "fp-0a")}
+    sitemap_bucket_urls, render = _patch(monkeypatch, buckets)
+    request = _request(storage, metrics, cacher)
+
+    tasks.generate_sitemaps(request)
+
+    assert sitemap_bucket_urls.calls == []
+    assert render.calls == []
+    assert not tmpdir.join("sitemap.xml").exists()
+    assert cacher.purge.calls == []
@@ -1,22 +1,35 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import datetime
+import io
 
 import pretend
 import pytest
 
-from warehouse.sitemap import views as sitemap
+from warehouse.sitemap import utils, views as sitemap
+from warehouse.sitemap.interfaces import ISitemapStorage
 
 from ...common.db.accounts import UserFactory
 from ...common.db.packaging import ProjectFactory
 
 
-def test_sitemap_index(db_request):
-    db_request.find_service = pretend.call_recorder(
-        lambda *args, **kwargs: pretend.stub(
+def _missing(path):
+    raise FileNotFoundError(path)
+
+
+def _find_service(storage):
+    def find_service(iface=None, *args, **kwargs):
+        if iface is ISitemapStorage:
+            return storage
+        return pretend.stub(
             enabled=False, csp_policy=pretend.stub(), merge=lambda _: None
         )
-    )
+
+    return pretend.call_recorder(find_service)
+
+
+def test_sitemap_index(db_request):
+    db_request.find_service = _find_service(pretend.stub(get=_missing))
 
     project = ProjectFactory.create(
         name="foobar",
@@ -43,20 +56,40 @@ def test_sitemap_index(db_request):
 
     assert sitemap.sitemap_index(db_request) == {
         "buckets": [
-            sitemap.Bucket("0a", modified=project.created),
-            sitemap.Bucket("1f", modified=users[0].date_joined),
-            sitemap.Bucket("52", modified=None),
+            utils.Bucket("0a", modified=project.created),
+            utils.Bucket("1f", modified=users[0].date_joined),
+            utils.Bucket("52", modified=None),
         ]
     }
     assert db_request.response.content_type == "text/xml"
 
 
-def test_sitemap_bucket(db_request):
-    db_request.find_service = pretend.call_recorder(
-        lambda *args, **kwargs: pretend.stub(
-            enabled=False, csp_policy=pretend.stub(), merge=lambda _: None
-        )
+def test_sitemap_index_stored(pyramid_request):
+    storage = pretend.stub(
+        get=pretend.call_recorder(lambda path: io.BytesIO(b"<sitemapindex/>"))
     )
+    pyramid_request.find_service = _find_service(storage)
+
+    response = sitemap.sitemap_index(pyramid_request)
+
+    assert storage.get.calls == [pretend.call("sitemap.xml")]
+    assert response.body == b"<sitemapindex/>"
+    assert response.content_type == "text/xml"
+
+
+def test_sitemap_index_no_storage(db_request):
+    @pretend.call_recorder
+    def find_service(iface=None, *args, **kwargs):
+        raise LookupError
+
+    db_request.find_service = find_service
+
+    assert sitemap.sitemap_index(db_request) == {"buckets": []}
+    assert db_request.response.content_type == "text/xml"
+
+
+def test_sitemap_bucket(db_request):
+    db_request.find_service = _find_service(pretend.stub(get=_missing))
 
     expected = ["/project/foobar/"]
     expected_iter = iter(expected)
@@ -75,17 +108,36 @@ def test_sitemap_bucket(db_request):
     assert db_request.response.content_type == "text/xml"
 
 
-def test_sitemap_bucket_too_many(monkeypatch, db_request):
-    db_request.find_service = pretend.call_recorder(
-        lambda *args, **kwargs: pretend.stub(
-            enabled=False, csp_policy=pretend.stub(), merge=lambda _: None
-        )
+def test_sitemap_bucket_stored(pyramid_request):
+    storage = pretend.stub(
+        get=pretend.call_recorder(lambda path: io.BytesIO(b"<urlset/>"))
     )
+    pyramid_request.find_service = _find_service(storage)
+    pyramid_request.matchdict["bucket"] = "0a"
+
+    response = sitemap.sitemap_bucket(pyramid_request)
+
+    assert storage.get.calls == [pretend.call("0a.sitemap.xml")]
+    assert response.body == b"<urlset/>"
+    assert response.content_type == "text/xml"
+
+
+def test_sitemap_bucket_invalid_name_not_stored(db_request):
+    storage = pretend.stub(get=pretend.call_recorder(_missing))
+    db_request.find_service = _find_service(storage)
+    db_request.matchdict["bucket"] = ".."
+
+    assert sitemap.sitemap_bucket(db_request) == {"urls": []}
+    assert storage.get.calls == []
+
+
+def test_sitemap_bucket_too_many(monkeypatch, db_request):
+    db_request.find_service = _find_service(pretend.stub(get=_missing))
 
     db_request.route_url = pretend.call_recorder(lambda *a, **kw: "/")
     db_request.matchdict["bucket"] = "52"
 
-    monkeypatch.setattr(sitemap, "SITEMAP_MAXSIZE", 2)
+    monkeypatch.setattr(utils, "SITEMAP_MAXSIZE", 2)
 
     for _ in range(3):
         p = ProjectFactory.create(
@@ -95,5 +147,5 @@ def test_sitemap_bucket_too_many(monkeypatch, db_request):
 
     db_request.db.flush()
 
-    with pytest.raises(sitemap.BucketTooSmallError):
+    with pytest.raises(utils.BucketTooSmallError):
         sitemap.sitemap_bucket(db_request)
@@ -330,12 +330,15 @@ def test_configure(monkeypatch, settings, environment):
         "warehouse.search.ratelimit_string": "5 per second",
         "oidc.backend": "warehouse.oidc.services.OIDCPublisherService",
         "integrity.backend": "warehouse.attestations.services.IntegrityService",
+        "integrity.verify_workers": 2,
+        "integrity.verify_timeout": 30,
         "warehouse.organizations.max_undecided_organization_applications": 3,
         "reconcile_file_storages.batch_size": 100,
         "gcloud.service_account_info": {},
         "warehouse.forklift.legacy.MAX_FILESIZE_MIB": 100,
         "warehouse.forklift.legacy.MAX_PROJECT_SIZE_GIB": 10,
         "warehouse.allowed_domains": [],
+        "warehouse.disabled_subsystems": [],
     }
     if environment == config.Environment.development:
         expected_settings.update(
@@ -344,6 +347,7 @@ def test_configure(monkeypatch, settings, environment):
                 "pyramid.reload_templates": True,
                 "pyramid.reload_assets": True,
                 "pyramid.prevent_http_cache": True,
+                "warehouse.db.server_timing": True,
                 "debugtoolbar.hosts": ["0.0.0.0/0"],
                 "debugtoolbar.panels": [
                     "pyramid_debugtoolbar.panels.versions.VersionDebugPanel",
@@ -401,6 +405,7 @@ def test_configure(monkeypatch, settings, environment):
             pretend.call("pyramid_jinja2"),
             pretend.call(".filters"),
             pretend.call("pyramid_mailer"),
+            pretend.call(".utils.templates"),
             pretend.call("pyramid_retry"),
             pretend.call("pyramid_tm"),
             pretend.call(".legacy.api.xmlrpc"),
@@ -433,6 +438,7 @@ def test_configure(monkeypatch, settings, environment):
             pretend.call(".redirects"),
             pretend.call("pyramid_redirect"),
             pretend.call(".routes"),
+            pretend.call(".sitemap"),
             pretend.call(".sponsors"),
             pretend.call(".banners"),
             pretend.call(".admin"),
@@ -446,6 +452,7 @@ def test_configure(monkeypatch, settings, environment):
             pretend.call(".helpdesk"),
             pretend.call(".http"),
             pretend.call(".utils.row_counter"),
+            pretend.call(".events"),
         ]
         + [pretend.call(x) for x in [configurator_settings.get("warehouse.theme")] if x]
         + [pretend.call(".sanity")]
@@ -682,6 +689,72 @@ def test_root_factory_access_control_list():
     ]
 
 
+def test_configure_disabled_subsystems(monkeypatch):
+    monkeypatch.setattr(
+        os,
+        "environ",
+        {
+            "WAREHOUSE_ENV": "production",
+            "WAREHOUSE_DISABLED_SUBSYSTEMS": "admin, manage",
+        },
+    )
+    scan = pretend.call_recorder(lambda categories, ignore: None)
+
+    class FakeConfigurator:
+        def __init__(self, settings):
+            self.registry = pretend.stub(settings=settings)
+
+        def __getattr__(self, name):
+            return lambda *a, **kw: None
+
+        def get_settings(self):
+            return self.registry.settings
+
+        def scan(self, categories, ignore):
+            scan(categories=categories, ignore=ignore)
+
+    monkeypatch.setattr(config, "Configurator", FakeConfigurator)
+    monkeypatch.setattr(config, "ManifestCacheBuster", lambda *a, **kw: None)
+
+    config.configure(
+        settings={
+            "warehouse.token": "insecure token",
+            "warehouse.ip_salt": "insecure salt",
+            "pyramid.reload_assets": False,
+        }
+    )
+
+    assert scan.calls == [
+        pretend.call(
+            categories=("pyramid", "warehouse"),
+            ignore=[
+                "warehouse.migrations.env",
+                "warehouse.celery",
+                "warehouse.wsgi",
+                "warehouse.admin.views",
+                "warehouse.manage.views",
+            ],
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("", []),
+        ("admin", ["admin"]),
+        ("admin, billing,,manage ", ["admin", "billing", "manage"]),
+    ],
+)
+def test_disabled_subsystems(value, expected):
+    assert config._disabled_subsystems(value) == expected
+
+
+def test_disabled_subsystems_unknown():
+    with pytest.raises(ValueError, match="Unknown subsystem: 'forklift'"):
+        config._disabled_subsystems("admin,forklift")
+
+
 class TestWarehouseAllowedDomains:
     def test_allowed_domains_parsing(self):
         """Test that allowed domains are parsed correctly."""
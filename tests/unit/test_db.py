@@ -1,5 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+
 from unittest import mock
 
 import alembic.config
@@ -10,6 +12,8 @@ import sqlalchemy
 import venusian
 import zope.sqlalchemy
 
+from pyramid.events import NewResponse
+from pyramid.response import Response
 from sqlalchemy import event
 from sqlalchemy.exc import OperationalError
 
@@ -113,6 +117,7 @@ def test_raises_db_available_error(pyramid_services, metrics):
     request = pretend.stub(
         find_service=pyramid_services.find_service,
         registry={"sqlalchemy.engine": engine},
+        matched_route=None,
     )
 
     with pytest.raises(DatabaseNotAvailableError):
@@ -124,7 +129,7 @@ def test_raises_db_available_error(pyramid_services, metrics):
     ]
 
 
-def test_create_session(monkeypatch, pyramid_services):
+def test_create_session(monkeypatch, pyramid_services, metrics):
     session_obj = pretend.stub(
         close=pretend.call_recorder(lambda: None),
         get=pretend.call_recorder(lambda *a: None),
@@ -138,10 +143,14 @@ def test_create_session(monkeypatch, pyramid_services):
         ),
         close=pretend.call_recorder(lambda: None),
     )
-    engine = pretend.stub(connect=pretend.call_recorder(lambda: connection))
+    engine = pretend.stub(
+        connect=pretend.call_recorder(lambda: connection),
+        pool=pretend.stub(checkedout=lambda: 3),
+    )
     request = pretend.stub(
         find_service=pyramid_services.find_service,
         registry={"sqlalchemy.engine": engine},
+        matched_route=None,
         tm=pretend.stub(),
         add_finished_callback=pretend.call_recorder(lambda callback: None),
     )
@@ -158,6 +167,9 @@ def test_create_session(monkeypatch, pyramid_services):
     request.add_finished_callback.calls[0].args[0](request2)
     assert session_obj.close.calls == [pretend.call()]
     assert connection.close.calls == [pretend.call()]
+    assert metrics.gauge.calls == [
+        pretend.call("warehouse.db.pool.checkedout", 3, tags=["engine:primary"])
+    ]
 
 
 @pytest.mark.parametrize(
@@ -198,10 +210,14 @@ def test_create_session_read_only_mode(
         info={},
         close=lambda: None,
     )
-    engine = pretend.stub(connect=pretend.call_recorder(lambda: connection))
+    engine = pretend.stub(
+        connect=pretend.call_recorder(lambda: connection),
+        pool=pretend.stub(checkedout=lambda: 1),
+    )
     request = pretend.stub(
         find_service=pyramid_services.find_service,
         registry={"sqlalchemy.engine": engine},
+        matched_route=None,
         tm=pretend.stub(doom=pretend.call_recorder(lambda: None)),
         add_finished_callback=lambda callback: None,
         user=pretend.stub(is_superuser=is_superuser),
@@ -212,6 +228,365 @@ def test_create_session_read_only_mode(
     assert request.tm.doom.calls == doom_calls
 
 
+class TestReplicas:
+    @pytest.fixture
+    def session(self, monkeypatch):
+        session_obj = pretend.stub(close=lambda: None, get=lambda *a: None)
+        monkeypatch.setattr(db, "Session", lambda bind: session_obj)
+        monkeypatch.setattr(zope.sqlalchemy, "register", lambda *a, **kw: None)
+        return session_obj
+
+    @staticmethod
+    def _engine(lag=0):
+        connection = pretend.stub(
+            execute=pretend.call_recorder(
+                lambda query: pretend.stub(scalar=lambda: lag)
+            ),
+            rollback=pretend.call_recorder(lambda: None),
+            close=pretend.call_recorder(lambda: None),
+        )
+        return pretend.stub(
+            connect=pretend.call_recorder(lambda: connection),
+            pool=pretend.stub(checkedout=lambda: 1),
+            connection=connection,
+        )
+
+    @staticmethod
+    def _request(pyramid_services, engine, replica, *, route="simple", lag=None):
+        return pretend.stub(
+            find_service=pyramid_services.find_service,
+            registry={
+                "sqlalchemy.engine": engine,
+                "sqlalchemy.replica_engine": replica,
+                "sqlalchemy.replica_lag": lag or db.ReplicaLag(max_lag=5),
+                "warehouse.db.read_only_routes": {"simple": True, "upload": False},
+            },
+            matched_route=pretend.stub(name=route),
+            tm=pretend.stub(),
+            add_finished_callback=lambda callback: None,
+        )
+
+    def test_read_only_uses_replica(self, pyramid_services, metrics, session):
+        engine, replica = self._engine(), self._engine(lag=1.5)
+        request = self._request(pyramid_services, engine, replica)
+
+        assert _create_session(request) is session
+        assert engine.connect.calls == []
+        assert replica.connect.calls == [pretend.call()]
+        assert replica.connection.execute.calls == [pretend.call(db.REPLICA_LAG_QUERY)]
+        assert replica.connection.rollback.calls == [pretend.call()]
+        assert metrics.gauge.calls == [
+            pretend.call("warehouse.db.replica.lag", 1.5),
+            pretend.call("warehouse.db.pool.checkedout", 1, tags=["engine:replica"]),
+        ]
+
+    @pytest.mark.parametrize("route", [None, "upload", "unknown"])
+    def test_others_use_primary(self, pyramid_services, metrics, session, route):
+        engine, replica = self._engine(), self._engine()
+        request = self._request(pyramid_services, engine, replica, route=route)
+        if route is None:
+            request.matched_route = None
+
+        assert _create_session(request) is session
+        assert engine.connect.calls == [pretend.call()]
+        assert replica.connect.calls == []
+
+    def test_lagging_replica_uses_primary(self, pyramid_services, metrics, session):
+        engine, replica = self._engine(), self._engine(lag=30)
+        request = self._request(pyramid_services, engine, replica)
+
+        assert _create_session(request) is session
+        assert replica.connection.close.calls == [pretend.call()]
+        assert engine.connect.calls == [pretend.call()]
+        assert pretend.call("warehouse.db.replica.fallback", tags=["reason:lag"]) in (
+            metrics.increment.calls
+        )
+
+    def test_unavailable_replica_uses_primary(self, pyramid_services, metrics, session):
+        def raiser():
+            raise OperationalError("foo", {}, psycopg.OperationalError())
+
+        engine, replica = self._engine(), pretend.stub(connect=raiser)
+        request = self._request(pyramid_services, engine, replica)
+
+        assert _create_session(request) is session
+        assert engine.connect.calls == [pretend.call()]
+        assert pretend.call("warehouse.db.replica.fallback", tags=["reason:error"]) in (
+            metrics.increment.calls
+        )
+
+    def test_failing_lag_check_uses_primary(self, pyramid_services, metrics, session):
+        def raiser(query):
+            raise OperationalError("foo", {}, psycopg.OperationalError())
+
+        engine, replica = self._engine(), self._engine()
+        replica.connection.execute = raiser
+        lag = db.ReplicaLag(max_lag=5)
+        request = self._request(pyramid_services, engine, replica, lag=lag)
+
+        assert _create_session(request) is session
+        assert replica.connection.close.calls == [pretend.call()]
+        assert engine.connect.calls == [pretend.call()]
+        assert pretend.call("warehouse.db.replica.fallback", tags=["reason:error"]) in (
+            metrics.increment.calls
+        )
+        # The lag is checked again by the next request.
+        assert lag._checked is None
+
+    def test_lag_checked_once_per_interval(self, monkeypatch, metrics):
+        now = [100.0]
+        monkeypatch.setattr(db.time, "monotonic", lambda: now[0])
+        connection = self._engine(lag=None).connection
+        lag = db.ReplicaLag(max_lag=5, interval=10)
+
+        assert not lag.too_far_behind(connection, metrics)
+        now[0] += 5
+        assert not lag.too_far_behind(connection, metrics)
+        assert len(connection.execute.calls) == 1
+
+        now[0] += 5
+        assert not lag.too_far_behind(connection, metrics)
+        assert len(connection.execute.calls) == 2
+        assert lag.lag == 0.0
+
+
+class TestQueryStats:
+    def test_record(self):
+        stats = db.QueryStats()
+        stats.record("SELECT 1", 0.5, 1)
+        stats.record("SELECT 2", 1.5, 2)
+        stats.record("SELECT 3", 1.0, 0)
+
+        assert stats.count == 3
+        assert stats.duration == 3.0
+        assert stats.rows == 3
+        assert stats.slowest_duration == 1.5
+        assert stats.slowest_statement == "SELECT 2"
+
+    def test_listeners(self, monkeypatch):
+        request = pretend.stub(query_stats=db.QueryStats())
+        monkeypatch.setattr(db, "get_current_request", lambda: request)
+        times = iter([10.0, 10.25])
+        monkeypatch.setattr(db.time, "perf_counter", lambda: next(times))
+        context = pretend.stub()
+        cursor = pretend.stub(rowcount=-1)
+
+        db._start_query_timer(None, cursor, "SELECT 1", {}, context, False)
+        db._record_query(None, cursor, "SELECT 1", {}, context, False)
+
+        assert request.query_stats.count == 1
+        assert request.query_stats.duration == 0.25
+        assert request.query_stats.rows == 0
+
+    @pytest.mark.parametrize("request_", [None, pretend.stub()])
+    def test_listeners_without_request(self, monkeypatch, request_):
+        monkeypatch.setattr(db, "get_current_request", lambda: request_)
+        context = pretend.stub()
+        cursor = pretend.stub(rowcount=3)
+
+        db._start_query_timer(None, cursor, "SELECT 1", {}, context, False)
+        db._record_query(None, cursor, "SELECT 1", {}, context, False)
+
+    def test_includeme_listens_once(self, monkeypatch):
+        monkeypatch.setattr(sqlalchemy, "create_engine", lambda url, **kw: None)
+        listen = pretend.call_recorder(lambda target, identifier, fn: None)
+        monkeypatch.setattr(event, "listen", listen)
+        monkeypatch.setattr(event, "contains", lambda target, identifier, fn: True)
+
+        class FakeRegistry(dict):
+            settings = {"database.url": pretend.stub()}
+
+        includeme(
+            pretend.stub(
+                add_directive=lambda *a: None,
+                registry=FakeRegistry(),
+                add_request_method=lambda f, name, reify: None,
+                add_view_deriver=lambda deriver: None,
+                add_subscriber=lambda subscriber, iface: None,
+            )
+        )
+
+        assert listen.calls == []
+
+
+class TestReportQueryStats:
+    @staticmethod
+    def _request(metrics, stats, server_timing=False):
+        return pretend.stub(
+            query_stats=stats,
+            matched_route=pretend.stub(name="foo"),
+            find_service=lambda iface, context: metrics,
+            registry=pretend.stub(
+                settings={"warehouse.db.server_timing": server_timing}
+            ),
+        )
+
+    @pytest.mark.parametrize("server_timing", [True, False])
+    def test_reports(self, metrics, server_timing):
+        stats = db.QueryStats()
+        stats.record("SELECT * FROM foo WHERE id IN (%(id_1_1)s, %(id_1_2)s)", 0.01, 2)
+        stats.record("SELECT 1", 0.0025, 1)
+        request = self._request(metrics, stats, server_timing)
+        response = Response()
+
+        db._report_query_stats(NewResponse(request, response))
+
+        statement_tag = (
+            "statement:"
+            + hashlib.md5(b"SELECT * FROM foo WHERE id IN (%(id_1)s, ...)").hexdigest()[
+                :12
+            ]
+        )
+        assert metrics.histogram.calls == [
+            pretend.call("warehouse.db.request.queries", 2, tags=["route:foo"]),
+            pretend.call("warehouse.db.request.rows", 3, tags=["route:foo"]),
+        ]
+        assert metrics.timing.calls == [
+            pretend.call(
+                "warehouse.db.request.duration", pytest.approx(12.5), tags=["route:foo"]
+            ),
+            pretend.call(
+                "warehouse.db.request.slowest", 10.0, tags=["route:foo", statement_tag]
+            ),
+        ]
+        if server_timing:
+            assert response.headers["Server-Timing"] == 'db;dur=12.5;desc="2 queries"'
+        else:
+            assert "Server-Timing" not in response.headers
+
+    @pytest.mark.parametrize("stats", [None, db.QueryStats()])
+    def test_no_queries(self, metrics, stats):
+        request = self._request(metrics, stats)
+        if stats is None:
+            del request.query_stats
+
+        db._report_query_stats(NewResponse(request, Response()))
+
+        assert metrics.histogram.calls == []
+        assert metrics.timing.calls == []
+
+
+class TestQueryBudgetView:
+    def test_no_budget(self):
+        view = pretend.stub()
+        info = pretend.stub(options={})
+
+        assert db.query_budget_view(view, info) is view
+
+    @staticmethod
+    def _request(metrics, count, duration, enforce=False):
+        stats = db.QueryStats()
+        for _ in range(count):
+            stats.record("SELECT 1", duration / count, 1)
+        return pretend.stub(
+            query_stats=stats,
+            matched_route=None,
+            find_service=lambda iface, context: metrics,
+            registry=pretend.stub(
+                settings={"warehouse.db.enforce_query_budgets": enforce}
+            ),
+        )
+
+    @pytest.mark.parametrize(
+        ("options", "count", "duration"),
+        [
+            ({"query_budget": 3}, 3, 1.0),
+            ({"query_time_budget": 50}, 10, 0.05),
+            ({"query_budget": 3, "query_time_budget": 50}, 1, 0.01),
+        ],
+    )
+    def test_within_budget(self, metrics, options, count, duration):
+        response = pretend.stub()
+        view = db.query_budget_view(
+            lambda context, request: response, pretend.stub(options=options)
+        )
+
+        request = self._request(metrics, count, duration, enforce=True)
+        assert view(pretend.stub(), request) is response
+        assert metrics.increment.calls == []
+
+    @pytest.mark.parametrize(
+        ("options", "count", "duration"),
+        [
+            ({"query_budget": 3}, 4, 0.001),
+            ({"query_time_budget": 50}, 1, 0.06),
+        ],
+    )
+    def test_warns_over_budget(self, metrics, caplog, options, count, duration):
+        response = pretend.stub()
+        view = db.query_budget_view(
+            lambda context, request: response, pretend.stub(options=options)
+        )
+
+        request = self._request(metrics, count, duration)
+        assert view(pretend.stub(), request) is response
+        assert metrics.increment.calls == [
+            pretend.call("warehouse.db.request.over_budget", tags=["route:null"])
+        ]
+        assert "route:null made" in caplog.text
+
+    def test_enforces_query_budget(self, metrics):
+        view = db.query_budget_view(
+            lambda context, request: pretend.stub(),
+            pretend.stub(options={"query_budget": 3}),
+        )
+
+        request = self._request(metrics, 4, 0.001, enforce=True)
+        with pytest.raises(db.QueryBudgetExceededError, match="made 4 queries"):
+            view(pretend.stub(), request)
+
+    def test_doesnt_enforce_time_budget(self, metrics):
+        response = pretend.stub()
+        view = db.query_budget_view(
+            lambda context, request: response,
+            pretend.stub(options={"query_time_budget": 50}),
+        )
+
+        request = self._request(metrics, 1, 0.06, enforce=True)
+        assert view(pretend.stub(), request) is response
+
+
+@pytest.mark.parametrize(
+    ("views", "expected"),
+    [
+        ([{"read_only": True}], True),
+        ([{}], False),
+        ([{"read_only": True}, {"read_only": True}], True),
+        ([{"read_only": True}, {}], False),
+        ([{}, {"read_only": True}], False),
+    ],
+)
+def test_read_only_view(views, expected):
+    registry = {}
+    view = pretend.stub()
+
+    for options in views:
+        info = pretend.stub(
+            options={"route_name": "foo", **options},
+            registry=registry,
+            exception_only=False,
+        )
+        assert db.read_only_view(view, info) is view
+
+    assert registry["warehouse.db.read_only_routes"] == {"foo": expected}
+
+
+@pytest.mark.parametrize(
+    ("route_name", "exception_only"), [(None, False), ("foo", True)]
+)
+def test_read_only_view_ignored(route_name, exception_only):
+    registry = {}
+    info = pretend.stub(
+        options={"route_name": route_name, "read_only": True},
+        registry=registry,
+        exception_only=exception_only,
+    )
+
+    db.read_only_view(pretend.stub(), info)
+
+    assert registry == {}
+
+
 def test_includeme(monkeypatch):
     class FakeRegistry(dict):
         settings = {"database.url": pretend.stub()}
@@ -223,11 +598,32 @@ def test_includeme(monkeypatch):
         registry=FakeRegistry(),
         add_request_method=pretend.call_recorder(lambda f, name, reify: None),
         add_route_predicate=pretend.call_recorder(lambda *a, **kw: None),
+        add_view_deriver=pretend.call_recorder(lambda deriver: None),
+        add_subscriber=pretend.call_recorder(lambda subscriber, iface: None),
     )
     monkeypatch.setattr(sqlalchemy, "create_engine", create_engine)
+    listen = pretend.call_recorder(lambda target, identifier, fn: None)
+    monkeypatch.setattr(event, "listen", listen)
 
     includeme(config)
 
+    assert config.add_view_deriver.calls == [
+        pretend.call(db.read_only_view),
+        pretend.call(db.query_budget_view),
+    ]
+    assert config.add_subscriber.calls == [
+        pretend.call(db._report_query_stats, NewResponse)
+    ]
+    assert listen.calls == [
+        pretend.call(
+            sqlalchemy.engine.Engine, "before_cursor_execute", db._start_query_timer
+        ),
+        pretend.call(
+            sqlalchemy.engine.Engine, "after_cursor_execute", db._record_query
+        ),
+    ]
+    assert "sqlalchemy.replica_engine" not in config.registry
+
     assert config.add_directive.calls == [
         pretend.call("alembic_config", _configure_alembic)
     ]
@@ -241,3 +637,46 @@ def test_includeme(monkeypatch):
         )
     ]
     assert config.registry["sqlalchemy.engine"] is engine
+
+
+@pytest.mark.parametrize("max_lag", [None, 30])
+def test_includeme_replica(monkeypatch, max_lag):
+    class FakeRegistry(dict):
+        settings = {
+            "database.url": pretend.stub(),
+            "database.replica_url": pretend.stub(),
+        }
+
+    if max_lag is not None:
+        FakeRegistry.settings["database.replica_max_lag"] = max_lag
+
+    engine, replica = pretend.stub(), pretend.stub()
+    create_engine = pretend.call_recorder(
+        lambda url, **kw: (
+            replica if url is FakeRegistry.settings["database.replica_url"] else engine
+        )
+    )
+    config = pretend.stub(
+        add_directive=lambda *a: None,
+        registry=FakeRegistry(),
+        add_request_method=lambda f, name, reify: None,
+        add_view_deriver=lambda deriver: None,
+        add_subscriber=lambda subscriber, iface: None,
+    )
+    monkeypatch.setattr(sqlalchemy, "create_engine", create_engine)
+    monkeypatch.setattr(event, "listen", lambda *a: None)
+
+    includeme(config)
+
+    assert create_engine.calls[1] == pretend.call(
+        FakeRegistry.settings["database.replica_url"],
+        isolation_level=DEFAULT_ISOLATION,
+        pool_size=35,
+        max_overflow=65,
+        pool_timeout=20,
+    )
+    assert config.registry["sqlalchemy.engine"] is engine
+    assert config.registry["sqlalchemy.replica_engine"] is replica
+    assert config.registry["sqlalchemy.replica_lag"].max_lag == (
+        db.DEFAULT_REPLICA_MAX_LAG if max_lag is None else max_lag
+    )
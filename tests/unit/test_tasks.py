@@ -1,5 +1,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import contextlib
+import datetime
+
 from unittest import mock
 
 import pretend
@@ -7,8 +10,10 @@ import pytest
 import transaction
 
 from celery import Celery, Task
+from celery.schedules import crontab
 from kombu import Queue
-from pyramid import scripting
+from pyramid.config import Configurator
+from pyramid.threadlocal import get_current_request
 from pyramid_retry import RetryableException
 
 from warehouse import tasks
@@ -41,16 +46,11 @@ class TestWarehouseTask:
 
     def test_call(self, monkeypatch):
         request = pretend.stub()
-        registry = pretend.stub(settings={"warehouse.ip_salt": "peppa"})
         result = pretend.stub()
 
-        prepared = {
-            "registry": registry,
-            "request": request,
-            "closer": pretend.call_recorder(lambda: None),
-        }
-        prepare = pretend.call_recorder(lambda *a, **kw: prepared)
-        monkeypatch.setattr(scripting, "prepare", prepare)
+        acquired = {"request": request, "closer": pretend.call_recorder(lambda: None)}
+        pool = pretend.stub(acquire=pretend.call_recorder(lambda **kw: acquired))
+        registry = {"celery.request_pool": pool}
 
         @pretend.call_recorder
         def runner(irequest):
@@ -63,7 +63,7 @@ class TestWarehouseTask:
         task.run = runner
 
         assert task() is result
-        assert prepare.calls == [pretend.call(registry=registry)]
+        assert pool.acquire.calls == [pretend.call(uses_db=True)]
         assert runner.calls == [pretend.call(request)]
 
     def test_retry(self, monkeypatch, metrics):
@@ -97,6 +97,8 @@ class TestWarehouseTask:
         get_current_request = pretend.call_recorder(lambda: None)
         monkeypatch.setattr(tasks, "get_current_request", get_current_request)
 
+        monkeypatch.setattr(tasks, "time", pretend.stub(time=lambda: 1000.0))
+
         task = tasks.WarehouseTask()
         task.app = Celery()
 
@@ -105,9 +107,7 @@ class TestWarehouseTask:
         assert task.apply_async() is async_result
 
         assert apply_async.calls == [
-            pretend.call(
-                task,
-            )
+            pretend.call(task, headers={"warehouse_due_at": 1000.0})
         ]
         assert get_current_request.calls == [pretend.call()]
 
@@ -119,6 +119,8 @@ class TestWarehouseTask:
         get_current_request = pretend.call_recorder(lambda: request)
         monkeypatch.setattr(tasks, "get_current_request", get_current_request)
 
+        monkeypatch.setattr(tasks, "time", pretend.stub(time=lambda: 1000.0))
+
         task = tasks.WarehouseTask()
         task.app = Celery()
 
@@ -127,76 +129,162 @@ class TestWarehouseTask:
         assert task.apply_async() is async_result
 
         assert apply_async.calls == [
-            pretend.call(
-                task,
-            )
+            pretend.call(task, headers={"warehouse_due_at": 1000.0})
         ]
         assert get_current_request.calls == [pretend.call()]
 
-    def test_request_after_commit(self, monkeypatch):
-        manager = pretend.stub(
-            addAfterCommitHook=pretend.call_recorder(lambda *a, **kw: None)
-        )
-        request = pretend.stub(
-            tm=pretend.stub(get=pretend.call_recorder(lambda: manager))
-        )
-        get_current_request = pretend.call_recorder(lambda: request)
-        monkeypatch.setattr(tasks, "get_current_request", get_current_request)
+    def test_request_after_commit(self, monkeypatch, metrics):
+        apply_async = pretend.call_recorder(lambda *a, **kw: None)
+        monkeypatch.setattr(Task, "apply_async", apply_async)
+        monkeypatch.setattr(tasks, "time", pretend.stub(time=lambda: 1000.0))
 
+        tm = transaction.TransactionManager(explicit=True)
+        request = pretend.stub(tm=tm, find_service=lambda *a, **kw: metrics)
+        monkeypatch.setattr(tasks, "get_current_request", lambda: request)
+
+        producer = pretend.stub()
         task = tasks.WarehouseTask()
         task.app = Celery()
+        monkeypatch.setattr(
+            task.app, "producer_or_acquire", lambda: contextlib.nullcontext(producer)
+        )
 
-        args = (pretend.stub(), pretend.stub())
-        kwargs = {
-            "foo": pretend.stub(),
-        }
+        with tm:
+            assert task.apply_async(("foo",), {}) is None
+            assert task.apply_async(("foo",), {}) is None
+            assert task.apply_async(("bar",), {}, countdown=5) is None
+            assert apply_async.calls == []
 
-        assert task.apply_async(*args, **kwargs) is None
-        assert get_current_request.calls == [pretend.call()]
-        assert request.tm.get.calls == [pretend.call()]
-        assert manager.addAfterCommitHook.calls == [
-            pretend.call(task._after_commit_hook, args=args, kws=kwargs)
+        assert apply_async.calls == [
+            pretend.call(
+                task,
+                ("foo",),
+                {},
+                producer=producer,
+                headers={"warehouse_due_at": 1000.0},
+            ),
+            pretend.call(
+                task,
+                ("bar",),
+                {},
+                producer=producer,
+                countdown=5,
+                headers={"warehouse_due_at": 1005.0},
+            ),
         ]
+        assert metrics.histogram.calls == [
+            pretend.call("warehouse.task.send.batch_size", 2)
+        ]
+        assert metrics.increment.calls == [
+            pretend.call("warehouse.task.send.coalesced", 1)
+        ]
+
+    def test_request_after_abort(self, monkeypatch, metrics):
+        apply_async = pretend.call_recorder(lambda *a, **kw: None)
+        monkeypatch.setattr(Task, "apply_async", apply_async)
+
+        tm = transaction.TransactionManager(explicit=True)
+        request = pretend.stub(tm=tm, find_service=lambda *a, **kw: metrics)
+        monkeypatch.setattr(tasks, "get_current_request", lambda: request)
+
+        task = tasks.WarehouseTask()
+        task.app = Celery()
+
+        tm.begin()
+        task.apply_async(("foo",), {})
+        tm.abort()
+
+        # A new transaction starts without any of the aborted tasks.
+        with tm:
+            pass
+
+        assert apply_async.calls == []
+        assert metrics.histogram.calls == []
+
+    def test_pending_tasks_unsuccessful_commit(self, metrics):
+        task = pretend.stub(
+            name="warehouse.test.task",
+            _send=pretend.call_recorder(lambda *a, **kw: None),
+        )
+        pending = tasks.PendingTasks(metrics)
+        pending.add(task, (("foo",), {}), {})
+
+        pending.send(False)
+
+        assert task._send.calls == []
+        assert metrics.histogram.calls == []
+
+    def test_pending_tasks_keep_sending_after_error(self, metrics):
+        producer = pretend.stub()
+        celery_app = pretend.stub(
+            producer_or_acquire=lambda: contextlib.nullcontext(producer)
+        )
 
-    @pytest.mark.parametrize("success", [True, False])
-    def test_after_commit_hook(self, monkeypatch, success):
-        args = [pretend.stub(), pretend.stub()]
-        kwargs = {"foo": pretend.stub(), "bar": pretend.stub()}
+        def fail(*a, **kw):
+            raise ValueError("nope")
 
+        failing = pretend.stub(name="warehouse.test.fails", app=celery_app, _send=fail)
+        working = pretend.stub(
+            name="warehouse.test.works",
+            app=celery_app,
+            _send=pretend.call_recorder(lambda *a, **kw: None),
+        )
+
+        pending = tasks.PendingTasks(metrics)
+        pending.add(failing, (("foo",), {}), {})
+        pending.add(working, (("foo",), {}), {})
+
+        pending.send(True)
+
+        assert working._send.calls == [pretend.call(("foo",), {}, producer=producer)]
+        assert metrics.histogram.calls == [
+            pretend.call("warehouse.task.send.batch_size", 2)
+        ]
+        assert metrics.increment.calls == []
+
+    @pytest.mark.parametrize(
+        ("options", "due_at"),
+        [
+            ({}, 1000.0),
+            ({"countdown": 30}, 1030.0),
+            (
+                {"eta": datetime.datetime(2026, 10, 19, 12, 0, tzinfo=datetime.UTC)},
+                1792411200.0,
+            ),
+        ],
+    )
+    def test_send_stamps_due_at(self, monkeypatch, options, due_at):
         apply_async = pretend.call_recorder(lambda *a, **kw: None)
+        monkeypatch.setattr(tasks, "time", pretend.stub(time=lambda: 1000.0))
 
         task = tasks.WarehouseTask()
         task.app = Celery()
 
         monkeypatch.setattr(Task, "apply_async", apply_async)
 
-        task._after_commit_hook(success, *args, **kwargs)
+        task._send(headers={"foo": "bar"}, **options)
 
-        if success:
-            assert apply_async.calls == [pretend.call(task, *args, **kwargs)]
-        else:
-            assert apply_async.calls == []
+        assert apply_async.calls == [
+            pretend.call(
+                task, headers={"foo": "bar", "warehouse_due_at": due_at}, **options
+            )
+        ]
 
-    def test_creates_request(self, monkeypatch):
-        registry = pretend.stub(settings={"warehouse.ip_salt": "peppa"})
+    @pytest.mark.parametrize("uses_db", [True, False])
+    def test_acquires_request(self, uses_db):
         pyramid_env = {"request": pretend.stub()}
-
-        monkeypatch.setattr(scripting, "prepare", lambda *a, **k: pyramid_env)
+        pool = pretend.stub(acquire=pretend.call_recorder(lambda **kw: pyramid_env))
+        registry = {"celery.request_pool": pool}
 
         obj = tasks.WarehouseTask()
+        obj.uses_db = uses_db
         obj.app.pyramid_config = pretend.stub(registry=registry)
 
         request = obj.get_request()
 
-        assert obj.request.pyramid_env == pyramid_env
+        assert obj.request.pyramid_env is pyramid_env
         assert request is pyramid_env["request"]
-        assert isinstance(request.tm, transaction.TransactionManager)
-        assert 1.5e12 < request.timings["new_request_start"] < 1e13
-        assert request.remote_addr == "127.0.0.1"
-        assert (
-            request.remote_addr_hashed
-            == "cc9dfe9c4e6b6579bbf789d04339bd2d7f10aadf84ff4394193d99f14a0333f0"
-        )
+        assert pool.acquire.calls == [pretend.call(uses_db=uses_db)]
 
     def test_reuses_request(self):
         pyramid_env = {"request": pretend.stub()}
@@ -234,6 +322,7 @@ class TestWarehouseTask:
 
         obj = task_type()
         obj.get_request = lambda: request
+        obj.request_stack = pretend.stub(top=None)
 
         assert obj.run(arg, kwarg_=kwarg) is result
         assert run.calls == [pretend.call(arg, kwarg_=kwarg)]
@@ -247,6 +336,39 @@ class TestWarehouseTask:
             pretend.call("warehouse.task.complete", tags=["task:warehouse.test.task"]),
         ]
 
+    @pytest.mark.parametrize(
+        ("queue", "expected_queue"), [(None, "default"), ("critical", "critical")]
+    )
+    def test_run_records_queue_wait(self, monkeypatch, metrics, queue, expected_queue):
+        request = pretend.stub(
+            tm=pretend.stub(
+                __enter__=pretend.call_recorder(lambda *a, **kw: None),
+                __exit__=pretend.call_recorder(lambda *a, **kw: None),
+            ),
+            find_service=lambda *a, **kw: metrics,
+        )
+        monkeypatch.setattr(tasks, "time", pretend.stub(time=lambda: 1002.5))
+
+        attrs = {"name": "warehouse.test.task", "run": staticmethod(lambda: None)}
+        if queue is not None:
+            attrs["queue"] = queue
+        task_type = type("Foo", (tasks.WarehouseTask,), attrs)
+
+        obj = task_type()
+        obj.get_request = lambda: request
+        obj.request_stack = pretend.stub(top=None)
+        obj.request.update(warehouse_due_at=1000.0)
+
+        obj.run()
+
+        assert metrics.timing.calls == [
+            pretend.call(
+                "warehouse.task.queue_wait",
+                2500.0,
+                tags=["task:warehouse.test.task", f"queue:{expected_queue}"],
+            )
+        ]
+
     def test_run_retries_failed_transaction(self, metrics):
         class RetryThisError(RetryableException):
             pass
@@ -277,6 +399,7 @@ class TestWarehouseTask:
 
         obj = task_type()
         obj.get_request = lambda: request
+        obj.request_stack = pretend.stub(top=None)
 
         with pytest.raises(RetryError):
             obj.run()
@@ -316,6 +439,7 @@ class TestWarehouseTask:
 
         obj = task_type()
         obj.get_request = lambda: request
+        obj.request_stack = pretend.stub(top=None)
 
         with pytest.raises(DontRetryThisError):
             obj.run()
@@ -372,6 +496,84 @@ class TestWarehouseTask:
         assert obj.request.pyramid_env["closer"].calls == [pretend.call()]
 
 
+class TestTaskRequestPool:
+    @pytest.fixture
+    def registry(self):
+        config = Configurator(settings={"warehouse.ip_salt": "peppa"})
+        config.add_request_method(lambda r: object(), name="thing", reify=True)
+        config.commit()
+        return config.registry
+
+    def test_acquire_and_release(self, registry):
+        pool = tasks.TaskRequestPool(registry)
+
+        env = pool.acquire()
+        request = env["request"]
+        finished = pretend.call_recorder(lambda request: None)
+
+        assert get_current_request() is request
+        assert request.registry is registry
+        assert isinstance(request.tm, transaction.TransactionManager)
+        assert 1.5e12 < request.timings["new_request_start"] < 1e13
+        assert request.remote_addr == "127.0.0.1"
+        assert (
+            request.remote_addr_hashed
+            == "cc9dfe9c4e6b6579bbf789d04339bd2d7f10aadf84ff4394193d99f14a0333f0"
+        )
+
+        thing, tm = request.thing, request.tm
+        request.foo = "bar"
+        request.environ["foo"] = "bar"
+        request.add_finished_callback(finished)
+
+        env["closer"]()
+
+        assert finished.calls == [pretend.call(request)]
+        assert get_current_request() is None
+        assert not hasattr(request, "foo")
+        assert "foo" not in request.environ
+
+        # The same request is handed out again, without anything from its
+        # last use.
+        env = pool.acquire()
+
+        assert env["request"] is request
+        assert request.thing is not thing
+        assert request.tm is not tm
+        assert request.remote_addr == "127.0.0.1"
+
+        env["closer"]()
+
+    def test_acquire_while_in_use(self, registry):
+        pool = tasks.TaskRequestPool(registry)
+
+        first = pool.acquire()
+        second = pool.acquire()
+
+        assert first["request"] is not second["request"]
+        assert get_current_request() is second["request"]
+
+        second["closer"]()
+        first["closer"]()
+
+        assert get_current_request() is None
+
+    def test_without_db(self, registry):
+        pool = tasks.TaskRequestPool(registry)
+
+        env = pool.acquire(uses_db=False)
+
+        with pytest.raises(RuntimeError, match="uses_db=False"):
+            env["request"].db.query
+
+        env["closer"]()
+        env = pool.acquire()
+
+        assert "db" not in env["request"].__dict__
+
+        env["closer"]()
+
+
 class TestCeleryTaskGetter:
     def test_gets_task(self):
         task_func = pretend.stub(__name__="task_func", __module__="tests.foo")
@@ -457,7 +659,7 @@ def test_make_celery_app():
             True,
             "redis://127.0.0.1:6379/10",
             "redis://127.0.0.1:6379/10",
-            {},
+            {"queue_order_strategy": "priority"},
         ),
         (
             Environment.production,
@@ -472,6 +674,7 @@ def test_make_celery_app():
                 "?ssl_cert_reqs=required&ssl_ca_certs=/p/a/t/h/cacert.pem"
             ),
             {
+                "queue_order_strategy": "priority",
                 "socket_timeout": 5,
             },
         ),
@@ -482,6 +685,7 @@ def test_includeme(env, ssl, broker_redis_url, expected_url, transport_options):
     config = pretend.stub(
         action=pretend.call_recorder(lambda *a, **kw: None),
         add_directive=pretend.call_recorder(lambda *a, **kw: None),
+        add_periodic_task=pretend.call_recorder(lambda *a, **kw: None),
         add_request_method=pretend.call_recorder(lambda *a, **kw: None),
         registry=pretend.stub(
             __getitem__=registry_dict.__getitem__,
@@ -500,6 +704,7 @@ def test_includeme(env, ssl, broker_redis_url, expected_url, transport_options):
 
     assert app.Task is tasks.WarehouseTask
     assert app.pyramid_config is config
+    assert isinstance(config.registry["celery.request_pool"], tasks.TaskRequestPool)
     for key, value in {
         "broker_transport_options": transport_options,
         "broker_url": expected_url,
@@ -510,7 +715,12 @@ def test_includeme(env, ssl, broker_redis_url, expected_url, transport_options):
         "task_serializer": "json",
         "accept_content": ["json", "msgpack"],
         "task_queue_ha_policy": "all",
-        "task_queues": (Queue("default", routing_key="task.#"),),
+        "task_queues": (
+            Queue("critical", routing_key="task.critical"),
+            Queue("default", routing_key="task.#"),
+            Queue("email", routing_key="task.email"),
+            Queue("bulk", routing_key="task.bulk"),
+        ),
         "task_routes": {},
         "REDBEAT_REDIS_URL": (config.registry.settings["celery.scheduler_url"]),
     }.items():
@@ -524,3 +734,36 @@ def test_includeme(env, ssl, broker_redis_url, expected_url, transport_options):
     assert config.add_request_method.calls == [
         pretend.call(tasks._get_task_from_request, name="task", reify=True)
     ]
+    assert config.add_periodic_task.calls == [
+        pretend.call(crontab(minute="*"), tasks.report_queue_depths)
+    ]
+
+
+def test_task_rejects_unknown_queue():
+    with pytest.raises(ValueError, match="Unknown task queue: 'nope'"):
+        tasks.task(queue="nope")
+
+
+def test_report_queue_depths(metrics):
+    sizes = {"critical": 0, "default": 3, "email": 1, "bulk": 250}
+    channel = pretend.stub(
+        queue_declare=lambda queue: pretend.stub(message_count=sizes[queue])
+    )
+    connection = pretend.stub(
+        __enter__=lambda: pretend.stub(default_channel=channel),
+        __exit__=lambda *a: None,
+    )
+    celery_app = pretend.stub(connection_for_read=lambda: connection)
+    request = pretend.stub(
+        find_service=lambda *a, **kw: metrics,
+        registry={"celery.app": celery_app},
+    )
+
+    tasks.report_queue_depths(request)
+
+    assert metrics.gauge.calls == [
+        pretend.call("warehouse.task.queue_depth", 0, tags=["queue:critical"]),
+        pretend.call("warehouse.task.queue_depth", 3, tags=["queue:default"]),
+        pretend.call("warehouse.task.queue_depth", 1, tags=["queue:email"]),
+        pretend.call("warehouse.task.queue_depth", 250, tags=["queue:bulk"]),
+    ]
@@ -784,6 +784,30 @@ def test_stats(db_request):
     }
 
 
+def test_stats_tracks_removed_files(db_request):
+    project = ProjectFactory.create()
+    other = ProjectFactory.create()
+    release = ReleaseFactory.create(project=project)
+    other_release = ReleaseFactory.create(project=other)
+    file_ = FileFactory.create(release=release, size=100)
+    FileFactory.create(release=other_release, size=50)
+    db_request.db.flush()
+
+    assert stats(db_request)["total_packages_size"] == 150
+
+    db_request.db.delete(file_)
+    db_request.db.flush()
+
+    assert stats(db_request) == {
+        "total_packages_size": 50,
+        "top_packages": {other.name: {"size": 50}, project.name: {"size": 0}},
+    }
+
+
+def test_stats_empty(db_request):
+    assert stats(db_request) == {"total_packages_size": 0, "top_packages": {}}
+
+
 def test_health():
     request = pretend.stub(
         db=pretend.stub(execute=pretend.call_recorder(lambda q: None))
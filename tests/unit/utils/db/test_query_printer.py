@@ -2,6 +2,8 @@
 
 import logging
 
+import pytest
+
 from sqlalchemy import select
 
 from warehouse.packaging.models import Project
@@ -18,3 +20,22 @@ def test_print_query_renders_params(caplog):
 
     assert ":name_1" not in caplog.text
     assert "WHERE projects.name = 'value'" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("statement", "expected"),
+    [
+        (
+            "SELECT projects.id \nFROM projects \nWHERE projects.name = %(name_1)s",
+            "SELECT projects.id FROM projects WHERE projects.name = %(name_1)s",
+        ),
+        ("SELECT 'it''s', 12.5, anon_1.id FROM x", "SELECT ?, ?, anon_1.id FROM x"),
+        (
+            "WHERE id IN (%(id_1_1)s::UUID, %(id_1_2)s::UUID) AND lower(%(lower_1)s)",
+            "WHERE id IN (%(id_1)s::UUID, ...) AND lower(%(lower_1)s)",
+        ),
+        ("WHERE id IN (%(id_1_1)s)", "WHERE id IN (%(id_1)s, ...)"),
+    ],
+)
+def test_fingerprint(statement, expected):
+    assert query_printer.fingerprint(statement) == expected
@@ -1,17 +1,29 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import gzip
+import random
+
+import brotli
 import pretend
 import pytest
+import zstandard
 
-from pyramid.httpexceptions import HTTPOk
+from pyramid.httpexceptions import HTTPNotModified, HTTPOk
 from webob.acceptparse import AcceptEncodingNoHeader, AcceptEncodingValidHeader
 from webob.response import gzip_app_iter
 
+from warehouse.utils import compression
 from warehouse.utils.compression import (
     _compressor as compressor,
     compression_tween_factory,
 )
 
+DECOMPRESS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+}
+
 
 class TestCompressor:
     @pytest.mark.parametrize(
@@ -60,7 +72,18 @@ class TestCompressor:
         assert response.content_encoding == "gzip"
         assert response.content_length == len(compressed_body)
         assert response.body == compressed_body
-        assert response.etag != original_etag
+        assert response.etag == compression.encoded_etag(original_etag, "gzip")
+
+    def test_compresses_non_streaming_without_etag(self):
+        decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
+
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader("gzip"))
+        response = HTTPOk(body=decompressed_body)
+
+        compressor(request, response)
+
+        assert response.content_encoding == "gzip"
+        assert response.etag is None
 
     def test_compresses_streaming(self):
         decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
@@ -90,6 +113,15 @@ class TestCompressor:
         assert response.body == compressed_body
         assert response.etag == "rfbezwKUdGjz6VPWDLDTvA"
 
+    def test_doesnt_compress_not_modified(self):
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader("gzip"))
+        response = HTTPNotModified(headers={"ETag": '"foo"'})
+
+        compressor(request, response)
+
+        assert response.content_encoding is None
+        assert response.etag == "foo"
+
     def test_buffers_small_streaming(self):
         decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
         compressed_body = b"".join(list(gzip_app_iter([decompressed_body])))
@@ -115,11 +147,161 @@ class TestCompressor:
         assert response.content_length == 3
         assert response.body == b"foo"
 
+    @pytest.mark.parametrize(
+        ("accept_encoding", "expected"),
+        [
+            ("zstd, br, gzip", "zstd"),
+            ("br, gzip", "br"),
+            ("gzip;q=0.5, br", "br"),
+            ("gzip", "gzip"),
+        ],
+    )
+    def test_negotiates_encoding(self, accept_encoding, expected):
+        decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
+
+        request = pretend.stub(
+            accept_encoding=AcceptEncodingValidHeader(accept_encoding)
+        )
+        response = HTTPOk(body=decompressed_body)
+
+        compressor(request, response)
 
-def test_compression_tween_factory():
+        assert response.content_encoding == expected
+        assert response.content_length == len(response.body)
+        assert DECOMPRESS[expected](response.body) == decompressed_body
+
+    @pytest.mark.parametrize("encoding", ["br", "zstd"])
+    def test_compresses_streaming_encoding(self, encoding):
+        decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
+
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader(encoding))
+        response = HTTPOk(app_iter=iter([decompressed_body, decompressed_body]))
+        response.etag = "foo"
+
+        compressor(request, response)
+
+        assert response.content_encoding == encoding
+        assert response.content_length is None
+        assert DECOMPRESS[encoding](response.body) == decompressed_body * 2
+        # Each encoding of a response has its own ETag.
+        assert response.etag not in {"foo", "rfbezwKUdGjz6VPWDLDTvA"}
+
+    @pytest.mark.parametrize(
+        ("encoding", "level"), [("gzip", 1), ("br", 11), ("zstd", 19)]
+    )
+    def test_uses_level(self, encoding, level):
+        decompressed_body = b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo"
+
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader(encoding))
+        response = HTTPOk(body=decompressed_body)
+
+        compressor(
+            request,
+            response,
+            levels={**compression.DEFAULT_LEVELS, encoding: level},
+        )
+
+        assert response.body == b"".join(
+            compression._compressed_app_iter([decompressed_body], encoding, level)
+        )
+        assert DECOMPRESS[encoding](response.body) == decompressed_body
+
+    def test_caches_compressed_body(self, monkeypatch):
+        decompressed_body = b"foo" * compression.CACHE_MIN_LENGTH
+        cache = compression._CompressedCache()
+
+        responses = []
+        for _ in range(2):
+            request = pretend.stub(accept_encoding=AcceptEncodingValidHeader("br"))
+            response = HTTPOk(body=decompressed_body)
+            response.etag = "foo"
+            compressor(request, response, cache=cache)
+            responses.append(response)
+
+            # Only the first response should have needed compressing.
+            monkeypatch.setattr(
+                compression, "_compressed_app_iter", pretend.raiser(AssertionError)
+            )
+
+        first, second = responses
+        assert second.content_encoding == "br"
+        assert second.body == first.body
+        assert second.content_length == first.content_length
+        assert second.etag == first.etag == compression.encoded_etag("foo", "br")
+        assert brotli.decompress(second.body) == decompressed_body
+
+    def test_doesnt_cache_small_body(self):
+        cache = compression._CompressedCache()
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader("br"))
+        response = HTTPOk(body=b"foofoofoofoofoofoofoofoofoofoofoofoofoofoo")
+
+        compressor(request, response, cache=cache)
+
+        assert response.content_encoding == "br"
+        assert cache._entries == {}
+
+    def test_doesnt_cache_incompressible(self):
+        cache = compression._CompressedCache()
+        request = pretend.stub(accept_encoding=AcceptEncodingValidHeader("br"))
+        response = HTTPOk(body=random.Random(0).randbytes(compression.CACHE_MIN_LENGTH))
+
+        compressor(request, response, cache=cache)
+
+        assert response.content_encoding is None
+        assert cache._entries == {}
+
+
+class TestCompressedCache:
+    def test_get_missing(self):
+        assert compression._CompressedCache().get("key") is None
+
+    def test_set_and_get(self):
+        cache = compression._CompressedCache()
+        cache.set("key", b"body")
+
+        assert cache.get("key") == b"body"
+
+    def test_evicts_least_recently_used(self):
+        cache = compression._CompressedCache(max_bytes=10)
+        cache.set("a", b"aaaa")
+        cache.set("b", b"bbbb")
+        cache.get("a")
+        cache.set("c", b"cccc")
+
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("b") is None
+        assert cache.get("c") == b"cccc"
+        assert cache._size == 8
+
+    def test_ignores_existing(self):
+        cache = compression._CompressedCache()
+        cache.set("a", b"aaaa")
+        cache.set("a", b"aaaa")
+
+        assert cache._size == 4
+
+    def test_ignores_too_large(self):
+        cache = compression._CompressedCache(max_bytes=2)
+        cache.set("a", b"aaaa")
+
+        assert cache.get("a") is None
+        assert cache._size == 0
+
+
+@pytest.mark.parametrize(
+    ("settings", "expected"),
+    [
+        ({}, compression.DEFAULT_LEVELS),
+        (
+            {"compression.gzip_level": 6, "compression.zstd_level": 3},
+            {"gzip": 6, "br": 5, "zstd": 3},
+        ),
+    ],
+)
+def test_compression_tween_factory(settings, expected):
     callbacks = []
 
-    registry = pretend.stub()
+    registry = pretend.stub(settings=settings)
     request = pretend.stub(add_response_callback=callbacks.append)
     response = pretend.stub()
 
@@ -130,4 +312,7 @@ def test_compression_tween_factory():
     tween = compression_tween_factory(handler, registry)
 
     assert tween(request) is response
-    assert callbacks == [compressor]
+    assert len(callbacks) == 1
+    assert callbacks[0].func is compressor
+    assert callbacks[0].keywords["levels"] == expected
+    assert isinstance(callbacks[0].keywords["cache"], compression._CompressedCache)
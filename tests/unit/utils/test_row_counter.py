@@ -3,6 +3,8 @@
 import pretend
 
 from celery.schedules import crontab
+from sqlalchemy import sql
+from sqlalchemy.dialects import postgresql
 
 from warehouse.accounts.models import User
 from warehouse.packaging.models import File, Project, Release
@@ -23,7 +25,10 @@ def test_compute_row_counts(db_request):
     FileFactory(release=release3, packagetype="bdist_wheel")
 
     counts = dict(
-        db_request.db.query(row_counter.RowCount.table_name, row_counter.RowCount.count)
+        db_request.db.query(
+            row_counter.RowCount.table_name,
+            row_counter.RowCount.folded_count,
+        )
         .filter(
             row_counter.RowCount.table_name.in_(
                 [
@@ -37,12 +42,20 @@ def test_compute_row_counts(db_request):
         .all()
     )
 
-    assert counts == {"users": 0, "projects": 0, "releases": 0, "release_files": 0}
+    assert counts == {
+        "users": None,
+        "projects": None,
+        "releases": None,
+        "release_files": None,
+    }
 
     row_counter.compute_row_counts(db_request)
 
     counts = dict(
-        db_request.db.query(row_counter.RowCount.table_name, row_counter.RowCount.count)
+        db_request.db.query(
+            row_counter.RowCount.table_name,
+            row_counter.RowCount.folded_count,
+        )
         .filter(
             row_counter.RowCount.table_name.in_(
                 [
@@ -59,6 +72,90 @@ def test_compute_row_counts(db_request):
     assert counts == {"users": 3, "projects": 2, "releases": 3, "release_files": 4}
 
 
+def test_get_row_counts_includes_unfolded_changes(db_request):
+    project = ProjectFactory()
+    ReleaseFactory.create_batch(3, project=project)
+    ProjectFactory()
+
+    assert row_counter.get_row_counts(db_request.db, [Project, Release]) == {
+        "projects": 2,
+        "releases": 3,
+    }
+
+    row_counter.compute_row_counts(db_request)
+
+    # Deleting a project deletes its releases too.
+    db_request.db.delete(project)
+    db_request.db.flush()
+
+    assert row_counter.get_row_counts(db_request.db, [Project, Release]) == {
+        "projects": 1,
+        "releases": 0,
+    }
+
+    row_counter.compute_row_counts(db_request)
+
+    assert (
+        db_request.db.query(row_counter.RowCountDelta)
+        .filter(row_counter.RowCountDelta.delta != 0)
+        .count()
+        == 0
+    )
+    assert row_counter.get_row_counts(db_request.db, [Project, Release]) == {
+        "projects": 1,
+        "releases": 0,
+    }
+
+
+def test_compute_row_counts_ignores_previous_counts(db_request):
+    ProjectFactory.create_batch(2)
+    # The previous version of compute_row_counts overwrites count with the
+    # number of rows, while the deltas for those rows are still pending.
+    db_request.db.execute(
+        sql.update(row_counter.RowCount)
+        .where(row_counter.RowCount.table_name == Project.__tablename__)
+        .values(count=2)
+    )
+
+    assert row_counter.get_row_counts(db_request.db, [Project]) == {"projects": 2}
+
+    row_counter.compute_row_counts(db_request)
+    ProjectFactory.create()
+    db_request.db.execute(
+        sql.update(row_counter.RowCount)
+        .where(row_counter.RowCount.table_name == Project.__tablename__)
+        .values(count=3)
+    )
+
+    assert row_counter.get_row_counts(db_request.db, [Project]) == {"projects": 3}
+
+    row_counter.compute_row_counts(db_request)
+
+    assert row_counter.get_row_counts(db_request.db, [Project]) == {"projects": 3}
+
+
+def test_compute_row_counts_skips_locked_shards():
+    executed = []
+
+    def execute(statement):
+        executed.append(str(statement.compile(dialect=postgresql.dialect())))
+        return pretend.stub(all=lambda: [])
+
+    row_counter.compute_row_counts(
+        pretend.stub(
+            db=pretend.stub(
+                execute=execute, scalars=lambda statement: pretend.stub(all=list)
+            )
+        )
+    )
+
+    (select,) = executed
+    assert select.endswith(
+        "ORDER BY row_count_deltas.table_name, row_count_deltas.shard "
+        "FOR UPDATE OF row_count_deltas SKIP LOCKED"
+    )
+
+
 def test_includeme():
     config = pretend.stub(add_periodic_task=pretend.call_recorder(lambda c, f: None))
     row_counter.includeme(config)
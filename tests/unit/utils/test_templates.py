@@ -0,0 +1,148 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import jinja2
+import pretend
+import pytest
+
+from pyramid_jinja2 import ENV_CONFIG_PHASE, IJinja2Environment
+
+from warehouse.metrics import IMetricsService
+from warehouse.utils import templates
+
+
+@pytest.fixture
+def current_request(monkeypatch, metrics):
+    request = pretend.stub(
+        find_service=pretend.call_recorder(lambda iface, context: metrics)
+    )
+    monkeypatch.setattr(templates, "get_current_request", lambda: request)
+    return request
+
+
+def _environment(tmp_path, **kwargs):
+    return jinja2.Environment(
+        loader=jinja2.DictLoader(
+            {
+                "index.html": "{% include 'hello.html' %}!",
+                "hello.html": "Hello {{ name }}",
+            }
+        ),
+        bytecode_cache=templates.MeteredBytecodeCache(str(tmp_path)),
+        **kwargs,
+    )
+
+
+class TestMeteredBytecodeCache:
+    def test_records_compiles(self, tmp_path, current_request, metrics):
+        # The first environment has to compile the template, the second loads
+        # it from the cache.
+        _environment(tmp_path).get_template("hello.html")
+        _environment(tmp_path).get_template("hello.html")
+
+        assert metrics.increment.calls == [
+            pretend.call("warehouse.template.compiled", tags=["template:hello.html"])
+        ]
+        assert current_request.find_service.calls == [
+            pretend.call(IMetricsService, context=None)
+        ]
+
+    def test_strips_parent(self, tmp_path, current_request, metrics):
+        name = f"hello.html{templates.PARENT_RELATIVE_DELIM}warehouse:templates/a.html"
+        env = _environment(tmp_path)
+        env.loader.mapping[name] = "Hello"
+        env.get_template(name)
+
+        assert metrics.increment.calls == [
+            pretend.call("warehouse.template.compiled", tags=["template:hello.html"])
+        ]
+
+    def test_without_request(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(templates, "get_current_request", lambda: None)
+
+        assert _environment(tmp_path).get_template("hello.html").render(name="World")
+
+
+class TestMeteredTemplate:
+    def test_records_render(self, tmp_path, current_request, metrics):
+        env = _environment(tmp_path)
+        env.template_class = templates.MeteredTemplate
+
+        assert env.get_template("index.html").render(name="World") == "Hello World!"
+        # Only the template we rendered is timed, not the ones it includes.
+        assert metrics.timed.calls == [
+            pretend.call("warehouse.template.render", tags=["template:index.html"])
+        ]
+
+    def test_without_request(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(templates, "get_current_request", lambda: None)
+        env = _environment(tmp_path)
+        env.template_class = templates.MeteredTemplate
+
+        assert env.get_template("index.html").render(name="World") == "Hello World!"
+
+
+def test_compile_templates(tmp_path, monkeypatch):
+    for package in ["warehouse", "warehouse.admin"]:
+        (tmp_path / package / "templates" / "email").mkdir(parents=True)
+        (tmp_path / package / "templates" / "base.html").write_text("")
+        (tmp_path / package / "templates" / "email" / "body.txt").write_text("")
+        (tmp_path / package / "templates" / "README.md").write_text("")
+
+    resolver = pretend.stub(
+        resolve=lambda spec: pretend.stub(
+            abspath=lambda: str(tmp_path / spec.replace(":", "/"))
+        )
+    )
+    monkeypatch.setattr(templates, "AssetResolver", lambda: resolver)
+
+    html = pretend.stub(get_template=pretend.call_recorder(lambda name: None))
+    txt = pretend.stub(get_template=pretend.call_recorder(lambda name: None))
+    registry = pretend.stub(
+        getUtilitiesFor=pretend.call_recorder(
+            lambda iface: [(".html", html), (".txt", txt)]
+        )
+    )
+
+    assert templates.compile_templates(registry) == 4
+    assert registry.getUtilitiesFor.calls == [pretend.call(IJinja2Environment)]
+    assert html.get_template.calls == [
+        pretend.call("warehouse:templates/base.html"),
+        pretend.call("warehouse.admin:templates/base.html"),
+    ]
+    assert txt.get_template.calls == [
+        pretend.call("warehouse:templates/email/body.txt"),
+        pretend.call("warehouse.admin:templates/email/body.txt"),
+    ]
+
+
+@pytest.mark.parametrize("directory", [None, "cache"])
+def test_includeme(tmp_path, directory):
+    if directory is not None:
+        directory = str(tmp_path / directory)
+
+    env = pretend.stub(template_class=jinja2.Template)
+    config = pretend.stub(
+        registry=pretend.stub(
+            settings={"jinja2.bytecode_caching_directory": directory},
+            getUtilitiesFor=lambda iface: [(".html", env)],
+        ),
+        add_settings=pretend.call_recorder(lambda settings: None),
+        action=pretend.call_recorder(lambda discriminator, callable, order: None),
+    )
+
+    templates.includeme(config)
+
+    (add_settings,) = config.add_settings.calls
+    bytecode_cache = add_settings.args[0]["jinja2.bytecode_caching"]
+    assert isinstance(bytecode_cache, templates.MeteredBytecodeCache)
+    if directory is not None:
+        assert bytecode_cache.directory == directory
+        assert (tmp_path / "cache").is_dir()
+
+    (action,) = config.action.calls
+    discriminator, set_template_class = action.args
+    assert discriminator is None
+    assert action.kwargs == {"order": ENV_CONFIG_PHASE + 1}
+
+    set_template_class()
+    assert env.template_class is templates.MeteredTemplate
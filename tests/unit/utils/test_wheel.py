@@ -140,3 +140,32 @@ from warehouse.utils import wheel
 )
 def test_wheel_to_pretty_tags(filename, expected_tags):
     assert wheel.filename_to_pretty_tags(filename) == expected_tags
+
+
+def test_wheel_to_pretty_tags_cached():
+    wheel._filename_to_pretty_tags.cache_clear()
+    wheel.filename_to_tags.cache_clear()
+
+    filename = "cryptography-42.0.5-cp37-abi3-musllinux_1_2_x86_64.whl"
+    first = wheel.filename_to_pretty_tags(filename)
+    first.append("mutated")
+
+    assert wheel.filename_to_pretty_tags(filename) == [
+        "CPython 3.7+",
+        "musllinux: musl 1.2+ x86-64",
+    ]
+    assert wheel._filename_to_pretty_tags.cache_info().hits == 1
+    assert wheel.filename_to_tags.cache_info().misses == 1
+
+
+def test_filename_to_filters_cached():
+    wheel.filename_to_tags.cache_clear()
+
+    filename = "foo-1.0-cp311-cp311-manylinux_2_17_x86_64.whl"
+    assert wheel.filename_to_filters(filename) == wheel.filenames_to_filters([filename])
+    assert wheel.filename_to_tags.cache_info().misses == 1
+    assert wheel.filename_to_tags.cache_info().hits == 1
+
+
+def test_filename_to_tags_invalid():
+    assert wheel.filename_to_tags("foo-1.0.tar.gz") == frozenset()
@@ -292,3 +292,9 @@ class IDomainStatusService(Interface):
         """
         Returns a list of status strings for the given domain.
         """
+
+    def get_domain_statuses(domains: list[str]) -> dict[str, list[str] | None]:
+        """
+        Returns a mapping of each of the given domains to its list of status
+        strings, checking each distinct domain only once.
+        """
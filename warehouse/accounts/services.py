@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import datetime
 import functools
 import hashlib
@@ -1005,12 +1006,20 @@ class NullDomainStatusService:
     def get_domain_status(self, _domain: str) -> list[str]:
         return ["active"]
 
+    def get_domain_statuses(self, domains: list[str]) -> dict[str, list[str]]:
+        return {
+            domain: self.get_domain_status(domain) for domain in dict.fromkeys(domains)
+        }
+
 
 @implementer(IDomainStatusService)
 class DomainrDomainStatusService:
-    def __init__(self, session, client_id):
+    def __init__(self, session, client_id, *, max_workers=8):
         self._http = session
         self.client_id = client_id
+        # This bounds how many requests we will have in flight to Domainr at once,
+        # and should not exceed the connection pool size of our HTTP session.
+        self.max_workers = max_workers
 
     @classmethod
     def create_service(cls, _context, request: Request) -> DomainrDomainStatusService:
@@ -1040,3 +1049,17 @@ class DomainrDomainStatusService:
             return None
 
         return resp.json()["status"][0]["status"].split()
+
+    def get_domain_statuses(self, domains: list[str]) -> dict[str, list[str] | None]:
+        """
+        Check the status of many domains, checking each distinct domain once, and
+        several of them concurrently.
+        """
+        domains = list(dict.fromkeys(domains))
+        if len(domains) <= 1:
+            return {domain: self.get_domain_status(domain) for domain in domains}
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(domains))
+        ) as executor:
+            return dict(zip(domains, executor.map(self.get_domain_status, domains)))
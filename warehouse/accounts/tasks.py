@@ -4,9 +4,10 @@ from __future__ import annotations
 
 import typing
 
+from collections import defaultdict
 from datetime import UTC, datetime, timedelta, timezone
 
-from sqlalchemy import func, nullsfirst, or_, select
+from sqlalchemy import and_, func, nullsfirst, or_, select, update
 
 from warehouse import tasks
 from warehouse.accounts.models import (
@@ -16,9 +17,8 @@ from warehouse.accounts.models import (
     User,
     UserTermsOfServiceEngagement,
 )
-from warehouse.accounts.services import IUserService
-from warehouse.accounts.utils import update_email_domain_status
-from warehouse.email import send_user_terms_of_service_updated
+from warehouse.accounts.services import IDomainStatusService, IUserService
+from warehouse.email import email_batch, send_user_terms_of_service_updated
 from warehouse.metrics import IMetricsService
 from warehouse.observations.models import ObservationKind
 from warehouse.packaging.models import Release
@@ -27,7 +27,7 @@ if typing.TYPE_CHECKING:
     from pyramid.request import Request
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def notify_users_of_tos_update(request):
     user_service = request.find_service(IUserService, context=None)
     already_notified_subquery = (
@@ -50,95 +50,91 @@ def notify_users_of_tos_update(request):
         .filter(User.id.not_in(select(already_notified_subquery)))
         .limit(request.registry.settings.get("terms.notification_batch_size"))
     )
-    for user in users_to_notify:
-        send_user_terms_of_service_updated(request, user)
-        user_service.record_tos_engagement(
-            user.id,
-            request.registry.settings.get("terms.revision"),
-            TermsOfServiceEngagement.Notified,
-        )
+    with email_batch(request):
+        for user in users_to_notify:
+            send_user_terms_of_service_updated(request, user)
+            user_service.record_tos_engagement(
+                user.id,
+                request.registry.settings.get("terms.revision"),
+                TermsOfServiceEngagement.Notified,
+            )
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def compute_user_metrics(request):
     """
     Report metrics about the users in the database.
     """
     metrics = request.find_service(IMetricsService, context=None)
 
-    # Total of users
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id)).scalar(),
-    )
-
-    # Total of active users
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id)).filter(User.is_active).scalar(),
-        tags=["active:true"],
-    )
-
-    # Total active users with unverified emails
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id.distinct()))
+    # Rather than scanning our users, emails, and releases once for every metric,
+    # we summarize each user once, and then count every metric from that summary.
+    unverified = or_(Email.verified.is_(None), Email.verified.is_(False))
+    emails = (
+        select(
+            User.id,
+            User.is_active,
+            func.bool_or(unverified).label("unverified"),
+            func.bool_or(and_(Email.primary, unverified)).label("unverified_primary"),
+        )
         .outerjoin(Email)
-        .filter(User.is_active)
-        .filter((Email.verified == None) | (Email.verified == False))  # noqa E711
-        .scalar(),
-        tags=["active:true", "verified:false"],
+        .group_by(User.id)
+        .subquery()
     )
-
-    # Total active users with unverified emails, and have project releases
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id.distinct()))
-        .outerjoin(Email)
-        .join(Release, Release.uploader_id == User.id)
-        .filter(User.is_active)
-        .filter((Email.verified == None) | (Email.verified == False))  # noqa E711
-        .scalar(),
-        tags=["active:true", "verified:false", "releases:true"],
+    releases = (
+        select(Release.uploader_id, func.max(Release.created).label("last_release"))
+        .group_by(Release.uploader_id)
+        .subquery()
     )
 
-    # Total active users with unverified emails, and have project releases that
-    # were uploaded within the past two years
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id.distinct()))
-        .outerjoin(Email)
-        .join(Release, Release.uploader_id == User.id)
-        .filter(User.is_active)
-        .filter((Email.verified == None) | (Email.verified == False))  # noqa E711
-        .filter(Release.created > datetime.now(tz=timezone.utc) - timedelta(days=730))
-        .scalar(),
-        tags=["active:true", "verified:false", "releases:true", "window:2years"],
-    )
+    active_unverified = and_(emails.c.is_active, emails.c.unverified)
+    has_releases = releases.c.last_release.is_not(None)
+    recent_releases = releases.c.last_release > datetime.now(
+        tz=timezone.utc
+    ) - timedelta(days=730)
 
-    # Total active users with unverified primary emails, and have project
-    # releases that were uploaded within the past two years
-    metrics.gauge(
-        "warehouse.users.count",
-        request.db.query(func.count(User.id.distinct()))
-        .outerjoin(Email)
-        .join(Release, Release.uploader_id == User.id)
-        .filter(User.is_active)
-        .filter((Email.verified == None) | (Email.verified == False))  # noqa E711
-        .filter(Email.primary)
-        .filter(Release.created > datetime.now(tz=timezone.utc) - timedelta(days=730))
-        .scalar(),
-        tags=[
-            "active:true",
-            "verified:false",
-            "releases:true",
-            "window:2years",
-            "primary:true",
+    # Total of users
+    total, *counts = request.db.execute(
+        select(
+            func.count(),
+            func.count().filter(emails.c.is_active),
+            func.count().filter(active_unverified),
+            func.count().filter(and_(active_unverified, has_releases)),
+            func.count().filter(and_(active_unverified, recent_releases)),
+            func.count().filter(
+                and_(active_unverified, recent_releases, emails.c.unverified_primary)
+            ),
+        ).select_from(emails.outerjoin(releases, releases.c.uploader_id == emails.c.id))
+    ).one()
+    metrics.gauge("warehouse.users.count", total)
+
+    for count, tags in zip(
+        counts,
+        [
+            # Total of active users
+            ["active:true"],
+            # Total active users with unverified emails
+            ["active:true", "verified:false"],
+            # Total active users with unverified emails, and have project releases
+            ["active:true", "verified:false", "releases:true"],
+            # Total active users with unverified emails, and have project releases
+            # that were uploaded within the past two years
+            ["active:true", "verified:false", "releases:true", "window:2years"],
+            # Total active users with unverified primary emails, and have project
+            # releases that were uploaded within the past two years
+            [
+                "active:true",
+                "verified:false",
+                "releases:true",
+                "window:2years",
+                "primary:true",
+            ],
         ],
-    )
+    ):
+        metrics.gauge("warehouse.users.count", count, tags=tags)
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def batch_update_email_domain_status(request: Request) -> None:
     """
     Update the email domain status for any domain last checked over 30 days ago.
@@ -160,8 +156,29 @@ def batch_update_email_domain_status(request: Request) -> None:
         .limit(1_000)
     )
 
+    # Many of our emails share a domain, so we only check each domain once, and
+    # then update every email with that domain at the same time.
+    email_ids_by_domain = defaultdict(list)
     for email in request.db.scalars(stmt):
-        update_email_domain_status(email, request)
+        email_ids_by_domain[email.domain].append(email.id)
+
+    domain_status_service = request.find_service(IDomainStatusService)
+    statuses = domain_status_service.get_domain_statuses(list(email_ids_by_domain))
+
+    email_ids_by_status = defaultdict(list)
+    for domain, domain_status in statuses.items():
+        if domain_status:
+            email_ids_by_status[tuple(domain_status)].extend(
+                email_ids_by_domain[domain]
+            )
+
+    now = datetime.now(tz=UTC)
+    for domain_status, email_ids in email_ids_by_status.items():
+        request.db.execute(
+            update(Email)
+            .where(Email.id.in_(email_ids))
+            .values(domain_last_checked=now, domain_last_status=list(domain_status))
+        )
 
 
 @tasks.task(ignore_result=True, acks_late=True)
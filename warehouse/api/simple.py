@@ -5,7 +5,7 @@ from pyramid.request import Request
 from pyramid.view import view_config
 from sqlalchemy import func
 
-from warehouse.cache.http import add_vary, cache_control
+from warehouse.cache.http import add_vary, cache_control, etag
 from warehouse.cache.origin import origin_cache
 from warehouse.packaging.models import JournalEntry, Project
 from warehouse.packaging.utils import (
@@ -49,8 +49,43 @@ def _select_content_type(request: Request) -> str:
         return offers[0][0]
 
 
+def _simple_index_etag(context, request):
+    # The index only changes when something is journaled, and the way that it
+    # is rendered only changes when we're deployed.
+    serial = request.db.query(func.max(JournalEntry.id)).scalar() or 0
+    return ":".join(
+        [
+            str(serial),
+            _select_content_type(request),
+            request.registry.settings["warehouse.commit"],
+        ]
+    )
+
+
+def _simple_detail_etag(project, request):
+    # We'll be redirecting these anyways.
+    if project.normalized_name != request.matchdict.get(
+        "name", project.normalized_name
+    ):
+        return None
+
+    # Changing the status or the alternate locations of a project doesn't write
+    # a journal entry, so those aren't reflected by the project's last serial.
+    return ":".join(
+        [
+            str(project.last_serial),
+            project.project_status.value,
+            *sorted(alt_repo.url for alt_repo in project.alternate_repositories),
+            _select_content_type(request),
+            request.registry.settings["warehouse.commit"],
+        ]
+    )
+
+
 @view_config(
     route_name="api.simple.index",
+    read_only=True,
+    query_budget=10,
     renderer="warehouse:templates/api/simple/index.html",
     decorator=[
         add_vary("Accept"),
@@ -60,6 +95,7 @@ def _select_content_type(request: Request) -> str:
             stale_while_revalidate=5 * 60,  # 5 minutes
             stale_if_error=1 * 24 * 60 * 60,  # 1 day
         ),
+        etag(_simple_index_etag),
     ],
 )
 def simple_index(request):
@@ -82,6 +118,8 @@ def simple_index(request):
 
 @view_config(
     route_name="api.simple.detail",
+    read_only=True,
+    query_budget=10,
     context=Project,
     renderer="warehouse:templates/api/simple/detail.html",
     decorator=[
@@ -92,6 +130,7 @@ def simple_index(request):
             stale_while_revalidate=5 * 60,  # 5 minutes
             stale_if_error=1 * 24 * 60 * 60,  # 1 day
         ),
+        etag(_simple_detail_etag),
     ],
 )
 def simple_detail(project, request):
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import functools
+import time
 import typing
 import warnings
 
@@ -34,6 +37,44 @@ SUPPORTED_ATTESTATION_TYPES = {
     AttestationType.SLSA_PROVENANCE_V1,
 }
 
+# How often each process refreshes Sigstore's trust root from its TUF repository.
+# In between, attestations are verified against the locally cached trust root
+# rather than refreshing it for every single attestation.
+TRUST_ROOT_REFRESH_INTERVAL = 60 * 60
+
+_trust_root_refresh_after = 0.0
+
+
+@functools.cache
+def _get_executor(max_workers: int) -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="attestations"
+    )
+
+
+def _verify_attestation(
+    metrics: IMetricsService,
+    attestation: Attestation,
+    identity,
+    distribution: Distribution,
+):
+    global _trust_root_refresh_after
+
+    offline = time.monotonic() < _trust_root_refresh_after
+
+    start = time.perf_counter()
+    result = attestation.verify(identity, distribution, offline=offline)
+    metrics.timing(
+        "warehouse.upload.attestations.verify",
+        (time.perf_counter() - start) * 1000,
+        tags=[f"trust_root:{'cached' if offline else 'refreshed'}"],
+    )
+
+    if not offline:
+        _trust_root_refresh_after = time.monotonic() + TRUST_ROOT_REFRESH_INTERVAL
+
+    return result
+
 
 def _extract_attestations_from_request(request: Request) -> list[Attestation]:
     """
@@ -121,17 +162,68 @@ class NullIntegrityService:
 
 @implementer(IIntegrityService)
 class IntegrityService:
-    def __init__(self, metrics: IMetricsService, session):
+    def __init__(
+        self,
+        metrics: IMetricsService,
+        session,
+        *,
+        verify_workers: int = 1,
+        verify_timeout: float | None = None,
+    ):
         self.metrics: IMetricsService = metrics
         self.db = session
+        self.verify_workers = verify_workers
+        self.verify_timeout = verify_timeout
 
     @classmethod
     def create_service(cls, _context, request):
+        settings = request.registry.settings
         return cls(
             metrics=request.find_service(IMetricsService),
             session=request.db,
+            verify_workers=settings.get("integrity.verify_workers", 1),
+            verify_timeout=settings.get("integrity.verify_timeout"),
         )
 
+    def _verify_attestations(
+        self, attestations: list[Attestation], identity, distribution: Distribution
+    ):
+        """
+        Return a callable per attestation, which returns the result of verifying
+        that attestation or raises the error that verifying it raised.
+
+        With a deadline, every attestation is verified on our pool of workers, and
+        the upload is rejected if they aren't all verified in time. Without one,
+        they are only handed to the pool when it can verify them in parallel.
+        """
+        verifications = [
+            functools.partial(
+                _verify_attestation, self.metrics, attestation, identity, distribution
+            )
+            for attestation in attestations
+        ]
+        if self.verify_timeout is None and (
+            self.verify_workers <= 1 or len(verifications) <= 1
+        ):
+            return verifications
+
+        executor = _get_executor(max(self.verify_workers, 1))
+        futures = [executor.submit(verification) for verification in verifications]
+
+        _, not_done = concurrent.futures.wait(futures, timeout=self.verify_timeout)
+        if not_done:
+            # A verification that has already started can't be cancelled, and would
+            # keep holding one of the pool's workers for the uploads after this
+            # one, so the pool is left to finish them and replaced with a new one.
+            executor.shutdown(wait=False, cancel_futures=True)
+            _get_executor.cache_clear()
+            self.metrics.increment("warehouse.upload.attestations.failed_timeout")
+            raise AttestationUploadError(
+                "Timed out while trying to verify included attestations"
+            )
+
+        return [future.result for future in futures]
+
     def parse_attestations(
         self, request: Request, distribution: Distribution
     ) -> list[Attestation]:
@@ -144,19 +236,22 @@ class IntegrityService:
         used to verify the attestations.
         """
 
+        start = time.perf_counter()
         attestations = _extract_attestations_from_request(request)
+        self.metrics.timing(
+            "warehouse.upload.attestations.parse", (time.perf_counter() - start) * 1000
+        )
 
         # Sanity-checked above.
         expected_identity = request.oidc_publisher.attestation_identity
 
         seen_predicate_types: set[AttestationType] = set()
 
-        for attestation_model in attestations:
+        for verification in self._verify_attestations(
+            attestations, expected_identity, distribution
+        ):
             try:
-                predicate_type_str, _ = attestation_model.verify(
-                    expected_identity,
-                    distribution,
-                )
+                predicate_type_str, _ = verification()
             except VerificationError as e:
                 # Log invalid (failed verification) attestation upload
                 self.metrics.increment("warehouse.upload.attestations.failed_verify")
@@ -2,6 +2,12 @@
 
 import collections.abc
 import functools
+import hashlib
+import zlib
+
+from pyramid.httpexceptions import HTTPNotModified
+
+from warehouse.utils.compression import DEFAULT_ENCODING, ENCODINGS, encoded_etag
 
 BUFFER_MAX = 1 * 1024 * 1024  # We'll buffer up to 1MB
 
@@ -59,6 +65,53 @@ def cache_control(
     return inner
 
 
+def fast_etag(body):
+    # An ETag only has to change whenever the body does, so rather than using a
+    # cryptographic hash we use a pair of checksums, which are several times
+    # quicker to compute over a large body.
+    return f"{len(body):x}-{zlib.crc32(body):08x}{zlib.adler32(body):08x}"
+
+
+def etag(validator):
+    """
+    Give the responses of a view a strong ETag from ``validator(context, request)``,
+    which should be something cheap (like a serial) that changes whenever the
+    response would, and answer a matching If-None-Match with a 304 without ever
+    calling the view.
+
+    If the validator returns ``None``, the view is called as normal.
+    """
+
+    def inner(view):
+        @functools.wraps(view)
+        def wrapped(context, request):
+            value = validator(context, request)
+            if value is None:
+                return view(context, request)
+
+            tag = hashlib.blake2b(value.encode("utf8"), digest_size=16).hexdigest()
+
+            if request.method in {"GET", "HEAD"} and request.if_none_match:
+                # The client may have been sent a compressed response, whose
+                # ETag was derived from ours by warehouse.utils.compression.
+                for candidate in [tag] + [
+                    encoded_etag(tag, encoding)
+                    for encoding in ENCODINGS
+                    if encoding != DEFAULT_ENCODING
+                ]:
+                    if candidate in request.if_none_match:
+                        return HTTPNotModified(headers={"ETag": f'"{candidate}"'})
+
+            response = view(context, request)
+            if response.status_code == 200:
+                response.etag = tag
+            return response
+
+        return wrapped
+
+    return inner
+
+
 def conditional_http_tween_factory(handler, registry):
     def conditional_http_tween(request):
         response = handler(request)
@@ -95,7 +148,7 @@ def conditional_http_tween_factory(handler, registry):
             # it one.
             if not streaming:
                 response.conditional_response = True
-                response.md5_etag()
+                response.etag = fast_etag(response.body)
 
         return response
 
@@ -10,6 +10,7 @@ from zope.interface import implementer
 
 from warehouse import tasks
 from warehouse.cache.origin.interfaces import IOriginCache
+from warehouse.db import DEFAULT_REPLICA_MAX_LAG, REPLICA_LAG_INTERVAL
 from warehouse.metrics.interfaces import IMetricsService
 
 
@@ -17,7 +18,9 @@ class UnsuccessfulPurgeError(Exception):
     pass
 
 
-@tasks.task(bind=True, ignore_result=True, acks_late=True)
+@tasks.task(
+    bind=True, ignore_result=True, acks_late=True, queue="critical", uses_db=False
+)
 def purge_key(task, request, key):
     cacher = request.find_service(IOriginCache)
     metrics = request.find_service(IMetricsService, context=None)
@@ -36,25 +39,53 @@ def purge_key(task, request, key):
 
 @implementer(IOriginCache)
 class FastlyCache:
-    def __init__(self, *, api_endpoint, api_connect_via, api_key, service_id, purger):
+    def __init__(
+        self,
+        *,
+        api_endpoint,
+        api_connect_via,
+        api_key,
+        service_id,
+        purger,
+        delayed_purger=None,
+    ):
         self.api_endpoint = api_endpoint
         self.api_connect_via = api_connect_via
         self.api_key = api_key
         self.service_id = service_id
         self._purger = purger
+        self._delayed_purger = delayed_purger
 
     @classmethod
     def create_service(cls, context, request):
+        settings = request.registry.settings
+        purge_task = request.task(purge_key)
+
+        # Pages that we purge may be served from a replica of the database, and
+        # so refetched from one which hasn't caught up with the change that we're
+        # purging them for yet. We purge them a second time once any replica that
+        # we would still read from must have.
+        if settings.get("database.replica_url"):
+            countdown = (
+                settings.get("database.replica_max_lag", DEFAULT_REPLICA_MAX_LAG)
+                + REPLICA_LAG_INTERVAL
+            )
+
+            def delayed_purger(key):
+                purge_task.apply_async((key,), countdown=countdown)
+
+        else:
+            delayed_purger = None
+
         return cls(
-            api_endpoint=request.registry.settings.get(
+            api_endpoint=settings.get(
                 "origin_cache.api_endpoint", "https://api.fastly.com"
             ),
-            api_connect_via=request.registry.settings.get(
-                "origin_cache.api_connect_via", None
-            ),
-            api_key=request.registry.settings["origin_cache.api_key"],
-            service_id=request.registry.settings["origin_cache.service_id"],
-            purger=request.task(purge_key).delay,
+            api_connect_via=settings.get("origin_cache.api_connect_via", None),
+            api_key=settings["origin_cache.api_key"],
+            service_id=settings["origin_cache.service_id"],
+            purger=purge_task.delay,
+            delayed_purger=delayed_purger,
         )
 
     def cache(
@@ -95,6 +126,8 @@ class FastlyCache:
     def purge(self, keys):
         for key in keys:
             self._purger(key)
+            if self._delayed_purger is not None:
+                self._delayed_purger(key)
 
     def _purge_key(self, key, connect_via=None):
         path = "/service/{service_id}/purge/{key}".format(
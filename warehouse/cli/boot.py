@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import collections
+import subprocess
+import sys
+
+import click
+
+from warehouse.cli import warehouse
+
+# This is run in a fresh interpreter, so that nothing has been imported yet.
+BOOT = """
+import time
+start = time.perf_counter()
+from warehouse.config import configure
+configure()
+print(time.perf_counter() - start)
+"""
+
+
+def parse_importtime(output):
+    """
+    Parse the output of ``python -X importtime`` into a mapping of module name
+    to the time, in microseconds, spent importing that module itself.
+    """
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        if self_us.strip().isdigit():
+            timings[name.strip()] = int(self_us)
+    return timings
+
+
+def group_timings(timings):
+    """
+    Group import timings by package: by subsystem for Warehouse itself, and by
+    distribution for everything else.
+    """
+    groups = collections.Counter()
+    for name, self_us in timings.items():
+        parts = name.split(".")
+        package = parts[:2] if parts[0] == "warehouse" else parts[:1]
+        groups[".".join(package)] += self_us
+    return groups
+
+
+@warehouse.command()
+@click.option(
+    "--limit",
+    default=25,
+    show_default=True,
+    help="How many of the slowest packages to show.",
+)
+def profile_boot(limit):
+    """
+    Profile where the time goes when importing and configuring Warehouse.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        errors = [
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        raise click.ClickException(
+            "Could not configure Warehouse:\n" + "\n".join(errors)
+        )
+
+    timings = parse_importtime(result.stderr)
+    total = float(result.stdout.strip().splitlines()[-1])
+    imports = sum(timings.values()) / 1_000_000
+
+    click.echo(f"Configured in {total:.3f}s, imports took {imports:.3f}s in total.")
+    click.echo()
+    for name, self_us in group_timings(timings).most_common(limit):
+        click.echo(f"{self_us / 1_000:10.1f}ms  {name}")
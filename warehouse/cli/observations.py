@@ -5,6 +5,9 @@ import random
 import click
 
 from warehouse.cli import warehouse
+from warehouse.observations.tasks import (
+    reevaluate_projects_for_quarantine as _reevaluate_projects_for_quarantine,
+)
 
 
 @warehouse.group()
@@ -14,6 +17,17 @@ def observations():
     """
 
 
+@observations.command()
+@click.pass_obj
+def reevaluate_quarantine(config):
+    """
+    Re-evaluate every project with open malware reports for auto-quarantine.
+    """
+
+    request = config.task(_reevaluate_projects_for_quarantine).get_request()
+    config.task(_reevaluate_projects_for_quarantine).run(request)
+
+
 @observations.command()
 @click.pass_obj
 def generate_random_observations(config):  # pragma: no cover # dev-only tool
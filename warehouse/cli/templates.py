@@ -0,0 +1,26 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import click
+
+from warehouse.cli import warehouse
+
+
+@warehouse.group()
+def templates():
+    """
+    Manage Warehouse's templates.
+    """
+
+
+@templates.command(name="compile")
+@click.pass_obj
+def compile_(config):
+    """
+    Compile every template into the bytecode cache.
+    """
+    # Imported here because we don't want to trigger an import from anything
+    # but warehouse.cli at the module scope.
+    from warehouse.utils.templates import compile_templates
+
+    count = compile_templates(config.registry)
+    click.echo(f"Loaded {count} templates into the bytecode cache.")
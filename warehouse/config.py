@@ -34,6 +34,25 @@ class Environment(str, enum.Enum):
     development = "development"
 
 
+# Subsystems whose views are only ever served by some of our processes, and so
+# can be left out (neither imported nor scanned) by those that never serve them,
+# by listing them in WAREHOUSE_DISABLED_SUBSYSTEMS. Their routes are still
+# registered, so that URLs to them can still be generated.
+OPTIONAL_SUBSYSTEMS = {
+    "admin": ["warehouse.admin.views"],
+    "billing": ["warehouse.api.billing", "warehouse.mock.billing"],
+    "manage": ["warehouse.manage.views"],
+}
+
+
+def _disabled_subsystems(value):
+    subsystems = [s.strip() for s in value.split(",") if s.strip()]
+    for subsystem in subsystems:
+        if subsystem not in OPTIONAL_SUBSYSTEMS:
+            raise ValueError(f"Unknown subsystem: {subsystem!r}")
+    return subsystems
+
+
 class Configurator(_Configurator):
     def add_wsgi_middleware(self, middleware, *args, **kwargs):
         middlewares = self.get_settings().setdefault("wsgi.middlewares", [])
@@ -354,6 +373,13 @@ def configure(settings=None):
         lambda s: [d.strip() for d in s.split(",") if d.strip()],
         default=[],
     )
+    maybe_set(
+        settings,
+        "warehouse.disabled_subsystems",
+        "WAREHOUSE_DISABLED_SUBSYSTEMS",
+        _disabled_subsystems,
+        default=[],
+    )
     maybe_set(settings, "forklift.domain", "FORKLIFT_DOMAIN")
     maybe_set(settings, "auth.domain", "AUTH_DOMAIN")
     maybe_set(
@@ -389,6 +415,10 @@ def configure(settings=None):
     maybe_set_redis(settings, "celery.scheduler_url", "REDIS_URL", db=0)
     maybe_set_redis(settings, "oidc.jwk_cache_url", "REDIS_URL", db=1)
     maybe_set(settings, "database.url", "DATABASE_URL")
+    maybe_set(settings, "database.replica_url", "DATABASE_REPLICA_URL")
+    maybe_set(
+        settings, "database.replica_max_lag", "DATABASE_REPLICA_MAX_LAG", coercer=int
+    )
     maybe_set(settings, "opensearch.url", "OPENSEARCH_URL")
     maybe_set(settings, "sentry.dsn", "SENTRY_DSN")
     maybe_set(settings, "sentry.transport", "SENTRY_TRANSPORT")
@@ -459,6 +489,7 @@ def configure(settings=None):
     maybe_set_compound(settings, "archive_files", "backend", "ARCHIVE_FILES_BACKEND")
     maybe_set_compound(settings, "simple", "backend", "SIMPLE_BACKEND")
     maybe_set_compound(settings, "docs", "backend", "DOCS_BACKEND")
+    maybe_set_compound(settings, "sitemap", "backend", "SITEMAP_BACKEND")
     maybe_set_compound(settings, "sponsorlogos", "backend", "SPONSORLOGOS_BACKEND")
     maybe_set_compound(settings, "origin_cache", "backend", "ORIGIN_CACHE")
     maybe_set_compound(settings, "mail", "backend", "MAIL_BACKEND")
@@ -478,6 +509,20 @@ def configure(settings=None):
         "INTEGRITY_BACKEND",
         default="warehouse.attestations.services.IntegrityService",
     )
+    maybe_set(
+        settings,
+        "integrity.verify_workers",
+        "INTEGRITY_VERIFY_WORKERS",
+        coercer=int,
+        default=2,
+    )
+    maybe_set(
+        settings,
+        "integrity.verify_timeout",
+        "INTEGRITY_VERIFY_TIMEOUT",
+        coercer=int,
+        default=30,
+    )
 
     # Pythondotorg integration settings
     maybe_set(
@@ -593,6 +638,19 @@ def configure(settings=None):
         default="5 per second",
     )
 
+    # How many days to keep events for, if unset events are kept forever
+    maybe_set(settings, "events.retention_days", "EVENTS_RETENTION_DAYS", coercer=int)
+
+    # How hard to compress responses with each encoding, see warehouse.utils.compression
+    maybe_set(settings, "compression.gzip_level", "COMPRESSION_GZIP_LEVEL", int)
+    maybe_set(settings, "compression.br_level", "COMPRESSION_BR_LEVEL", int)
+    maybe_set(settings, "compression.zstd_level", "COMPRESSION_ZSTD_LEVEL", int)
+
+    # Where to cache compiled templates, if unset a temporary directory is used
+    maybe_set(
+        settings, "jinja2.bytecode_caching_directory", "JINJA2_BYTECODE_CACHE_DIR"
+    )
+
     # OIDC feature flags and settings
     maybe_set(settings, "warehouse.oidc.audience", "OIDC_AUDIENCE")
 
@@ -610,6 +668,7 @@ def configure(settings=None):
         settings.setdefault("pyramid.reload_assets", True)
         settings.setdefault("pyramid.reload_templates", True)
         settings.setdefault("pyramid.prevent_http_cache", True)
+        settings.setdefault("warehouse.db.server_timing", True)
         settings.setdefault("debugtoolbar.hosts", ["0.0.0.0/0"])
         settings.setdefault(
             "debugtoolbar.panels",
@@ -760,6 +819,10 @@ def configure(settings=None):
     config.add_jinja2_search_path("warehouse:templates", name=".txt")
     config.add_jinja2_search_path("warehouse:templates", name=".xml")
 
+    # Share the compiled bytecode of our templates between processes, and
+    # record how often they're compiled and how long they take to render.
+    config.include(".utils.templates")
+
     # We want to configure our JSON renderer to sort the keys, and also to use
     # an ultra compact serialization format.
     config.add_renderer(
@@ -871,6 +934,9 @@ def configure(settings=None):
     # Register all our URL routes for Warehouse.
     config.include(".routes")
 
+    # Allow the sitemap app to register its storage and periodic tasks
+    config.include(".sitemap")
+
     # Allow the sponsors app to list sponsors
     config.include(".sponsors")
 
@@ -968,13 +1034,20 @@ def configure(settings=None):
     # Register our row counting maintenance
     config.include(".utils.row_counter")
 
-    # Scan everything for configuration
+    # Register our event table maintenance
+    config.include(".events")
+
+    # Scan everything for configuration, except for any subsystems that this
+    # process will never serve.
+    ignore = ["warehouse.migrations.env", "warehouse.celery", "warehouse.wsgi"]
+    for subsystem in settings["warehouse.disabled_subsystems"]:
+        ignore.extend(OPTIONAL_SUBSYSTEMS[subsystem])
     config.scan(
         categories=(
             "pyramid",
             "warehouse",
         ),
-        ignore=["warehouse.migrations.env", "warehouse.celery", "warehouse.wsgi"],
+        ignore=ignore,
     )
 
     # Sanity check our request and responses.
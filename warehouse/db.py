@@ -2,7 +2,9 @@
 
 import enum
 import functools
+import hashlib
 import logging
+import time
 
 from uuid import UUID
 
@@ -13,14 +15,17 @@ import sqlalchemy
 import venusian
 import zope.sqlalchemy
 
+from pyramid import events
 from pyramid.renderers import JSON
-from sqlalchemy import event, func, inspect
+from pyramid.threadlocal import get_current_request
+from sqlalchemy import event, func, inspect, text
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 from warehouse.metrics import IMetricsService
 from warehouse.utils.attrs import make_repr
+from warehouse.utils.db.query_printer import fingerprint
 
 __all__ = ["includeme", "metadata", "ModelBase", "Model"]
 
@@ -30,6 +35,22 @@ logger = logging.getLogger(__name__)
 
 DEFAULT_ISOLATION = "READ COMMITTED"
 
+# How far behind the primary (in seconds) a replica can be before we stop sending
+# reads to it, and how often we check.
+DEFAULT_REPLICA_MAX_LAG = 5
+REPLICA_LAG_INTERVAL = 5
+
+# On a replica, this is how long ago the last transaction that it has replayed was
+# committed on the primary, unless it has replayed everything it has received.
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
 
 # On the surface this might seem wrong, because retrying a request whose data violates
 # the constraints of the database doesn't seem like a useful endeavor. However what
@@ -57,6 +78,11 @@ pyramid_retry.mark_error_retryable(IntegrityError)
 class DatabaseNotAvailableError(Exception): ...
 
 
+# Raised instead of warning when a view goes over its query budget, if budgets are
+# being enforced (as they are in our tests).
+class QueryBudgetExceededError(Exception): ...
+
+
 # The Global metadata object.
 metadata = sqlalchemy.MetaData()
 
@@ -123,6 +149,199 @@ def _configure_alembic(config):
     return alembic_cfg
 
 
+class ReplicaLag:
+    """
+    Tracks how far a replica is behind the primary, checking at most once every
+    ``interval`` seconds.
+    """
+
+    def __init__(self, *, max_lag, interval=REPLICA_LAG_INTERVAL):
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag = 0.0
+        self._checked = None
+
+    def too_far_behind(self, connection, metrics):
+        now = time.monotonic()
+        if self._checked is None or now - self._checked >= self.interval:
+            self.lag = float(connection.execute(REPLICA_LAG_QUERY).scalar() or 0)
+            connection.rollback()
+            self._checked = now
+            metrics.gauge("warehouse.db.replica.lag", self.lag)
+
+        return self.lag > self.max_lag
+
+
+class QueryStats:
+    """
+    The cost of all of the statements that have been executed while handling a
+    single request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.rows = 0
+        self.slowest_duration = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement, duration, rows):
+        self.count += 1
+        self.duration += duration
+        self.rows += rows
+        if self.slowest_statement is None or duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+
+
+def _query_stats(request):
+    return QueryStats()
+
+
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._warehouse_query_start = time.perf_counter()
+
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._warehouse_query_start
+
+    # Anything that is executed while handling a request is attributed to that
+    # request, whichever engine or session it has been executed with.
+    request = get_current_request()
+    stats = getattr(request, "query_stats", None)
+    if stats is not None:
+        stats.record(statement, duration, max(cursor.rowcount, 0))
+
+
+def _route_tag(request):
+    if request.matched_route:
+        return f"route:{request.matched_route.name}"
+    return "route:null"
+
+
+def _report_query_stats(event):
+    request, response = event.request, event.response
+    stats = getattr(request, "query_stats", None)
+    if stats is None or not stats.count:
+        return
+
+    slowest = fingerprint(stats.slowest_statement)
+    statement_tag = (
+        "statement:"
+        + hashlib.md5(slowest.encode("utf8"), usedforsecurity=False).hexdigest()[:12]
+    )
+
+    tags = [_route_tag(request)]
+    metrics = request.find_service(IMetricsService, context=None)
+    metrics.histogram("warehouse.db.request.queries", stats.count, tags=tags)
+    metrics.timing("warehouse.db.request.duration", stats.duration * 1000, tags=tags)
+    metrics.histogram("warehouse.db.request.rows", stats.rows, tags=tags)
+    metrics.timing(
+        "warehouse.db.request.slowest",
+        stats.slowest_duration * 1000,
+        tags=tags + [statement_tag],
+    )
+    logger.debug("Slowest statement (%s): %s", statement_tag, slowest)
+
+    if request.registry.settings.get("warehouse.db.server_timing"):
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+        )
+
+
+def query_budget_view(view, info):
+    query_budget = info.options.get("query_budget")
+    query_time_budget = info.options.get("query_time_budget")
+    if query_budget is None and query_time_budget is None:
+        return view
+
+    def wrapped(context, request):
+        response = view(context, request)
+
+        stats = request.query_stats
+        duration = stats.duration * 1000
+        over_query_budget = query_budget is not None and stats.count > query_budget
+        over_time_budget = (
+            query_time_budget is not None and duration > query_time_budget
+        )
+        if not (over_query_budget or over_time_budget):
+            return response
+
+        message = (
+            f"{_route_tag(request)} made {stats.count} queries taking "
+            f"{duration:.1f}ms, which is over its budget"
+        )
+
+        # How long queries take varies too much from run to run for us to fail
+        # on it, so only the number of queries is ever enforced.
+        if over_query_budget and request.registry.settings.get(
+            "warehouse.db.enforce_query_budgets"
+        ):
+            raise QueryBudgetExceededError(message)
+
+        logger.warning(message)
+        metrics = request.find_service(IMetricsService, context=None)
+        metrics.increment(
+            "warehouse.db.request.over_budget", tags=[_route_tag(request)]
+        )
+        return response
+
+    return wrapped
+
+
+query_budget_view.options = {"query_budget", "query_time_budget"}  # type: ignore
+
+
+def read_only_view(view, info):
+    # We can't pick which database a request should use from the view itself, as
+    # the context of the view has already been looked up by then. Instead we make
+    # note of which routes are only served by read only views, so the session for
+    # a request can be created against a replica as soon as its route matches.
+    route_name = info.options.get("route_name")
+    if route_name is not None and not info.exception_only:
+        routes = info.registry.setdefault("warehouse.db.read_only_routes", {})
+        routes[route_name] = routes.get(route_name, True) and bool(
+            info.options.get("read_only", False)
+        )
+
+    return view
+
+
+read_only_view.options = {"read_only"}  # type: ignore
+
+
+def _connect(request, metrics):
+    replica = request.registry.get("sqlalchemy.replica_engine")
+    route = request.matched_route
+    read_only = route is not None and request.registry.get(
+        "warehouse.db.read_only_routes", {}
+    ).get(route.name, False)
+
+    # If this request is only going to read from the database, we'll send it to a
+    # replica, unless we can't reach one or it is lagging too far behind the
+    # primary, in which case we'll fall back to the primary.
+    if replica is not None and read_only:
+        lag = request.registry["sqlalchemy.replica_lag"]
+        connection = None
+        try:
+            connection = replica.connect()
+            too_far_behind = lag.too_far_behind(connection, metrics)
+        except OperationalError:
+            logger.warning("Got an error connecting to replica", exc_info=True)
+            metrics.increment("warehouse.db.replica.fallback", tags=["reason:error"])
+            if connection is not None:
+                connection.close()
+        else:
+            if not too_far_behind:
+                return connection, "replica", replica
+            connection.close()
+            metrics.increment("warehouse.db.replica.fallback", tags=["reason:lag"])
+
+    engine = request.registry["sqlalchemy.engine"]
+    return engine.connect(), "primary", engine
+
+
 def _create_session(request):
     metrics = request.find_service(IMetricsService, context=None)
     metrics.increment("warehouse.db.session.start")
@@ -130,7 +349,7 @@ def _create_session(request):
     # Create our connection, most likely pulling it from the pool of
     # connections
     try:
-        connection = request.registry["sqlalchemy.engine"].connect()
+        connection, engine_name, engine = _connect(request, metrics)
     except OperationalError:
         # When we tried to connection to PostgreSQL, our database was not available for
         # some reason. We're going to log it here and then raise our error. Most likely
@@ -139,6 +358,12 @@ def _create_session(request):
         metrics.increment("warehouse.db.session.error", tags=["error_in:connecting"])
         raise DatabaseNotAvailableError()
 
+    metrics.gauge(
+        "warehouse.db.pool.checkedout",
+        engine.pool.checkedout(),
+        tags=[f"engine:{engine_name}"],
+    )
+
     # Now, create a session from our connection
     session = Session(bind=connection)
 
@@ -179,6 +404,36 @@ def includeme(config):
         pool_timeout=20,
     )
 
+    # If we have a replica, then create an engine, with its own pool, for it
+    # too. This is used by the requests for views marked with read_only=True.
+    replica_url = config.registry.settings.get("database.replica_url")
+    if replica_url is not None:
+        config.registry["sqlalchemy.replica_engine"] = sqlalchemy.create_engine(
+            replica_url,
+            isolation_level=DEFAULT_ISOLATION,
+            pool_size=35,
+            max_overflow=65,
+            pool_timeout=20,
+        )
+        config.registry["sqlalchemy.replica_lag"] = ReplicaLag(
+            max_lag=config.registry.settings.get(
+                "database.replica_max_lag", DEFAULT_REPLICA_MAX_LAG
+            )
+        )
+    config.add_view_deriver(read_only_view)
+
+    # Keep track of the cost of the queries made while handling each request, so
+    # that we can report it, and hold views to the budgets they've declared.
+    for identifier, listener in [
+        ("before_cursor_execute", _start_query_timer),
+        ("after_cursor_execute", _record_query),
+    ]:
+        if not event.contains(sqlalchemy.engine.Engine, identifier, listener):
+            event.listen(sqlalchemy.engine.Engine, identifier, listener)
+    config.add_request_method(_query_stats, name="query_stats", reify=True)
+    config.add_subscriber(_report_query_stats, events.NewResponse)
+    config.add_view_deriver(query_budget_view)
+
     # Possibly override how to fetch new db sessions from config.settings
     #  Useful in test fixtures
     db_session_factory = config.registry.settings.get(
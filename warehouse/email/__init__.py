@@ -1,7 +1,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import contextlib
+import dataclasses
 import datetime
 import functools
+import uuid
 
 from email.headerregistry import Address
 
@@ -9,19 +12,25 @@ import pytz
 import sentry_sdk
 
 from celery.schedules import crontab
-from more_itertools import first_true
+from more_itertools import chunked, first_true
 from pyramid_mailer.exceptions import BadHeaders, EncodingError, InvalidMessage
 from sqlalchemy.exc import NoResultFound
 
 from warehouse import tasks
 from warehouse.accounts.interfaces import ITokenService, IUserService
-from warehouse.accounts.models import Email
+from warehouse.accounts.models import Email, User
 from warehouse.email.interfaces import IEmailSender
 from warehouse.email.services import EmailMessage
 from warehouse.email.ses.tasks import cleanup as ses_cleanup
 from warehouse.events.tags import EventTag
 from warehouse.metrics.interfaces import IMetricsService
 
+# Emails to at least this many recipients at once are sent in batches.
+EMAIL_BATCH_THRESHOLD = 10
+
+# The most emails that a single send_emails task will send.
+EMAIL_BATCH_SIZE = 100
+
 
 def _compute_recipient(user, email):
     # We want to try and use the user's name, then their username, and finally
@@ -43,17 +52,32 @@ def _redact_ip(request, email):
         # The email might have been deleted if this is an account deletion event
         return False
 
+    return _redact_ip_for_user(request, user_email.user_id)
+
+
+def _redact_ips(request, emails):
+    # The same as _redact_ip, but for many emails at once.
+    user_ids = dict(
+        request.db.query(Email.email, Email.user_id).filter(Email.email.in_(emails))
+    )
+    return {
+        email: email in user_ids and _redact_ip_for_user(request, user_ids[email])
+        for email in emails
+    }
+
+
+def _redact_ip_for_user(request, user_id):
     if request._unauthenticated_userid:
-        return user_email.user_id != request._unauthenticated_userid
+        return user_id != request._unauthenticated_userid
     if request.user:
-        return user_email.user_id != request.user.id
+        return user_id != request.user.id
     if request.remote_addr == "127.0.0.1":
         # This is the IP used when synthesizing a request in a task
         return True
     return False
 
 
-@tasks.task(bind=True, ignore_result=True, acks_late=True)
+@tasks.task(bind=True, ignore_result=True, acks_late=True, queue="email")
 def send_email(task, request, recipient, msg, success_event):
     msg = EmailMessage(**msg)
     sender = request.find_service(IEmailSender)
@@ -73,6 +97,173 @@ def send_email(task, request, recipient, msg, success_event):
         task.retry(exc=exc)
 
 
+# Batches of email are sent after any individual ones that are waiting, since an
+# individual email is usually something that a user is waiting on.
+@tasks.task(ignore_result=True, acks_late=True, queue="email", priority=9)
+def send_emails(request, messages, deliveries):
+    """
+    Send a batch of emails, where each delivery is a (recipient, message index,
+    success event) tuple, and record the success event for every email sent.
+    """
+    sender = request.find_service(IEmailSender)
+
+    sent = []
+    for recipient, message_index, success_event in deliveries:
+        try:
+            sender.send(recipient, EmailMessage(**messages[message_index]))
+        except Exception as exc:
+            # Send the exception to Sentry, and then retry just this email on its
+            # own, since retrying the whole batch would send the rest again.
+            sentry_sdk.capture_exception(exc)
+            request.task(send_email).delay(
+                recipient, messages[message_index], success_event
+            )
+        else:
+            sent.append(success_event)
+
+    # We send account deletion confirmation emails, so some users may be gone.
+    users = {
+        str(user.id): user
+        for user in request.db.query(User).filter(
+            User.id.in_({uuid.UUID(str(event["user_id"])) for event in sent})
+        )
+    }
+    for success_event in sent:
+        if user := users.get(str(success_event.pop("user_id"))):
+            user.record_event(request=request, **success_event)
+
+
+def _email_payload(request, user, email, msg, *, override_from, redact_ip):
+    # The recipient, message and success event arguments to send an email with.
+    return (
+        _compute_recipient(user, email.email),
+        {
+            "subject": msg.subject,
+            "body_text": msg.body_text,
+            "body_html": msg.body_html,
+            "sender": override_from,
+        },
+        {
+            "tag": EventTag.Account.EmailSent,
+            "user_id": user.id,
+            "additional": {
+                "from_": (
+                    request.registry.settings.get("mail.sender")
+                    if override_from is None
+                    else override_from
+                ),
+                "to": email.email,
+                "subject": msg.subject,
+                "redact_ip": redact_ip,
+            },
+        },
+    )
+
+
+@dataclasses.dataclass
+class _Delivery:
+    user: User
+    email: Email
+    msg: EmailMessage
+    repeat_window: datetime.timedelta | None
+    override_from: str | None
+
+
+class EmailBatch:
+    """
+    Collects the emails sent while it is active, so that they can be checked
+    against their repeat windows, and then sent, all in batches.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._deliveries: dict[tuple[str, str], _Delivery] = {}
+
+    def add(self, user, email, msg, *, repeat_window=None, override_from=None):
+        # The same email to the same address is only ever sent once.
+        self._deliveries.setdefault(
+            (email.email, msg.subject),
+            _Delivery(user, email, msg, repeat_window, override_from),
+        )
+
+    def _filter_recently_sent(self, deliveries):
+        by_subject: dict[str, list[_Delivery]] = {}
+        for delivery in deliveries:
+            if delivery.repeat_window is not None:
+                by_subject.setdefault(delivery.msg.subject, []).append(delivery)
+        if not by_subject:
+            return deliveries
+
+        sender = self.request.find_service(IEmailSender)
+        now = datetime.datetime.now()
+        recently_sent = set()
+        for subject, subject_deliveries in by_subject.items():
+            last_sent = sender.last_sent_many(
+                to=[delivery.email.email for delivery in subject_deliveries],
+                subject=subject,
+            )
+            for delivery in subject_deliveries:
+                when = last_sent.get(delivery.email.email)
+                if when and (now - when) <= delivery.repeat_window:
+                    recently_sent.add(id(delivery))
+
+        return [d for d in deliveries if id(d) not in recently_sent]
+
+    def send(self):
+        deliveries = self._filter_recently_sent(list(self._deliveries.values()))
+        self._deliveries.clear()
+        if not deliveries:
+            return
+
+        redact_ips = _redact_ips(self.request, [d.email.email for d in deliveries])
+
+        for batch in chunked(deliveries, EMAIL_BATCH_SIZE):
+            # Emails rendered from the same template share a message, so we only
+            # send each message to the task once.
+            messages: list[dict] = []
+            message_indexes: dict[tuple[int, str | None], int] = {}
+            batch_deliveries = []
+            for delivery in batch:
+                recipient, message, success_event = _email_payload(
+                    self.request,
+                    delivery.user,
+                    delivery.email,
+                    delivery.msg,
+                    override_from=delivery.override_from,
+                    redact_ip=redact_ips[delivery.email.email],
+                )
+                key = (id(delivery.msg), delivery.override_from)
+                if key not in message_indexes:
+                    message_indexes[key] = len(messages)
+                    messages.append(message)
+                batch_deliveries.append(
+                    (recipient, message_indexes[key], success_event)
+                )
+
+            self.request.task(send_emails).delay(messages, batch_deliveries)
+
+
+@contextlib.contextmanager
+def email_batch(request):
+    """
+    Batch up every email sent with the given request within this context, and
+    send them all once it exits.
+
+    If there is already a batch active for this request, then emails are added to
+    it instead, and sent whenever that batch is.
+    """
+    if (batch := getattr(request, "_email_batch", None)) is not None:
+        yield batch
+        return
+
+    batch = request._email_batch = EmailBatch(request)
+    try:
+        yield batch
+    finally:
+        del request._email_batch
+    batch.send()
+
+
 def _send_email_to_user(
     request,
     user,
@@ -95,6 +286,13 @@ def _send_email_to_user(
     if email is None or not (email.verified or allow_unverified):
         return
 
+    # If we're batching emails, then the batch takes care of everything else.
+    if (batch := getattr(request, "_email_batch", None)) is not None:
+        batch.add(
+            user, email, msg, repeat_window=repeat_window, override_from=override_from
+        )
+        return
+
     # If we've already sent this email within the repeat_window, don't send it.
     if repeat_window is not None:
         sender = request.find_service(IEmailSender)
@@ -103,27 +301,14 @@ def _send_email_to_user(
             return
 
     request.task(send_email).delay(
-        _compute_recipient(user, email.email),
-        {
-            "subject": msg.subject,
-            "body_text": msg.body_text,
-            "body_html": msg.body_html,
-            "sender": override_from,
-        },
-        {
-            "tag": EventTag.Account.EmailSent,
-            "user_id": user.id,
-            "additional": {
-                "from_": (
-                    request.registry.settings.get("mail.sender")
-                    if override_from is None
-                    else override_from
-                ),
-                "to": email.email,
-                "subject": msg.subject,
-                "redact_ip": _redact_ip(request, email.email),
-            },
-        },
+        *_email_payload(
+            request,
+            user,
+            email,
+            msg,
+            override_from=override_from,
+            redact_ip=_redact_ip(request, email.email),
+        )
     )
 
 
@@ -148,6 +333,7 @@ def _email(
     first argument is the Pyramid request object, and the second argument is either
     a single User, or a list of Users. These users represent the recipients of this
     email. Additional keyword arguments are supported, but are not otherwise restricted.
+    Emails to many users at once are sent in batches, rather than one task per user.
 
     Functions decorated by this must return a mapping of context variables that will
     ultimately be returned, but which will also be used to render the templates for
@@ -176,34 +362,39 @@ def _email(
             context = fn(request, user_or_users, **kwargs)
             msg = EmailMessage.from_template(name, context, request=request)
 
-            for recipient in recipients:
-                if isinstance(recipient, tuple):
-                    user, email = recipient
-                else:
-                    user, email = recipient, None
-
-                _send_email_to_user(
-                    request,
-                    user,
-                    msg,
-                    email=email,
-                    allow_unverified=allow_unverified,
-                    repeat_window=repeat_window,
-                    override_from=override_from,
-                )
-                metrics = request.find_service(IMetricsService, context=None)
-                metrics.increment(
-                    "warehouse.emails.scheduled",
-                    tags=[
-                        f"template_name:{name}",
-                        f"allow_unverified:{allow_unverified}",
-                        (
-                            f"repeat_window:{repeat_window.total_seconds()}"
-                            if repeat_window
-                            else "repeat_window:none"
-                        ),
-                    ],
-                )
+            with (
+                email_batch(request)
+                if len(recipients) >= EMAIL_BATCH_THRESHOLD
+                else contextlib.nullcontext()
+            ):
+                for recipient in recipients:
+                    if isinstance(recipient, tuple):
+                        user, email = recipient
+                    else:
+                        user, email = recipient, None
+
+                    _send_email_to_user(
+                        request,
+                        user,
+                        msg,
+                        email=email,
+                        allow_unverified=allow_unverified,
+                        repeat_window=repeat_window,
+                        override_from=override_from,
+                    )
+                    metrics = request.find_service(IMetricsService, context=None)
+                    metrics.increment(
+                        "warehouse.emails.scheduled",
+                        tags=[
+                            f"template_name:{name}",
+                            f"allow_unverified:{allow_unverified}",
+                            (
+                                f"repeat_window:{repeat_window.total_seconds()}"
+                                if repeat_window
+                                else "repeat_window:none"
+                            ),
+                        ],
+                    )
 
             return context
 
@@ -19,3 +19,10 @@ class IEmailSender(Interface):
         """
         Determines when an email was last sent, if at all
         """
+
+    def last_sent_many(to, subject):
+        """
+        Determines when an email was last sent to each of the given recipients,
+        returning a mapping of recipient to when it was last sent, omitting any
+        that it was never sent to
+        """
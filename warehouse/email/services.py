@@ -10,6 +10,7 @@ from jinja2.exceptions import TemplateNotFound
 from pyramid.renderers import render
 from pyramid_mailer import get_mailer
 from pyramid_mailer.message import Message
+from sqlalchemy import func
 from zope.interface import implementer
 
 from warehouse.email.interfaces import IEmailSender
@@ -81,6 +82,10 @@ class SMTPEmailSender:
         # We don't store previously sent emails, so nothing to comapre against
         return None
 
+    def last_sent_many(self, to, subject):
+        # We don't store previously sent emails, so nothing to comapre against
+        return {}
+
 
 @implementer(IEmailSender)
 class SESEmailSender:
@@ -144,6 +149,17 @@ class SESEmailSender:
         if last_email:
             return last_email.created
 
+    def last_sent_many(self, to, subject):
+        return dict(
+            self._db.query(SESEmailMessage.to, func.max(SESEmailMessage.created))
+            .filter(
+                SESEmailMessage.to.in_(to),
+                SESEmailMessage.subject == subject,
+            )
+            .group_by(SESEmailMessage.to)
+            .all()
+        )
+
 
 class ConsoleAndSMTPEmailSender(SMTPEmailSender):
     def send(self, recipient, message):
@@ -1 +1,12 @@
 # SPDX-License-Identifier: Apache-2.0
+
+from celery.schedules import crontab
+
+
+def includeme(config):
+    # This is imported here, because warehouse.events.models is imported by
+    # most of our other models.
+    from warehouse.events.tasks import manage_event_partitions
+
+    # Keep our event tables partitioned ahead of time, and expire old events.
+    config.add_periodic_task(crontab(minute=15, hour=2), manage_event_partitions)
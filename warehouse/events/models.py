@@ -2,12 +2,16 @@
 
 from __future__ import annotations
 
+import collections
+import functools
 import typing
 
 from dataclasses import dataclass
 
+import zope.sqlalchemy
+
 from linehaul.ua import parser as linehaul_user_agent_parser
-from sqlalchemy import ForeignKey, Index, orm
+from sqlalchemy import ForeignKey, Index, insert, inspect, orm
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 from ua_parser import user_agent_parser
@@ -19,6 +23,12 @@ from warehouse.utils.db.types import datetime_now
 if typing.TYPE_CHECKING:
     from pyramid.request import Request
 
+    from warehouse.config import Configurator
+
+# The key within `Session.info` that events are buffered under until they are
+# inserted into the database.
+PENDING_EVENTS_KEY = "warehouse.events.pending"
+
 
 @dataclass
 class GeoIPInfo:
@@ -110,7 +120,9 @@ class UserAgentInfo:
 
 class Event:
     tag: Mapped[str]
-    time: Mapped[datetime_now]
+    # Our event tables are partitioned by month on their time, which Postgres
+    # requires to be part of the primary key.
+    time: Mapped[datetime_now] = mapped_column(primary_key=True)
     additional: Mapped[dict | None] = mapped_column(JSONB)
 
     @declared_attr
@@ -166,7 +178,12 @@ class HasEvents:
             dict(
                 __tablename__=f"{cls.__name__.lower()}_events",
                 __table_args__=(
-                    Index(f"ix_{cls.__name__.lower()}_events_source_id", "source_id"),
+                    Index(
+                        f"ix_{cls.__name__.lower()}_events_source_id_time",
+                        "source_id",
+                        "time",
+                    ),
+                    {"postgresql_partition_by": "RANGE (time)"},
                 ),
                 source_id=mapped_column(
                     UUID(as_uuid=True),
@@ -195,7 +212,13 @@ class HasEvents:
         )
 
     def record_event(self, *, tag, request: Request, additional=None):
-        """Records an Event record on the associated model."""
+        """
+        Records an Event record on the associated model.
+
+        The Event is written to the database, along with any others recorded
+        with the same session, before the session next queries the database or
+        commits.
+        """
 
         # Get-or-create a new IpAddress object
         ip_address = request.ip_address
@@ -205,53 +228,107 @@ class HasEvents:
             additional["geoip_info"] = ip_address.geoip_info
 
         if user_agent := request.headers.get("User-Agent"):
-            try:
-                parsed_user_agent = linehaul_user_agent_parser.parse(user_agent)
-                if (
-                    parsed_user_agent is not None
-                    and parsed_user_agent.installer is not None
-                    and parsed_user_agent.installer.name == "Browser"
-                ):
-                    parsed_user_agent = user_agent_parser.Parse(user_agent)
-                    additional = additional or {}
-                    additional["user_agent_info"] = {
-                        "installer": "Browser",
-                        # See https://github.com/pypi/linehaul-cloud-function/issues/203
-                        "device": parsed_user_agent["device"]["family"],  # noqa: E501
-                        "os": parsed_user_agent["os"]["family"],
-                        "user_agent": parsed_user_agent["user_agent"][
-                            "family"
-                        ],  # noqa: E501
-                    }
-                else:
-                    additional = additional or {}
-                    additional["user_agent_info"] = {
-                        "installer": (
-                            parsed_user_agent.installer.name
-                            if parsed_user_agent and parsed_user_agent.installer
-                            else None
-                        ),
-                        "implementation": (
-                            parsed_user_agent.implementation.name
-                            if parsed_user_agent and parsed_user_agent.implementation
-                            else None
-                        ),
-                        "system": (
-                            parsed_user_agent.system.name
-                            if parsed_user_agent and parsed_user_agent.system
-                            else None
-                        ),
-                    }
-            except linehaul_user_agent_parser.UnknownUserAgentError:
-                pass
-
-        event = self.Event(
-            source=self,
-            tag=tag,
-            ip_address=ip_address,
-            additional=additional,
+            if (user_agent_info := _parse_user_agent(user_agent)) is not None:
+                additional = additional or {}
+                additional["user_agent_info"] = dict(user_agent_info)
+
+        # Rather than adding an Event to the session for every event, we buffer
+        # them up and then insert all of them at once, see _insert_pending_events.
+        request.db.info.setdefault(PENDING_EVENTS_KEY, []).append(
+            (self, ip_address, {"tag": tag, "additional": additional})
         )
+        # Nothing has been written to the session yet, so we have to tell
+        # zope.sqlalchemy that it needs committing, otherwise a request that only
+        # records events would close its session without ever committing it.
+        zope.sqlalchemy.mark_changed(request.db, transaction_manager=request.tm)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_user_agent(user_agent: str) -> dict | None:
+    # Clients tend to send the same handful of User-Agents over and over, so we
+    # only parse each of them once.
+    try:
+        parsed_user_agent = linehaul_user_agent_parser.parse(user_agent)
+    except linehaul_user_agent_parser.UnknownUserAgentError:
+        return None
+
+    if (
+        parsed_user_agent is not None
+        and parsed_user_agent.installer is not None
+        and parsed_user_agent.installer.name == "Browser"
+    ):
+        parsed_user_agent = user_agent_parser.Parse(user_agent)
+        return {
+            "installer": "Browser",
+            # See https://github.com/pypi/linehaul-cloud-function/issues/203
+            "device": parsed_user_agent["device"]["family"],
+            "os": parsed_user_agent["os"]["family"],
+            "user_agent": parsed_user_agent["user_agent"]["family"],
+        }
+
+    return {
+        "installer": (
+            parsed_user_agent.installer.name
+            if parsed_user_agent and parsed_user_agent.installer
+            else None
+        ),
+        "implementation": (
+            parsed_user_agent.implementation.name
+            if parsed_user_agent and parsed_user_agent.implementation
+            else None
+        ),
+        "system": (
+            parsed_user_agent.system.name
+            if parsed_user_agent and parsed_user_agent.system
+            else None
+        ),
+    }
+
+
+def _insert_pending_events(session) -> None:
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if not pending:
+        return
+
+    # Our events refer to their sources and IP addresses, which may not have been
+    # written to the database yet.
+    session.flush()
+
+    values = collections.defaultdict(list)
+    for source, ip_address, event in pending:
+        # If the source has since been deleted, then so would its events have been.
+        if inspect(source).was_deleted:
+            continue
+        values[source.Event].append(
+            {**event, "source_id": source.id, "ip_address_id": ip_address.id}
+        )
+
+    for event_class, rows in values.items():
+        session.execute(insert(event_class), rows)
+
+
+@db.listens_for(db.Session, "do_orm_execute")
+def insert_pending_events_before_query(
+    _config: Configurator, orm_execute_state: orm.ORMExecuteState
+) -> None:
+    # Anything that we query should see the events recorded before it, just as
+    # it would any other object added to the session, unless autoflush is off.
+    # Statements executed during a flush (by a before_flush listener, say) are
+    # left alone, since we cannot flush from within a flush.
+    session = orm_execute_state.session
+    if (
+        PENDING_EVENTS_KEY in session.info
+        and session.autoflush
+        and not session._flushing
+    ):
+        _insert_pending_events(session)
+
+
+@db.listens_for(db.Session, "before_commit")
+def insert_pending_events_before_commit(_config: Configurator, session) -> None:
+    _insert_pending_events(session)
 
-        request.db.add(event)
 
-        return event
+@db.listens_for(db.Session, "after_soft_rollback")
+def discard_pending_events(_config: Configurator, session, _previous_transaction):
+    session.info.pop(PENDING_EVENTS_KEY, None)
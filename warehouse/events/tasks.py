@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import datetime
+import logging
+import re
+
+import zope.sqlalchemy
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from warehouse import tasks
+from warehouse.events.models import HasEvents
+
+logger = logging.getLogger(__name__)
+
+# Creating or dropping a partition takes an ACCESS EXCLUSIVE lock on the event
+# table, which blocks every event being recorded while we wait for it, so we
+# give up rather than wait long behind anything that is reading from it.
+PARTITION_LOCK_TIMEOUT = "5s"
+
+# How many months past the current one that we create partitions for ahead of
+# time, so that there is always somewhere for new events to be written to.
+PARTITION_MONTHS_AHEAD = 3
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _partitions(db, table_name: str) -> dict[str, datetime.datetime]:
+    """
+    Return a mapping of partition name to the (exclusive) upper bound of the
+    times that it holds, for each of the range partitions of the given table.
+    """
+    rows = db.execute(
+        text(
+            """SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+               FROM pg_inherits
+               JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+               JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+               WHERE parent.relname = :table_name
+            """
+        ),
+        {"table_name": table_name},
+    )
+
+    partitions = {}
+    for name, bound in rows:
+        # The default partition has no upper bound, and is never dropped.
+        if (match := _UPPER_BOUND_RE.search(bound)) is not None:
+            partitions[name] = datetime.datetime.fromisoformat(match.group(1))
+    return partitions
+
+
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
+def manage_event_partitions(request):
+    """
+    Create the monthly partitions of our event tables for the coming months,
+    and drop any partitions that only hold events older than our retention
+    period, if we have one.
+    """
+    now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+    horizon = _add_months(now.date().replace(day=1), PARTITION_MONTHS_AHEAD + 1)
+
+    expire_before = None
+    if retention_days := request.registry.settings.get("events.retention_days"):
+        expire_before = now - datetime.timedelta(days=retention_days)
+
+    # Our DDL is executed as raw SQL, which zope.sqlalchemy doesn't see, so
+    # without this the transaction would be closed rather than committed.
+    zope.sqlalchemy.mark_changed(request.db, transaction_manager=request.tm)
+    request.db.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+
+    for model in HasEvents.__subclasses__():
+        table_name = model.Event.__tablename__
+        partitions = _partitions(request.db, table_name)
+
+        start = max(partitions.values()).date()
+        while start < horizon:
+            end = _add_months(start, 1)
+            request.db.execute(
+                text(
+                    f"""CREATE TABLE {table_name}_y{start:%Y}m{start:%m}
+                        PARTITION OF {table_name}
+                        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+                    """
+                )
+            )
+            start = end
+
+        # Dropping an entire partition is far cheaper than deleting the rows in
+        # it, and leaves nothing behind to be vacuumed. If we can't get the lock
+        # to drop one then it's left for the next run, rather than losing the
+        # partitions that we've just created. We can't DETACH ... CONCURRENTLY
+        # instead, since our event tables have a default partition.
+        if expire_before is not None:
+            for name, upper_bound in partitions.items():
+                if upper_bound > expire_before:
+                    continue
+                try:
+                    with request.db.begin_nested():
+                        request.db.execute(text(f"DROP TABLE {name}"))
+                except OperationalError:
+                    logger.warning("Timed out waiting to drop %s", name, exc_info=True)
@@ -227,6 +227,7 @@ def latest_release_factory(request):
 
 @view_config(
     route_name="legacy.api.json.project",
+    read_only=True,
     context=Release,
     renderer="json",
     decorator=_PROJECT_CACHE_DECORATOR,
@@ -254,6 +255,7 @@ def json_project(release, request):
 
 @view_config(
     route_name="legacy.api.json.project_slash",
+    read_only=True,
     context=Release,
     renderer="json",
     decorator=_PROJECT_CACHE_DECORATOR,
@@ -304,6 +306,7 @@ def release_factory(request):
 
 @view_config(
     route_name="legacy.api.json.release",
+    read_only=True,
     context=Release,
     renderer="json",
     decorator=_RELEASE_CACHE_DECORATOR,
@@ -329,6 +332,7 @@ def json_release(release, request):
 
 @view_config(
     route_name="legacy.api.json.release_slash",
+    read_only=True,
     context=Release,
     renderer="json",
     decorator=_RELEASE_CACHE_DECORATOR,
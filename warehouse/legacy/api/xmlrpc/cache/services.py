@@ -9,7 +9,9 @@ from warehouse.legacy.api.xmlrpc import cache
 from warehouse.legacy.api.xmlrpc.cache import interfaces
 
 
-@tasks.task(bind=True, ignore_result=True, acks_late=True)
+@tasks.task(
+    bind=True, ignore_result=True, acks_late=True, queue="critical", uses_db=False
+)
 def purge_tag(task, request, tag):
     service = request.find_service(interfaces.IXMLRPCCache)
     request.log.info("Purging %s", tag)
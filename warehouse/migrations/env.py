@@ -8,6 +8,20 @@ from sqlalchemy import create_engine, pool, text
 from warehouse import db
 
 
+def _partitions(connection):
+    """
+    Return the names of every table which is a partition of another table.
+
+    These are managed by the partitioned table they belong to (and by whatever
+    creates and drops them), rather than by our models.
+    """
+    return set(
+        connection.scalars(
+            text("SELECT relname FROM pg_class WHERE relispartition AND relkind = 'r'")
+        )
+    )
+
+
 def run_migrations_offline():
     """
     Run migrations in 'offline' mode.
@@ -47,10 +61,16 @@ def run_migrations_online():
         connection.execute(text("SET statement_timeout = 5000"))
         connection.execute(text("SET lock_timeout = 4000"))
 
+        partitions = _partitions(connection)
+
+        def include_name(name, type_, parent_names):
+            return not (type_ == "table" and name in partitions)
+
         context.configure(
             connection=connection,
             target_metadata=db.metadata,
             compare_server_default=True,
+            include_name=include_name,
             transaction_per_migration=True,
         )
         with context.begin_transaction():
@@ -0,0 +1,249 @@
+# SPDX-License-Identifier: Apache-2.0
+"""
+Partition event tables by month
+
+Revision ID: 3a760089c883
+Revises: 7a53048fb2bb
+Create Date: 2026-10-19 18:47:12.630417
+"""
+
+import datetime
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "3a760089c883"
+down_revision = "7a53048fb2bb"
+
+# Note: It is VERY important to ensure that a migration does not lock for a
+#       long period of time and to ensure that each individual migration does
+#       not break compatibility with the *previous* version of the code base.
+#       This is because the migrations will be ran automatically as part of the
+#       deployment process, but while the previous version of the code is still
+#       up and running. Thus backwards incompatible changes must be broken up
+#       over multiple migrations inside of multiple pull requests in order to
+#       phase them in over multiple deploys.
+#
+#       By default, migrations cannot wait more than 4s on acquiring a lock
+#       and each individual statement cannot take more than 5s. This helps
+#       prevent situations where a slow migration takes the entire site down.
+#
+#       If you need to increase this timeout for a migration, you can do so
+#       by adding:
+#
+#           op.execute("SET statement_timeout = 5000")
+#           op.execute("SET lock_timeout = 4000")
+#
+#       To whatever values are reasonable for this migration as part of your
+#       migration.
+
+EVENT_TABLES = [
+    "file_events",
+    "organization_events",
+    "project_events",
+    "team_events",
+    "user_events",
+]
+
+# How many monthly partitions to create up front, the rest are created ahead of
+# time by the manage_event_partitions task.
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _has_constraint(conn, table_name, constraint_name):
+    return conn.execute(
+        sa.text(
+            """SELECT 1 FROM pg_constraint
+               WHERE conrelid = CAST(:table_name AS regclass) AND conname = :name
+            """
+        ),
+        {"table_name": table_name, "name": constraint_name},
+    ).scalar()
+
+
+def _drop_invalid_index(conn, index_name):
+    # An index that failed to build concurrently is left behind as invalid, and
+    # would otherwise be skipped over rather than being built again.
+    invalid = conn.execute(
+        sa.text(
+            """SELECT NOT indisvalid FROM pg_index
+               WHERE indexrelid = to_regclass(:index_name)
+            """
+        ),
+        {"index_name": index_name},
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY {index_name}")
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # Everything that is already in each table becomes its first partition,
+    # covering everything up until the start of the month after next. We leave
+    # a whole month of slack so that no event can be written past the end of
+    # it while this migration is running.
+    boundary = _add_months(datetime.date.today().replace(day=1), 2)
+
+    # Postgres can attach an existing table as a partition without scanning or
+    # locking it for long, but only if it already has every index that the
+    # partitioned table will have and a (validated) constraint which proves
+    # that every row within it belongs in that partition. Building those is
+    # slow on tables this large, so it's done concurrently first.
+    conn.commit()
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = 4000")
+        op.execute("SET statement_timeout = 600000")
+        for table_name in EVENT_TABLES:
+            _drop_invalid_index(conn, f"{table_name}_legacy_time_id_key")
+            _drop_invalid_index(conn, f"ix_{table_name}_legacy_source_id_time")
+            op.create_index(
+                f"{table_name}_legacy_time_id_key",
+                table_name,
+                ["time", "id"],
+                unique=True,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+            op.create_index(
+                f"ix_{table_name}_legacy_source_id_time",
+                table_name,
+                ["source_id", "time"],
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+            )
+            if not _has_constraint(conn, table_name, f"{table_name}_legacy_time_check"):
+                op.execute(
+                    f"""ALTER TABLE {table_name}
+                        ADD CONSTRAINT {table_name}_legacy_time_check
+                        CHECK (time < '{boundary.isoformat()}') NOT VALID
+                    """
+                )
+            op.execute(
+                f"""ALTER TABLE {table_name}
+                    VALIDATE CONSTRAINT {table_name}_legacy_time_check
+                """
+            )
+
+    op.execute("SET lock_timeout = 4000")
+    op.execute("SET statement_timeout = 5000")
+
+    for table_name in EVENT_TABLES:
+        legacy_name = f"{table_name}_legacy"
+
+        op.execute(f"ALTER TABLE {table_name} RENAME TO {legacy_name}")
+        primary_key = conn.execute(
+            sa.text(
+                """SELECT conname FROM pg_constraint
+                   WHERE conrelid = CAST(:table_name AS regclass) AND contype = 'p'
+                """
+            ),
+            {"table_name": legacy_name},
+        ).scalar_one()
+        # A partition only adopts an index for the partitioned table's primary
+        # key if that index backs its own primary key, so we swap the existing
+        # one for the (time, id) index we've already built, which is cheap.
+        op.execute(
+            f"""ALTER TABLE {legacy_name}
+                DROP CONSTRAINT {primary_key},
+                ADD CONSTRAINT {legacy_name}_pkey
+                    PRIMARY KEY USING INDEX {legacy_name}_time_id_key
+            """
+        )
+
+        op.execute(
+            f"""CREATE TABLE {table_name} (
+                    LIKE {legacy_name} INCLUDING DEFAULTS,
+                    PRIMARY KEY (time, id)
+                ) PARTITION BY RANGE (time)
+            """
+        )
+        op.create_index(
+            f"ix_{table_name}_source_id_time",
+            table_name,
+            ["source_id", "time"],
+            unique=False,
+        )
+        # The foreign keys have to match the existing ones exactly, otherwise
+        # Postgres will add (and validate) new ones to the legacy partition
+        # rather than adopting the existing ones.
+        foreign_keys = conn.execute(
+            sa.text(
+                """SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                   WHERE conrelid = CAST(:table_name AS regclass) AND contype = 'f'
+                """
+            ),
+            {"table_name": legacy_name},
+        ).all()
+        for name, definition in foreign_keys:
+            op.execute(f"ALTER TABLE {table_name} ADD CONSTRAINT {name} {definition}")
+
+        op.execute(
+            f"""ALTER TABLE {table_name}
+                ATTACH PARTITION {legacy_name}
+                FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')
+            """
+        )
+        # The partition bounds now enforce this for us.
+        op.execute(
+            f"ALTER TABLE {legacy_name} DROP CONSTRAINT {legacy_name}_time_check"
+        )
+
+        for months in range(MONTHS_AHEAD):
+            start = _add_months(boundary, months)
+            end = _add_months(start, 1)
+            op.execute(
+                f"""CREATE TABLE {table_name}_y{start:%Y}m{start:%m}
+                    PARTITION OF {table_name}
+                    FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+                """
+            )
+        # If we ever fall behind on creating partitions, events end up in here
+        # rather than failing to be written at all.
+        op.execute(
+            f"CREATE TABLE {table_name}_default PARTITION OF {table_name} DEFAULT"
+        )
+
+    # The (source_id, time) index makes the old index on just source_id
+    # redundant, it's only dropped once nothing can be relying on it anymore.
+    conn.commit()
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = 4000")
+        op.execute("SET statement_timeout = 600000")
+        for table_name in EVENT_TABLES:
+            op.drop_index(
+                f"ix_{table_name}_source_id",
+                table_name=f"{table_name}_legacy",
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    op.execute("SET statement_timeout = 600000")
+
+    for table_name in EVENT_TABLES:
+        legacy_name = f"{table_name}_legacy"
+
+        op.execute(f"ALTER TABLE {table_name} DETACH PARTITION {legacy_name}")
+        op.execute(f"INSERT INTO {legacy_name} SELECT * FROM {table_name}")
+        op.execute(f"DROP TABLE {table_name}")
+
+        op.execute(f"ALTER TABLE {legacy_name} RENAME TO {table_name}")
+        op.execute(
+            f"""ALTER TABLE {table_name}
+                DROP CONSTRAINT {legacy_name}_pkey,
+                ADD CONSTRAINT {table_name}_pkey PRIMARY KEY (id)
+            """
+        )
+        op.create_index(
+            f"ix_{table_name}_source_id", table_name, ["source_id"], unique=False
+        )
+        op.drop_index(f"ix_{legacy_name}_source_id_time", table_name=table_name)
@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: Apache-2.0
+"""
+Maintain row counts with sharded trigger deltas
+
+Revision ID: 7a53048fb2bb
+Revises: fb13a07c3b67
+Create Date: 2026-10-19 16:21:07.204517
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "7a53048fb2bb"
+down_revision = "fb13a07c3b67"
+
+# Note: It is VERY important to ensure that a migration does not lock for a
+#       long period of time and to ensure that each individual migration does
+#       not break compatibility with the *previous* version of the code base.
+#       This is because the migrations will be ran automatically as part of the
+#       deployment process, but while the previous version of the code is still
+#       up and running. Thus backwards incompatible changes must be broken up
+#       over multiple migrations inside of multiple pull requests in order to
+#       phase them in over multiple deploys.
+#
+#       By default, migrations cannot wait more than 4s on acquiring a lock
+#       and each individual statement cannot take more than 5s. This helps
+#       prevent situations where a slow migration takes the entire site down.
+#
+#       If you need to increase this timeout for a migration, you can do so
+#       by adding:
+#
+#           op.execute("SET statement_timeout = 5000")
+#           op.execute("SET lock_timeout = 4000")
+#
+#       To whatever values are reasonable for this migration as part of your
+#       migration.
+
+# This needs to be kept in sync with the number of rows we seed below.
+SHARDS = 16
+
+COUNTED_TABLES = ["users", "projects", "releases", "release_files"]
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    # The previous version of compute_row_counts keeps overwriting count until it
+    # stops running, so the count that the deltas are folded into is kept apart
+    # from it. It starts out empty, and is recounted by the first fold to find it
+    # empty, which is after this migration has created the triggers.
+    op.add_column(
+        "row_counts",
+        sa.Column("folded_count", sa.BigInteger(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "row_count_deltas",
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column(
+            "delta",
+            sa.BigInteger(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("table_name", "shard"),
+        if_not_exists=True,
+    )
+    op.execute(
+        f"""INSERT INTO row_count_deltas (table_name, shard)
+            SELECT
+                tables.table_name,
+                shards.shard
+            FROM
+                unnest(ARRAY{COUNTED_TABLES!r}) AS tables(table_name),
+                generate_series(0, {SHARDS - 1}) AS shards(shard)
+            ON CONFLICT DO NOTHING;
+        """
+    )
+
+    # These are statement level triggers, so a statement that inserts or deletes
+    # many rows at once only updates a single shard, once.
+    for op_name, sign in [("insert", "+"), ("delete", "-")]:
+        op.execute(
+            f"""CREATE OR REPLACE FUNCTION row_count_deltas_{op_name}()
+            RETURNS TRIGGER AS $$
+            DECLARE
+                _rows bigint;
+            BEGIN
+                SELECT count(*) INTO _rows FROM changed_rows;
+                IF _rows <> 0 THEN
+                    UPDATE row_count_deltas
+                    SET delta = delta {sign} _rows
+                    WHERE
+                        table_name = TG_TABLE_NAME
+                        AND shard = (pg_backend_pid() & {SHARDS - 1});
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """
+        )
+
+    # Creating a trigger locks its table against writes until the transaction
+    # that created it commits, so each one is created in its own transaction.
+    conn.commit()
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = 4000")
+        op.execute("SET statement_timeout = 5000")
+        for table_name in COUNTED_TABLES:
+            for op_name, transition in [("insert", "NEW"), ("delete", "OLD")]:
+                op.execute(
+                    f"""CREATE OR REPLACE TRIGGER update_row_count_deltas_{op_name}
+                        AFTER {op_name.upper()} ON {table_name}
+                        REFERENCING {transition} TABLE AS changed_rows
+                        FOR EACH STATEMENT
+                        EXECUTE PROCEDURE row_count_deltas_{op_name}();
+                    """
+                )
+
+
+def downgrade():
+    for table_name in COUNTED_TABLES:
+        op.execute(f"DROP TRIGGER update_row_count_deltas_insert ON {table_name};")
+        op.execute(f"DROP TRIGGER update_row_count_deltas_delete ON {table_name};")
+    op.execute("DROP FUNCTION row_count_deltas_insert;")
+    op.execute("DROP FUNCTION row_count_deltas_delete;")
+    op.drop_table("row_count_deltas")
+    op.drop_column("row_counts", "folded_count")
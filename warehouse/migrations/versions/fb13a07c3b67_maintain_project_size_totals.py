@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: Apache-2.0
+"""
+Maintain a running total of project sizes
+
+Revision ID: fb13a07c3b67
+Revises: a6994b8bed95
+Create Date: 2026-10-19 14:02:31.518220
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "fb13a07c3b67"
+down_revision = "a6994b8bed95"
+
+# Note: It is VERY important to ensure that a migration does not lock for a
+#       long period of time and to ensure that each individual migration does
+#       not break compatibility with the *previous* version of the code base.
+#       This is because the migrations will be ran automatically as part of the
+#       deployment process, but while the previous version of the code is still
+#       up and running. Thus backwards incompatible changes must be broken up
+#       over multiple migrations inside of multiple pull requests in order to
+#       phase them in over multiple deploys.
+#
+#       By default, migrations cannot wait more than 4s on acquiring a lock
+#       and each individual statement cannot take more than 5s. This helps
+#       prevent situations where a slow migration takes the entire site down.
+#
+#       If you need to increase this timeout for a migration, you can do so
+#       by adding:
+#
+#           op.execute("SET statement_timeout = 5000")
+#           op.execute("SET lock_timeout = 4000")
+#
+#       To whatever values are reasonable for this migration as part of your
+#       migration.
+
+# This needs to be kept in sync with the number of rows we seed below.
+SHARDS = 16
+
+
+def upgrade():
+    conn = op.get_bind()
+
+    op.create_table(
+        "project_size_totals",
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column(
+            "total_size",
+            sa.BigInteger(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("shard"),
+        if_not_exists=True,
+    )
+    op.execute(
+        f"""INSERT INTO project_size_totals (shard)
+            SELECT generate_series(0, {SHARDS - 1})
+            ON CONFLICT DO NOTHING;
+        """
+    )
+
+    # The shard is picked by backend rather than by project, so that concurrent
+    # uploads only contend over a shard when they happen to share one.
+    op.execute(
+        f"""CREATE OR REPLACE FUNCTION project_size_totals_update()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            _delta bigint;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                _delta := COALESCE(NEW.total_size, 0);
+            ELSIF TG_OP = 'UPDATE' THEN
+                _delta := COALESCE(NEW.total_size, 0) - COALESCE(OLD.total_size, 0);
+            ELSIF TG_OP = 'DELETE' THEN
+                _delta := -COALESCE(OLD.total_size, 0);
+            END IF;
+            IF _delta <> 0 THEN
+                UPDATE project_size_totals
+                SET total_size = total_size + _delta
+                WHERE shard = (pg_backend_pid() & {SHARDS - 1});
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+
+    # Creating the trigger locks the projects table against writes until the
+    # transaction that created it commits, so it is created in its own.
+    conn.commit()
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = 4000")
+        op.execute("SET statement_timeout = 5000")
+        op.execute(
+            """CREATE OR REPLACE TRIGGER update_project_size_totals
+                AFTER INSERT OR UPDATE OF total_size OR DELETE ON projects
+                FOR EACH ROW EXECUTE PROCEDURE project_size_totals_update();
+            """
+        )
+
+        # Index our project sizes so that the largest projects can be read
+        # straight off of the index, rather than sorting the entire table.
+        op.execute("SET statement_timeout = 60000")
+        op.create_index(
+            "projects_total_size_idx",
+            "projects",
+            [sa.text("total_size DESC NULLS LAST")],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+
+        # Summing the projects doesn't block writing to them. It happens in a
+        # single statement, so the sum and the changes that the trigger has
+        # recorded since it was created, which the sum already includes, are
+        # taken from the same snapshot. Only the difference between the two is
+        # added, which is nothing if this has already been run.
+        op.execute(
+            """UPDATE project_size_totals
+                SET total_size = total_size + (
+                    SELECT COALESCE(SUM(total_size), 0) FROM projects
+                ) - (
+                    SELECT SUM(total_size) FROM project_size_totals
+                )
+                WHERE shard = 0;
+            """
+        )
+
+
+def downgrade():
+    op.drop_index("projects_total_size_idx", table_name="projects")
+    op.execute("DROP TRIGGER update_project_size_totals ON projects;")
+    op.execute("DROP FUNCTION project_size_totals_update;")
+    op.drop_table("project_size_totals")
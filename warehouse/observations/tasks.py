@@ -10,13 +10,15 @@ from textwrap import dedent
 
 from humanize import naturaldate, naturaltime
 from requests.exceptions import RequestException
+from sqlalchemy import func, select
 
 from warehouse import db, tasks
+from warehouse.accounts.models import User
 from warehouse.helpdesk.interfaces import IAdminNotificationService, IHelpDeskService
-from warehouse.packaging.models import LifecycleStatus
+from warehouse.packaging.models import LifecycleStatus, Project
 from warehouse.utils.project import quarantine_project
 
-from .models import OBSERVATION_KIND_MAP, Observation, ObservationKind
+from .models import OBSERVATION_KIND_MAP, Observation, ObservationKind, Observer
 
 if typing.TYPE_CHECKING:
     from uuid import UUID
@@ -148,6 +150,31 @@ def report_observation_to_helpscout(task, request: Request, model_id: UUID) -> N
     return
 
 
+def _observer_summaries(
+    request: Request, project_ids: typing.Iterable[UUID]
+) -> dict[UUID, tuple[int, bool]]:
+    """
+    Summarize who has made observations on each of the given projects, as a
+    mapping of project id to the number of distinct users that have observed
+    it, and whether any of those users are a `User.is_observer`.
+    """
+    rows = request.db.execute(
+        select(
+            Project.Observation.related_id,
+            func.count(User.id.distinct()),
+            func.bool_or(User.is_observer),
+        )
+        .join(Observer, Observer.id == Project.Observation.observer_id)
+        .join(User, User.observer_association_id == Observer._association_id)
+        .where(Project.Observation.related_id.in_(project_ids))
+        .group_by(Project.Observation.related_id)
+    )
+    return {
+        project_id: (observers, has_observer)
+        for project_id, observers, has_observer in rows
+    }
+
+
 @tasks.task(
     bind=True,
     ignore_result=True,
@@ -187,12 +214,24 @@ def evaluate_project_for_quarantine(
     if project.lifecycle_status == LifecycleStatus.QuarantineEnter:
         logger.info("Project is already quarantined. No change needed.")
         return
+
+    _quarantine_if_observed(
+        request,
+        project,
+        _observer_summaries(request, [project.id]).get(project.id, (0, False)),
+        logger,
+    )
+
+
+def _quarantine_if_observed(
+    request: Request, project: Project, observer_summary: tuple[int, bool], logger
+) -> None:
     # Check Observers
-    observer_users = {obs.observer.parent for obs in project.observations}
-    if len(observer_users) < 2:
+    observers, has_observer = observer_summary
+    if observers < 2:
         logger.info("Project has fewer than 2 observers. Not quarantining.")
         return
-    if not any(observer.is_observer for observer in observer_users):
+    if not has_observer:
         logger.info("Project has no `User.is_observer` Observers. Not quarantining.")
         return
 
@@ -269,3 +308,33 @@ def evaluate_project_for_quarantine(
     notification_service.send_notification(payload=webhook_payload)
 
     return
+
+
+@tasks.task(bind=True, ignore_result=True, acks_late=True, queue="bulk")
+def reevaluate_projects_for_quarantine(task: WarehouseTask, request: Request) -> None:
+    """
+    Re-evaluate every project with open malware reports for auto-quarantine.
+    """
+    open_reports = (
+        select(Project.Observation.related_id)
+        .where(
+            Project.Observation.kind == ObservationKind.IsMalware.value[0],
+            Project.Observation.actions == {},
+        )
+        .distinct()
+    )
+    projects = request.db.scalars(
+        select(Project).where(
+            Project.id.in_(open_reports),
+            Project.lifecycle_status.is_distinct_from(LifecycleStatus.QuarantineEnter),
+        )
+    ).all()
+    summaries = _observer_summaries(request, [project.id for project in projects])
+
+    for project in projects:
+        _quarantine_if_observed(
+            request,
+            project,
+            summaries.get(project.id, (0, False)),
+            request.log.bind(project=project.name, task=task.name),
+        )
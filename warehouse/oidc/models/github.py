@@ -215,11 +215,20 @@ class GitHubPublisherMixin:
                 "Could not job extract workflow filename from OIDC claims"
             )
 
-        query: Query = Query(cls).filter_by(
-            repository_name=repository_name,
-            repository_owner=repository_owner,
-            repository_owner_id=signed_claims["repository_owner_id"],
-            workflow_filename=job_workflow_filename,
+        # Only the publisher for this environment (if any) and the general
+        # publisher are candidates, so we let the unique index filter out
+        # any publishers for other environments.
+        environments = [environment.lower(), ""] if environment else [""]
+
+        query: Query = (
+            Query(cls)
+            .filter_by(
+                repository_name=repository_name,
+                repository_owner=repository_owner,
+                repository_owner_id=signed_claims["repository_owner_id"],
+                workflow_filename=job_workflow_filename,
+            )
+            .filter(cls.environment.in_(environments))
         )
         publishers = query.with_session(session).all()
 
@@ -215,10 +215,19 @@ class GitLabPublisherMixin:
                 "Could not extract workflow filename from OIDC claims"
             )
 
-        query: Query = Query(cls).filter_by(
-            namespace=namespace,
-            project=project,
-            workflow_filepath=workflow_filepath,
+        # Only the publisher for this environment (if any) and the general
+        # publisher are candidates, so we let the unique index filter out
+        # any publishers for other environments.
+        environments = [environment, ""] if environment else [""]
+
+        query: Query = (
+            Query(cls)
+            .filter_by(
+                namespace=namespace,
+                project=project,
+                workflow_filepath=workflow_filepath,
+            )
+            .filter(cls.environment.in_(environments))
         )
         publishers = query.with_session(session).all()
         if publisher := cls._get_publisher_for_environment(publishers, environment):
@@ -62,10 +62,16 @@ class GooglePublisherMixin:
 
     @classmethod
     def lookup_by_claims(cls, session, signed_claims: SignedClaims) -> Self:
-        query: Query = Query(cls).filter_by(email=signed_claims["email"])
+        sub = signed_claims.get("sub")
+
+        # Only the publisher for this subject (if any) and the general publisher
+        # are candidates, so we let the unique index filter out the rest.
+        query: Query = Query(cls).filter(
+            cls.email == signed_claims["email"], cls.sub.in_([sub, ""] if sub else [""])
+        )
         publishers = query.with_session(session).all()
 
-        if sub := signed_claims.get("sub"):
+        if sub:
             if specific_publisher := first_true(
                 publishers, pred=lambda p: p.sub == sub
             ):
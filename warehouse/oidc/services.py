@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import json
+import time
 import warnings
 
 import jwt
@@ -17,6 +18,24 @@ from warehouse.oidc.models import OIDCPublisher, PendingOIDCPublisher
 from warehouse.oidc.utils import find_publisher_by_issuer
 from warehouse.utils.exceptions import InsecureOIDCPublisherWarning
 
+# How long a signing key is trusted for in this process before we check the
+# shared keyset in Redis again, which may have been refreshed by another worker.
+KEY_CACHE_TTL = 60
+
+# Redis clients shared by every OIDC service in this process, keyed by URL, so
+# that connections are pooled rather than set up on every use.
+_redis_clients: dict[str, redis.StrictRedis] = {}
+
+# Parsed signing keys for this process, keyed by publisher and key ID, along with
+# when they should next be checked against the shared keyset.
+_key_cache: dict[tuple[str, str], tuple[jwt.PyJWK, float]] = {}
+
+
+def _get_redis(url: str) -> redis.StrictRedis:
+    if (client := _redis_clients.get(url)) is None:
+        client = _redis_clients.setdefault(url, redis.StrictRedis.from_url(url))
+    return client
+
 
 @implementer(IOIDCPublisherService)
 class NullOIDCPublisherService:
@@ -103,9 +122,9 @@ class OIDCPublisherService:
         in the process.
         """
 
-        with redis.StrictRedis.from_url(self.cache_url) as r:
-            r.set(self._publisher_jwk_key, json.dumps(keys))
-            r.setex(self._publisher_timeout_key, 60, "placeholder")
+        r = _get_redis(self.cache_url)
+        r.set(self._publisher_jwk_key, json.dumps(keys))
+        r.setex(self._publisher_timeout_key, 60, "placeholder")
 
     def _get_keyset(self):
         """
@@ -113,13 +132,13 @@ class OIDCPublisherService:
         keyset if no keys are currently cached.
         """
 
-        with redis.StrictRedis.from_url(self.cache_url) as r:
-            keys = r.get(self._publisher_jwk_key)
-            timeout = bool(r.exists(self._publisher_timeout_key))
-            if keys is not None:
-                return (json.loads(keys), timeout)
-            else:
-                return ({}, timeout)
+        r = _get_redis(self.cache_url)
+        keys = r.get(self._publisher_jwk_key)
+        timeout = bool(r.exists(self._publisher_timeout_key))
+        if keys is not None:
+            return (json.loads(keys), timeout)
+        else:
+            return ({}, timeout)
 
     def _refresh_keyset(self):
         """
@@ -202,6 +221,11 @@ class OIDCPublisherService:
         in this publisher's keyset.
         """
 
+        # Fast path: we've already parsed this key recently.
+        cached = _key_cache.get((self.publisher, key_id))
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
         keyset, _ = self._get_keyset()
         if key_id not in keyset:
             keyset = self._refresh_keyset()
@@ -211,7 +235,10 @@ class OIDCPublisherService:
                 tags=[f"publisher:{self.publisher}", f"key_id:{key_id}"],
             )
             return None
-        return jwt.PyJWK(keyset[key_id])
+
+        key = jwt.PyJWK(keyset[key_id])
+        _key_cache[(self.publisher, key_id)] = (key, time.monotonic() + KEY_CACHE_TTL)
+        return key
 
     def _get_key_for_token(self, token):
         """
@@ -227,23 +254,23 @@ class OIDCPublisherService:
         """
         Check if a JWT Token Identifier has already been used.
         """
-        with redis.StrictRedis.from_url(self.cache_url) as r:
-            return bool(r.exists(f"/warehouse/oidc/{self.publisher}/{jti}"))
+        r = _get_redis(self.cache_url)
+        return bool(r.exists(f"/warehouse/oidc/{self.publisher}/{jti}"))
 
     def store_jwt_identifier(self, jti: str, expiration: int) -> None:
         """
         Store the JTI with its expiration date if the key does not exist.
         """
-        with redis.StrictRedis.from_url(self.cache_url) as r:
-            # Defensive: to prevent races, we expire the JTI slightly after
-            # the token expiration date. Thus, the lock will not be
-            # released before the token invalidation.
-            r.set(
-                f"/warehouse/oidc/{self.publisher}/{jti}",
-                exat=expiration + 5,
-                value="",  # empty value to lower memory usage
-                nx=True,
-            )
+        r = _get_redis(self.cache_url)
+        # Defensive: to prevent races, we expire the JTI slightly after
+        # the token expiration date. Thus, the lock will not be
+        # released before the token invalidation.
+        r.set(
+            f"/warehouse/oidc/{self.publisher}/{jti}",
+            exat=expiration + 5,
+            value="",  # empty value to lower memory usage
+            nx=True,
+        )
 
     def verify_jwt_signature(self, unverified_token: str) -> SignedClaims | None:
         try:
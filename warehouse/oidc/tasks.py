@@ -9,7 +9,7 @@ from warehouse.oidc.models import OIDCPublisher
 from warehouse.packaging.models import File, Project, Release
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def compute_oidc_metrics(request):
     metrics = request.find_service(IMetricsService, context=None)
 
@@ -21,11 +21,14 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    SmallInteger,
     String,
     Text,
     UniqueConstraint,
     cast,
+    desc,
     func,
+    nulls_last,
     or_,
     orm,
     select,
@@ -264,6 +267,7 @@ class Project(SitemapMixin, HasEvents, HasObservations, db.Model):
             func.ultranormalize_name(name),
         ),
         Index("projects_lifecycle_status_idx", "lifecycle_status"),
+        Index("projects_total_size_idx", nulls_last(desc(total_size))),
     )
 
     def __getitem__(self, version):
@@ -576,6 +580,20 @@ class DependencyKind(enum.IntEnum):
     requires_external = 7
 
 
+class ProjectSizeTotal(db.ModelBase):
+    """
+    A running total of ``Project.total_size`` across every project, kept up to
+    date by a trigger on ``projects``. The total is spread across a fixed
+    number of shards, keyed on the database backend, so that concurrent uploads
+    don't all contend over a single row.
+    """
+
+    __tablename__ = "project_size_totals"
+
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    total_size: Mapped[int] = mapped_column(BigInteger, server_default=sql.text("0"))
+
+
 class Dependency(db.Model):
     __tablename__ = "release_dependencies"
     __table_args__ = (
@@ -1,12 +1,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import collections
+import gzip
 import hashlib
 import io
 import json
 import logging
 import os.path
 import shutil
+import tempfile
 import warnings
 
 from itertools import chain
@@ -49,7 +51,7 @@ from warehouse.packaging.models import (
     Project,
     Role,
 )
-from warehouse.packaging.typosnyper import typo_check_name
+from warehouse.packaging.typosnyper import get_index, typo_check_name
 from warehouse.rate_limiting import DummyRateLimiter, IRateLimiter
 from warehouse.utils.exceptions import DevelopmentModeWarning
 from warehouse.utils.project import PROJECT_NAME_RE
@@ -343,11 +345,13 @@ class GenericGCSBlobStorage(GenericBlobStorage):
             google.api_core.exceptions.ServiceUnavailable
         )
     )
-    def store(self, path: str, file_path, *, meta=None):
+    def store(self, path: str, file_path, *, meta=None, content_encoding=None):
         path = self._get_path(path)
         blob = self.bucket.blob(path)
         if meta is not None:
             blob.metadata = meta
+        if content_encoding is not None:
+            blob.content_encoding = content_encoding
 
         # Our upload is not fully transactional, meaning that this upload may
         # succeed, and the corresponding write to DB may fail. If/when that
@@ -385,6 +389,15 @@ class GCSFileStorage(GenericGCSBlobStorage):
 
 @implementer(ISimpleStorage)
 class GCSSimpleStorage(GenericGCSBlobStorage):
+    def __init__(self, bucket, *, prefix=None, content_encoding=None):
+        # GCS will only decompress gzip encoded objects for clients that don't
+        # accept them as is, so that's all that we can store them as.
+        if content_encoding not in {None, "gzip"}:
+            raise ValueError(f"Unsupported content encoding: {content_encoding!r}")
+
+        super().__init__(bucket, prefix=prefix)
+        self.content_encoding = content_encoding
+
     @classmethod
     @google.api_core.retry.Retry(
         predicate=google.api_core.retry.if_exception_type(
@@ -396,8 +409,27 @@ class GCSSimpleStorage(GenericGCSBlobStorage):
         bucket_name = request.registry.settings["simple.bucket"]
         bucket = storage_client.get_bucket(bucket_name)
         prefix = request.registry.settings.get("simple.prefix")
+        content_encoding = request.registry.settings.get("simple.content_encoding")
 
-        return cls(bucket, prefix=prefix)
+        return cls(bucket, prefix=prefix, content_encoding=content_encoding)
+
+    def store(self, path: str, file_path, *, meta=None):
+        if self.content_encoding is None:
+            return super().store(path, file_path, meta=meta)
+
+        # Store the file already compressed, so that it can be served as is to
+        # every client that accepts it, without being compressed again.
+        with tempfile.NamedTemporaryFile() as compressed:
+            with open(file_path, "rb") as fp:
+                compressed.write(gzip.compress(fp.read(), mtime=0))
+            compressed.flush()
+
+            super().store(
+                path,
+                compressed.name,
+                meta=meta,
+                content_encoding=self.content_encoding,
+            )
 
 
 @implementer(IProjectService)
@@ -481,11 +513,14 @@ class ProjectService:
         ).first():
             raise ProjectNameUnavailableSimilarError(similar_project_name)
 
-        # Check for typo-squatting.
-        cached_corpus = self._query_results_cache.get("top_dependents_corpus")
-        if typo_check_match := typo_check_name(
-            canonicalize_name(name), corpus=cached_corpus
-        ):
+        # Check for typo-squatting, against the index built alongside the corpus
+        # of top dependents. Only its version is fetched on every check, the index
+        # itself is only fetched again once the corpus has been recomputed.
+        index = get_index(
+            self._query_results_cache.get("top_dependents_corpus_version"),
+            lambda: self._query_results_cache.get("top_dependents_corpus_index"),
+        )
+        if typo_check_match := typo_check_name(canonicalize_name(name), corpus=index):
             raise ProjectNameUnavailableTypoSquattingError(
                 check_name=typo_check_match[0],
                 existing_project_name=typo_check_match[1],
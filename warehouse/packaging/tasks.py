@@ -10,7 +10,7 @@ import typing
 from collections import namedtuple
 
 from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
-from sqlalchemy import desc, func, nulls_last, select
+from sqlalchemy import desc, func, nulls_last, or_, select
 from sqlalchemy.orm import joinedload
 
 from warehouse import tasks
@@ -26,8 +26,9 @@ from warehouse.packaging.models import (
     Project,
     Release,
 )
+from warehouse.packaging.typosnyper import TypoIndex
 from warehouse.utils import readme
-from warehouse.utils.row_counter import RowCount
+from warehouse.utils.row_counter import get_row_counts
 
 if typing.TYPE_CHECKING:
     from pyramid.request import Request
@@ -52,6 +53,7 @@ def _copy_file_to_cache(archive_storage, cache_storage, path):
         SoftTimeLimitExceeded,
         TimeLimitExceeded,
     ),
+    queue="critical",
 )
 def sync_file_to_cache(request, file_id):
     file = request.db.get(File, file_id)
@@ -67,21 +69,9 @@ def sync_file_to_cache(request, file_id):
         file.cached = True
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def compute_packaging_metrics(request):
-    counts = dict(
-        request.db.query(RowCount.table_name, RowCount.count)
-        .filter(
-            RowCount.table_name.in_(
-                [
-                    Project.__tablename__,
-                    Release.__tablename__,
-                    File.__tablename__,
-                ]
-            )
-        )
-        .all()
-    )
+    counts = get_row_counts(request.db, [Project, Release, File])
 
     metrics = request.find_service(IMetricsService, context=None)
 
@@ -125,7 +115,7 @@ def fetch_checksums(storage, file):
     return Checksums(file_checksum, file_metadata_checksum)
 
 
-@tasks.task(ignore_results=True, acks_late=True)
+@tasks.task(ignore_results=True, acks_late=True, queue="bulk")
 def reconcile_file_storages(request):
     metrics = request.find_service(IMetricsService, context=None)
     cache_storage = request.find_service(IFileStorage, name="cache")
@@ -221,41 +211,37 @@ def reconcile_file_storages(request):
                 file.cached = True
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def compute_2fa_metrics(request):
     metrics = request.find_service(IMetricsService, context=None)
 
+    # Count every metric in a single pass over our users, rather than one per metric.
+    webauthn_users = select(WebAuthn.user_id).distinct().subquery()
+    has_totp = User.totp_secret.is_not(None)
+    has_webauthn = webauthn_users.c.user_id.is_not(None)
+    totp, webauthn, two_factor = request.db.execute(
+        select(
+            func.count().filter(has_totp),
+            func.count().filter(has_webauthn),
+            func.count().filter(or_(has_totp, has_webauthn)),
+        ).select_from(
+            User.__table__.outerjoin(
+                webauthn_users, webauthn_users.c.user_id == User.id
+            )
+        )
+    ).one()
+
     # Total number of users with TOTP enabled
-    total_users_with_totp_enabled = (
-        request.db.query(User).where(User.totp_secret.is_not(None)).count()
-    )
-    metrics.gauge(
-        "warehouse.2fa.total_users_with_totp_enabled",
-        total_users_with_totp_enabled,
-    )
+    metrics.gauge("warehouse.2fa.total_users_with_totp_enabled", totp)
 
     # Total number of users with WebAuthn enabled
-    metrics.gauge(
-        "warehouse.2fa.total_users_with_webauthn_enabled",
-        request.db.query(User.id)
-        .distinct()
-        .join(WebAuthn, WebAuthn.user_id == User.id)
-        .count(),
-    )
+    metrics.gauge("warehouse.2fa.total_users_with_webauthn_enabled", webauthn)
 
     # Total number of users with 2FA enabled
-    metrics.gauge(
-        "warehouse.2fa.total_users_with_two_factor_enabled",
-        total_users_with_totp_enabled
-        + request.db.query(User.id)
-        .distinct()
-        .join(WebAuthn, WebAuthn.user_id == User.id)
-        .where(User.totp_secret.is_(None))
-        .count(),
-    )
+    metrics.gauge("warehouse.2fa.total_users_with_two_factor_enabled", two_factor)
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def update_description_html(request):
     renderer_version = readme.renderer_version()
 
@@ -271,7 +257,7 @@ def update_description_html(request):
         description.rendered_by = renderer_version
 
 
-@tasks.task(bind=True, ignore_result=True, acks_late=True)
+@tasks.task(bind=True, ignore_result=True, acks_late=True, queue="bulk")
 def update_release_description(_task, request, release_id):
     """Given a release_id, update the release description via readme-renderer."""
     renderer_version = readme.renderer_version()
@@ -351,7 +337,7 @@ def update_bigquery_release_files(task, request, dist_metadata):
         )
 
 
-@tasks.task(ignore_result=True, acks_late=True)
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
 def compute_top_dependents_corpus(request: Request) -> dict[str, int]:
     """
     Query to collect all dependents from projects' most recent release
@@ -429,4 +415,11 @@ def compute_top_dependents_corpus(request: Request) -> dict[str, int]:
     cache.set(cache_key, results)
     logger.info("Stored `top_dependents_corpus` in query results cache.")
 
+    # Build the typo-squatting index here, rather than in the upload workers that
+    # check names against it. The version is stored last, so that anything which
+    # sees the new version will also find the index that goes with it.
+    index = TypoIndex(results)
+    cache.set(f"{cache_key}_index", index.to_dict())
+    cache.set(f"{cache_key}_version", index.version)
+
     return results
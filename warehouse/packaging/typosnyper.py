@@ -13,7 +13,15 @@ Takes inspiration from the `typoguard` paper & project,
 and the `typomania` Rust project.
 """
 
-from itertools import permutations
+from __future__ import annotations
+
+import array
+import base64
+import bisect
+import functools
+import hashlib
+
+from collections.abc import Callable, Iterable
 
 # Ensure all checks return a similar type,
 # where the first string is the check name,
@@ -275,13 +283,184 @@ _TYPO_MAP = {
 }
 
 
-def _repeated_characters(project_name: str, corpus: set[str]) -> TypoCheckMatch:
+# Characters that the omitted characters check may insert into a name,
+# in the order in which they are tried.
+_ALLOWED_CHARACTERS = "abcdefghijklmnopqrstuvwxyz1234567890.-_"
+
+# Do not apply the omitted characters check to project names shorter than this,
+# to reduce false positives
+_OMITTED_CHARACTERS_MIN_LENGTH = 4
+
+
+# Each entry in the deletion index packs the hash of a variant into the high bits
+# and the position of the name it came from into the low bits.
+_NAME_BITS = 24
+_NAME_MASK = (1 << _NAME_BITS) - 1
+_HASH_MASK = (1 << (63 - _NAME_BITS)) - 1
+
+
+def _variant_hash(variant: str) -> int:
+    # Indexes are built in one process and loaded in others, so this can't use
+    # the builtin hash(), which is salted differently in every process.
+    digest = hashlib.blake2b(variant.encode(), digest_size=8).digest()
+    return int.from_bytes(digest) & _HASH_MASK
+
+
+def _words_signature(words: Iterable[str]) -> str:
+    return "-".join(sorted(words))
+
+
+class TypoIndex:
+    """
+    A precomputed index over a corpus of project names.
+
+    Checking a name against the index costs a bounded number of lookups per
+    character in the name, no matter how large the corpus is, instead of
+    generating (and testing) every possible insertion or word ordering.
+    """
+
+    def __init__(self, corpus: Iterable[str]):
+        self.names = frozenset(corpus)
+        self._ordered_names = sorted(self.names)
+        if len(self._ordered_names) > _NAME_MASK:
+            raise ValueError(f"Corpus is too large to index: {len(self.names)}")
+        self.version = _corpus_version(self._ordered_names)
+
+        # Every variant of a name with a single character deleted, hashed and
+        # mapped back to the name it came from (SymSpell-style), so that a name
+        # with an omitted character is a single lookup away from its target.
+        # This is kept as a sorted array of integers, rather than as a mapping of
+        # strings, to keep the index small enough to hold in every process.
+        deletions = []
+        # Every name made up of multiple words, keyed on its words in sorted order,
+        # so that a name with reordered words is a single lookup away.
+        self._signatures: dict[str, list[str]] = {}
+
+        for position, name in enumerate(self._ordered_names):
+            if len(name) > _OMITTED_CHARACTERS_MIN_LENGTH:
+                deletions.extend(
+                    _variant_hash(variant) << _NAME_BITS | position
+                    for variant in {
+                        name[:idx] + name[idx + 1 :]
+                        for idx, character in enumerate(name)
+                        if character in _ALLOWED_CHARACTERS
+                    }
+                )
+
+            words = name.split("-")
+            if len(words) > 1:
+                self._signatures.setdefault(_words_signature(words), []).append(name)
+
+        deletions.sort()
+        self._deletions = array.array("q", deletions)
+
+    def to_dict(self) -> dict:
+        """
+        Return a JSON serializable form of the index, which can be loaded again
+        with `from_dict` far more cheaply than building the index from scratch.
+        """
+        return {
+            "version": self.version,
+            "names": self._ordered_names,
+            "deletions": base64.b64encode(self._deletions.tobytes()).decode(),
+            "signatures": self._signatures,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> TypoIndex:
+        index = cls.__new__(cls)
+        index.version = data["version"]
+        index.names = frozenset(data["names"])
+        index._ordered_names = data["names"]
+        index._deletions = array.array("q", base64.b64decode(data["deletions"]))
+        index._signatures = data["signatures"]
+        return index
+
+    def deleted_from(self, variant: str) -> list[str]:
+        """
+        Return the names that the given variant could have been created from by
+        deleting a single character. Because these are found by hash, they may
+        include false positives which the caller must check for.
+        """
+        key = _variant_hash(variant) << _NAME_BITS
+        idx = bisect.bisect_left(self._deletions, key)
+        names = []
+        while idx < len(self._deletions) and self._deletions[idx] & ~_NAME_MASK == key:
+            names.append(self._ordered_names[self._deletions[idx] & _NAME_MASK])
+            idx += 1
+        return names
+
+    def reordered_from(self, words: Iterable[str]) -> list[str]:
+        """
+        Return the names which are made up of the given words, in any order.
+        """
+        return self._signatures.get(_words_signature(words), [])
+
+
+def _corpus_version(ordered_names: list[str]) -> str:
+    return hashlib.sha256("\n".join(ordered_names).encode()).hexdigest()
+
+
+# The most recently loaded index. The corpus only changes when it is recomputed,
+# so this lets every check in between reuse the same index.
+_cached_index: TypoIndex | None = None
+
+
+def get_index(version: str | None, load: Callable[[], dict | None]) -> TypoIndex | None:
+    """
+    Return the prebuilt index for the given corpus version, only calling `load`
+    for its serialized form when the version has changed since the last call.
+
+    Returns None if there is no prebuilt index to use.
+    """
+    global _cached_index
+
+    if version is None:
+        return None
+    if _cached_index is None or _cached_index.version != version:
+        if (data := load()) is None:
+            return None
+        _cached_index = TypoIndex.from_dict(data)
+    return _cached_index
+
+
+@functools.lru_cache(maxsize=1)
+def _static_index(names: frozenset[str]) -> TypoIndex:
+    return TypoIndex(names)
+
+
+def _insertion_order(project_name: str, constructed: str) -> tuple[int, int] | None:
+    # The position and character that inserting characters from left to right
+    # would have used to construct the given name, if any.
+    if len(constructed) == len(project_name) + 1:
+        for idx in range(len(project_name) + 1):
+            if (
+                constructed[:idx] == project_name[:idx]
+                and constructed[idx + 1 :] == project_name[idx:]
+            ):
+                return idx, _ALLOWED_CHARACTERS.index(constructed[idx])
+    return None
+
+
+def _permutation_order(words: list[str], reordered: list[str]) -> tuple[int, ...]:
+    # The positions of the original words that make up the reordered name,
+    # which is the order that `itertools.permutations` would produce it in.
+    unused = list(range(len(words)))
+    order = []
+    for word in reordered:
+        idx = next(idx for idx in unused if words[idx] == word)
+        unused.remove(idx)
+        order.append(idx)
+    return tuple(order)
+
+
+def _repeated_characters(project_name: str, index: TypoIndex) -> TypoCheckMatch:
     """
     Removes any identical consecutive characters to check for typosquatting
     by repeated characters.
     For example, 'reequests' could be typosquatting 'requests'.
 
-    Returns a possible typosquatting target from the given names list.
+    Returns a possible typosquatting target from the given index.
     """
 
     # Loop through each character in the project name
@@ -291,111 +470,100 @@ def _repeated_characters(project_name: str, corpus: set[str]) -> TypoCheckMatch:
             # Build a new name by removing the duplicated character
             deduplicated = project_name[:idx] + project_name[idx + 1 :]
             # If the new name is in the list of popular names, return it
-            if deduplicated in corpus:
+            if deduplicated in index.names:
                 return "repeated_characters", deduplicated
 
     return None
 
 
-def _omitted_characters(project_name: str, corpus: set[str]) -> TypoCheckMatch:
+def _omitted_characters(project_name: str, index: TypoIndex) -> TypoCheckMatch:
     """
-    Inserts allowed characters into name to check for typosquatting by omission.
+    Looks up names that the given name is missing a single character from,
+    to check for typosquatting by omission.
     For example, 'evnt-stream' could be typosquatting 'event-stream'.
 
-    Returns possible typosquatting target from the given names list.
-
-    Note: Performance-wise, this is the slowest check, but is straightforward.
-    We're talking 178 microseconds vs 40 microseconds, so it's fine for our use case.
+    Returns possible typosquatting target from the given index.
     """
-    allowed_characters = "abcdefghijklmnopqrstuvwxyz1234567890.-_"
 
     # Do not apply this check to short project names, to reduce false positives
-    if len(project_name) < 4:
+    if len(project_name) < _OMITTED_CHARACTERS_MIN_LENGTH:
         return None
 
-    # Loop through every position in the given package_name
-    for idx in range(len(project_name) + 1):
-        # Loop through every character in the list of allowed characters
-        for character in allowed_characters:
-            # Build new name by inserting the current character in the current position
-            constructed = project_name[:idx] + character + project_name[idx:]
-            # If the new name is in the list of popular names, return it
-            if constructed in corpus:
-                return "omitted_characters", constructed
+    if candidates := [
+        (order, name)
+        for name in index.deleted_from(project_name)
+        if (order := _insertion_order(project_name, name)) is not None
+    ]:
+        # If more than one name matches, prefer the one that inserting each of
+        # the allowed characters from left to right would have found first.
+        return "omitted_characters", min(candidates)[1]
 
     return None
 
 
-def _swapped_characters(project_name: str, corpus: set[str]) -> TypoCheckMatch:
+def _swapped_characters(project_name: str, index: TypoIndex) -> TypoCheckMatch:
     """
     Swaps adjacent characters to check for typosquatting by swapped characters.
     For example, 'spihnx' could be typosquatting 'sphinx'.
     """
 
     # Loop through all pairs of consecutive characters in the given name
-    for index in range(len(project_name) - 1):
+    for idx in range(len(project_name) - 1):
         # Swap the two characters to create a new name
-        char_list = list(project_name)
-        temp = char_list[index]
-        char_list[index] = char_list[index + 1]
-        char_list[index + 1] = temp
-        swapped_string = "".join(char_list)
+        swapped_string = (
+            project_name[:idx]
+            + project_name[idx + 1]
+            + project_name[idx]
+            + project_name[idx + 2 :]
+        )
 
         # If the new name is in the list of popular names, return it
-        if swapped_string in corpus:
+        if swapped_string in index.names:
             return "swapped_characters", swapped_string
 
     return None
 
 
-def _swapped_words(project_name: str, corpus: set[str]) -> TypoCheckMatch:
+def _swapped_words(project_name: str, index: TypoIndex) -> TypoCheckMatch:
     """
-    Reorders project_name substrings separated by `-` to look for typosquatting.
+    Looks up names made of the same `-` separated words in another order,
+    to look for typosquatting.
     For example, 'stream-event' could be  squatting 'event-stream'.
     """
 
-    # Input is a canonicalized name, split it on `-` to we can swap them around
-    tokens = project_name.split("-")
-    if (
-        # Project names with no delimiters are not candidates for this check
-        len(tokens) < 2
-        # This function has factorial time complexity. To avoid
-        # extremely long execution times, limit the number of tokens
-        # allowed to be processed
-        or len(tokens) > 8
-    ):
+    # Input is a canonicalized name, split it on `-` to we can compare the words
+    words = project_name.split("-")
+    # Project names with no delimiters are not candidates for this check
+    if len(words) < 2:
         return None
 
-    # Get all possible permutations of the words in the name
-    for p in permutations(tokens):
-        # Join the words using `-` to create a new name
-        reconstructed = "-".join(p)
-        # If the new name is in the list of popular names, return it
-        if reconstructed != project_name and reconstructed in corpus:
-            return "swapped_words", reconstructed
+    if candidates := [
+        name for name in index.reordered_from(words) if name != project_name
+    ]:
+        # If more than one name matches, prefer the one that trying every
+        # permutation of the words in order would have found first.
+        return "swapped_words", min(
+            candidates, key=lambda c: _permutation_order(words, c.split("-"))
+        )
 
     return None
 
 
-def _common_typos(project_name: str, corpus: set[str]) -> TypoCheckMatch:
+def _common_typos(project_name: str, index: TypoIndex) -> TypoCheckMatch:
     """
     Applies each of the common typos to each of the characters in the given name.
     Checks if each result is in the list of popular names.
     """
     # Loop through all characters in the given package_name
     for idx, character in enumerate(project_name):
-        # Ensure the character is in the common typo dict
-        if character in _TYPO_MAP:
-            # Loop through each common typo for the given character
-            for t in _TYPO_MAP[character]:
-                # Build a new name, swapping character with the current typo character
-                typo_project_name_chars = list(project_name)
-                typo_project_name_chars[idx] = t
-                typo_project_name = "".join(typo_project_name_chars)
-
-                # Check if the new package name is in the list of popular packages
-                if typo_project_name in corpus:
-                    return "common_typos", typo_project_name
+        # Loop through each common typo for the given character, if any
+        for t in _TYPO_MAP.get(character, ()):
+            # Build a new name, swapping character with the current typo character
+            typo_project_name = project_name[:idx] + t + project_name[idx + 1 :]
+
+            # Check if the new package name is in the list of popular packages
+            if typo_project_name in index.names:
+                return "common_typos", typo_project_name
 
     return None
 
@@ -408,7 +576,11 @@ def typo_check_name(project_name: str, corpus=None) -> TypoCheckMatch:
     """
     if corpus is None:
         # Fall back to the static list if not provided
-        corpus = _TOP_PROJECT_NAMES
+        index = _static_index(frozenset(_TOP_PROJECT_NAMES))
+    elif isinstance(corpus, TypoIndex):
+        index = corpus
+    else:
+        index = TypoIndex(corpus)
 
     # Run each check in order
     for check in (
@@ -418,6 +590,6 @@ def typo_check_name(project_name: str, corpus=None) -> TypoCheckMatch:
         _swapped_words,
         _common_typos,
     ):
-        if result := check(project_name, corpus=corpus):
+        if result := check(project_name, index=index):
             return result
     return None
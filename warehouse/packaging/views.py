@@ -12,6 +12,7 @@ from pypi_attestations import (
 )
 from pyramid.httpexceptions import HTTPMovedPermanently, HTTPNotFound
 from pyramid.view import view_config
+from sqlalchemy import or_, select
 from sqlalchemy.exc import NoResultFound
 
 from warehouse.accounts.models import User
@@ -22,6 +23,11 @@ from warehouse.packaging.forms import SubmitMalwareObservationForm
 from warehouse.packaging.models import Description, File, Project, Release, Role
 from warehouse.utils import wheel
 
+# The maximum number of queries that rendering the release detail page should
+# need, this must stay constant no matter how many files, versions, or
+# maintainers a project has.
+RELEASE_DETAIL_QUERY_BUDGET = 10
+
 
 class PEP740AttestationViewer:
 
@@ -152,8 +158,102 @@ class PEP740AttestationViewer:
         return self._format_url(self.source, self.source_reference)
 
 
+def _latest_version(all_versions):
+    # This mirrors the ordering used by Project.latest_version, but selects
+    # from the versions we've already loaded rather than querying again.
+    # all_versions is already ordered by _pypi_ordering, so the first match
+    # for the most preferred prerelease state is the one we want.
+    prerelease_order = {False: 0, True: 1, None: 2}
+    return min(
+        (v for v in all_versions if not v.yanked),
+        key=lambda v: prerelease_order[v.is_prerelease],
+        default=None,
+    )
+
+
+def _load_release_detail(release, request):
+    """
+    Load the data needed to render the detail page for a release, using a fixed
+    number of queries regardless of how many files or versions there are.
+    """
+    project = release.project
+
+    description_html = (
+        request.db.query(Description.html)
+        .filter(Description.id == release.description_id)
+        .one()
+        .html
+    )
+
+    # Get all of the maintainers for this project.
+    maintainers = [
+        r.user
+        for r in (
+            request.db.query(Role)
+            .join(User)
+            .filter(Role.project == project)
+            .distinct(User.username)
+            .order_by(User.username)
+            .all()
+        )
+    ]
+
+    # Fetch all of our files at once, and split them into sdists and bdists
+    # ourselves. We cannot easily sort naturally in SQL, so sort here too.
+    files = natsorted(
+        request.db.query(File).filter(File.release_id == release.id).all(),
+        reverse=True,
+        key=lambda f: f.filename,
+    )
+    sdists = [f for f in files if f.packagetype == "sdist"]
+    bdists = [f for f in files if f.packagetype != "sdist"]
+
+    # Determine which of our files were uploaded via a Trusted Publisher with a
+    # single query, instead of checking the events for each file individually.
+    trusted_publisher_files = set()
+    if files:
+        trusted_publisher_files = set(
+            request.db.scalars(
+                select(File.Event.source_id)
+                .where(
+                    File.Event.source_id.in_([f.id for f in files]),
+                    or_(
+                        File.Event.additional[
+                            "uploaded_via_trusted_publisher"
+                        ].as_boolean(),
+                        File.Event.additional["publisher_url"].as_string().is_not(None),
+                    ),
+                )
+                .distinct()
+            )
+        )
+
+    # Parse each of our wheel filenames once, and derive both the per file
+    # filters and the combined filters from them.
+    wheel_tags = {f.filename: wheel.filename_to_tags(f.filename) for f in bdists}
+    wheel_filters = {
+        filename: wheel.tags_to_filters(tags) for filename, tags in wheel_tags.items()
+    }
+    wheel_filters_all = wheel.tags_to_filters(set().union(*wheel_tags.values()))
+
+    all_versions = project.all_versions
+
+    return {
+        "description": description_html,
+        "maintainers": maintainers,
+        "sdists": sdists,
+        "bdists": bdists,
+        "trusted_publisher_files": trusted_publisher_files,
+        "all_versions": all_versions,
+        "latest_version": _latest_version(all_versions),
+        "wheel_filters": wheel_filters,
+        "wheel_filters_all": wheel_filters_all,
+    }
+
+
 @view_config(
     route_name="packaging.project",
+    read_only=True,
     context=Project,
     renderer="warehouse:templates/packaging/detail.html",
     decorator=[
@@ -187,6 +287,7 @@ def project_detail(project, request):
 
 @view_config(
     route_name="packaging.release",
+    read_only=True,
     context=Release,
     renderer="warehouse:templates/packaging/detail.html",
     decorator=[
@@ -215,26 +316,10 @@ def release_detail(release, request):
     if project.name != request.matchdict.get("name", project.name):
         return HTTPMovedPermanently(request.current_route_path(name=project.name))
 
-    # Grab the rendered description
-    description_html = (
-        request.db.query(Description.html)
-        .filter(Description.id == release.description_id)
-        .one()
-        .html
-    )
-
-    # Get all of the maintainers for this project.
-    maintainers = [
-        r.user
-        for r in (
-            request.db.query(Role)
-            .join(User)
-            .filter(Role.project == project)
-            .distinct(User.username)
-            .order_by(User.username)
-            .all()
-        )
-    ]
+    # Load everything about this release that we're going to display, this is
+    # done up front in a fixed number of queries, so that large releases with
+    # many files don't end up issuing queries per file.
+    detail = _load_release_detail(release, request)
 
     # Get the license from both the `Classifier` and `License` metadata fields
     license_classifiers = ", ".join(
@@ -255,21 +340,6 @@ def release_detail(release, request):
     else:
         license = license_classifiers or short_license or None
 
-    # We cannot easily sort naturally in SQL, sort here and pass to template
-    sdists = natsorted(
-        release.files.filter(File.packagetype == "sdist").all(),
-        reverse=True,
-        key=lambda f: f.filename,
-    )
-    bdists = natsorted(
-        release.files.filter(File.packagetype != "sdist").all(),
-        reverse=True,
-        key=lambda f: f.filename,
-    )
-
-    # Collect all the available bdist details to enable building filters.
-    wheel_filters_all = wheel.filenames_to_filters([bdist.filename for bdist in bdists])
-
     # Get the querystring to load any pre-set parameters
     wheel_filters_params = {
         "filename": request.params.get("filename", ""),
@@ -281,17 +351,19 @@ def release_detail(release, request):
     return {
         "project": project,
         "release": release,
-        "description": description_html,
-        "files": sdists + bdists,
-        "sdists": sdists,
-        "bdists": bdists,
-        "latest_version": project.latest_version,
-        "all_versions": project.all_versions,
-        "maintainers": maintainers,
+        "description": detail["description"],
+        "files": detail["sdists"] + detail["bdists"],
+        "sdists": detail["sdists"],
+        "bdists": detail["bdists"],
+        "trusted_publisher_files": detail["trusted_publisher_files"],
+        "latest_version": detail["latest_version"],
+        "all_versions": detail["all_versions"],
+        "maintainers": detail["maintainers"],
         "license": license,
         # Additional function to format the attestations
         "PEP740AttestationViewer": PEP740AttestationViewer,
-        "wheel_filters_all": wheel_filters_all,
+        "wheel_filters": detail["wheel_filters"],
+        "wheel_filters_all": detail["wheel_filters_all"],
         "wheel_filters_params": wheel_filters_params,
     }
 
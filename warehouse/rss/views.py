@@ -35,6 +35,7 @@ def _format_author(release):
 
 @view_config(
     route_name="rss.updates",
+    read_only=True,
     renderer="warehouse:templates/rss/updates.xml",
     decorator=[
         origin_cache(
@@ -62,6 +63,7 @@ def rss_updates(request):
 
 @view_config(
     route_name="rss.packages",
+    read_only=True,
     renderer="warehouse:templates/rss/packages.xml",
     decorator=[
         origin_cache(
@@ -91,6 +93,7 @@ def rss_packages(request):
 
 @view_config(
     route_name="rss.project.releases",
+    read_only=True,
     context=Project,
     renderer="warehouse:templates/rss/project_releases.xml",
     decorator=[
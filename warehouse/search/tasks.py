@@ -103,7 +103,7 @@ class SearchLock(Lock):
         )
 
 
-@tasks.task(bind=True, ignore_result=True, acks_late=True)
+@tasks.task(bind=True, ignore_result=True, acks_late=True, queue="bulk")
 def reindex(self, request):
     """
     Recreate the Search Index.
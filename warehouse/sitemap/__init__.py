@@ -1 +1,25 @@
 # SPDX-License-Identifier: Apache-2.0
+
+from celery.schedules import crontab
+
+
+def includeme(config):
+    # Our sitemaps are rendered ahead of time into storage, if we haven't
+    # configured anywhere to store them, then we'll fall back to rendering
+    # them from the database on each request.
+    sitemap_backend = config.registry.settings.get("sitemap.backend")
+    if not sitemap_backend:
+        return
+
+    # These are imported here, because warehouse.sitemap.models is imported by
+    # our account and packaging models.
+    from warehouse.sitemap.interfaces import ISitemapStorage
+    from warehouse.sitemap.tasks import generate_sitemaps
+
+    sitemap_storage_class = config.maybe_dotted(sitemap_backend)
+    config.register_service_factory(
+        sitemap_storage_class.create_service, ISitemapStorage
+    )
+
+    # Add a periodic task to rebuild any sitemap buckets that have changed
+    config.add_periodic_task(crontab(minute=30), generate_sitemaps)
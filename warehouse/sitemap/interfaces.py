@@ -0,0 +1,10 @@
+# SPDX-License-Identifier: Apache-2.0
+
+from warehouse.packaging.interfaces import IGenericFileStorage
+
+
+class ISitemapStorage(IGenericFileStorage):
+    def remove(path):
+        """
+        Remove the file at the given path, if there is one.
+        """
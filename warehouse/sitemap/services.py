@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import io
+import os
+
+import google.api_core.exceptions
+import google.api_core.retry
+
+from zope.interface import implementer
+
+from warehouse.packaging.services import (
+    GenericGCSBlobStorage,
+    GenericLocalBlobStorage,
+)
+from warehouse.sitemap.interfaces import ISitemapStorage
+
+
+@implementer(ISitemapStorage)
+class LocalSitemapStorage(GenericLocalBlobStorage):
+    @classmethod
+    def create_service(cls, context, request):
+        return cls(request.registry.settings["sitemap.path"])
+
+    def remove(self, path):
+        try:
+            os.remove(os.path.join(self.base, path))
+        except FileNotFoundError:
+            pass
+
+
+@implementer(ISitemapStorage)
+class GCSSitemapStorage(GenericGCSBlobStorage):
+    @classmethod
+    @google.api_core.retry.Retry(
+        predicate=google.api_core.retry.if_exception_type(
+            google.api_core.exceptions.ServiceUnavailable
+        )
+    )
+    def create_service(cls, context, request):
+        storage_client = request.find_service(name="gcloud.gcs")
+        bucket_name = request.registry.settings["sitemap.bucket"]
+        bucket = storage_client.get_bucket(bucket_name)
+        prefix = request.registry.settings.get("sitemap.prefix")
+
+        return cls(bucket, prefix=prefix)
+
+    def get(self, path: str):
+        # Unlike our other GCS storages, sitemaps are served by Warehouse
+        # itself rather than directly by our CDN, so we need to be able to
+        # read them back out of the bucket.
+        blob = self.bucket.blob(self._get_path(path))
+        try:
+            return io.BytesIO(blob.download_as_bytes())
+        except google.api_core.exceptions.NotFound:
+            raise FileNotFoundError(f"No such key: {path!r}") from None
+
+    @google.api_core.retry.Retry(
+        predicate=google.api_core.retry.if_exception_type(
+            google.api_core.exceptions.ServiceUnavailable
+        )
+    )
+    def store(self, path: str, file_path, *, meta=None):
+        # Sitemaps are regenerated in place, so unlike package files we always
+        # want to overwrite whatever already exists at this path.
+        blob = self.bucket.blob(self._get_path(path))
+        if meta is not None:
+            blob.metadata = meta
+        blob.upload_from_filename(file_path)
+
+    def remove(self, path: str):
+        try:
+            self.bucket.blob(self._get_path(path)).delete()
+        except google.api_core.exceptions.NotFound:
+            pass
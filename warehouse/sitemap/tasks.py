@@ -0,0 +1,104 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import logging
+import tempfile
+
+from pyramid.renderers import render
+
+from warehouse import tasks
+from warehouse.cache.origin.interfaces import IOriginCache
+from warehouse.metrics import IMetricsService
+from warehouse.sitemap.interfaces import ISitemapStorage
+from warehouse.sitemap.utils import sitemap_bucket_urls, sitemap_buckets
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_INDEX_PATH = "sitemap.xml"
+SITEMAP_MANIFEST_PATH = "sitemap.json"
+SITEMAP_CACHE_KEY = "sitemap"
+
+
+def sitemap_bucket_path(bucket):
+    return f"{bucket}.sitemap.xml"
+
+
+def _store(storage, path, content):
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(content)
+        f.flush()
+
+        storage.store(path, f.name)
+
+
+def _load_manifest(storage):
+    try:
+        return json.loads(storage.get(SITEMAP_MANIFEST_PATH).read())
+    except FileNotFoundError:
+        return {}
+
+
+@tasks.task(ignore_result=True, acks_late=True, queue="bulk")
+def generate_sitemaps(request):
+    """
+    Render our sitemap buckets and index into storage, rebuilding only those
+    buckets whose membership has changed since the last time we ran.
+    """
+    storage = request.find_service(ISitemapStorage)
+    metrics = request.find_service(IMetricsService, context=None)
+
+    previous = _load_manifest(storage)
+    buckets = sitemap_buckets(request.db)
+
+    changed = [
+        bucket
+        for name, (bucket, fingerprint) in buckets.items()
+        if previous.get(name) != fingerprint
+    ]
+
+    for bucket in changed:
+        content = render(
+            "warehouse:templates/sitemap/bucket.xml",
+            {"urls": sitemap_bucket_urls(request, bucket.name)},
+            request=request,
+        )
+        _store(storage, sitemap_bucket_path(bucket.name), content.encode("utf8"))
+
+    # Buckets which have emptied out are removed before the index and manifest
+    # stop listing them, so that if this fails part way through it will try to
+    # remove them again the next time around.
+    removed = sorted(previous.keys() - buckets.keys())
+    for name in removed:
+        storage.remove(sitemap_bucket_path(name))
+
+    metrics.gauge("warehouse.sitemap.buckets.total", len(buckets))
+    metrics.increment("warehouse.sitemap.buckets.rebuilt", len(changed))
+
+    # If nothing has been added, removed, or changed, then our existing index
+    # is still accurate and there is nothing left for us to do.
+    if not changed and buckets.keys() == previous.keys():
+        return
+
+    content = render(
+        "warehouse:templates/sitemap/index.xml",
+        {"buckets": [bucket for bucket, _ in buckets.values()]},
+        request=request,
+    )
+    _store(storage, SITEMAP_INDEX_PATH, content.encode("utf8"))
+    _store(
+        storage,
+        SITEMAP_MANIFEST_PATH,
+        json.dumps(
+            {name: fingerprint for name, (_, fingerprint) in buckets.items()},
+            sort_keys=True,
+        ).encode("utf8"),
+    )
+
+    logger.info("Rebuilt %d of %d sitemap buckets", len(changed), len(buckets))
+
+    try:
+        cacher = request.find_service(IOriginCache)
+    except LookupError:
+        pass
+    else:
+        cacher.purge([SITEMAP_CACHE_KEY])
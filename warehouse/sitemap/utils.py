@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import collections
+import datetime
+import hashlib
+import itertools
+
+from sqlalchemy import func, literal_column, or_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from warehouse.accounts.models import User
+from warehouse.packaging.models import Project
+
+AGE_BEFORE_INDEX = datetime.timedelta(days=14)
+SITEMAP_MAXSIZE = 50000
+
+
+Bucket = collections.namedtuple("Bucket", ["name", "modified"])
+
+
+class BucketTooSmallError(ValueError):
+    pass
+
+
+def _project_filter():
+    return Project.created < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX
+
+
+def _user_filter():
+    return or_(
+        User.date_joined < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX,
+        User.date_joined.is_(None),
+    )
+
+
+def _fingerprint(column):
+    # A digest over the (ordered) members of a bucket, this changes whenever
+    # something is added to, removed from, or renamed within a bucket, which
+    # lets us skip rebuilding buckets whose contents have not changed.
+    return func.md5(
+        func.string_agg(column, aggregate_order_by(literal_column("','"), column))
+    )
+
+
+def _merge_modified(modified, bucket, value):
+    current = modified.setdefault(bucket, value)
+    if current is None or (value is not None and value > current):
+        modified[bucket] = value
+
+
+def sitemap_index_buckets(db):
+    """
+    Return the sorted list of every sitemap bucket that currently has at least
+    one URL in it, without the cost of fingerprinting their members.
+    """
+    projects = (
+        db.query(Project.sitemap_bucket, func.max(Project.created).label("modified"))
+        .filter(_project_filter())
+        .group_by(Project.sitemap_bucket)
+        .all()
+    )
+    users = (
+        db.query(User.sitemap_bucket, func.max(User.date_joined).label("modified"))
+        .filter(_user_filter())
+        .group_by(User.sitemap_bucket)
+        .all()
+    )
+
+    modified: dict[str, datetime.datetime] = {}
+    for b in itertools.chain(projects, users):
+        _merge_modified(modified, b.sitemap_bucket, b.modified)
+
+    return [Bucket(name=name, modified=modified[name]) for name in sorted(modified)]
+
+
+def sitemap_buckets(db):
+    """
+    Return a mapping of bucket name to a ``(Bucket, fingerprint)`` tuple for
+    every sitemap bucket that currently has at least one URL in it.
+    """
+    projects = (
+        db.query(
+            Project.sitemap_bucket,
+            func.max(Project.created).label("modified"),
+            _fingerprint(Project.normalized_name).label("fingerprint"),
+        )
+        .filter(_project_filter())
+        .group_by(Project.sitemap_bucket)
+        .all()
+    )
+    users = (
+        db.query(
+            User.sitemap_bucket,
+            func.max(User.date_joined).label("modified"),
+            _fingerprint(User.username).label("fingerprint"),
+        )
+        .filter(_user_filter())
+        .group_by(User.sitemap_bucket)
+        .all()
+    )
+
+    modified: dict[str, datetime.datetime] = {}
+    fingerprints = {}
+    for kind, b in itertools.chain(
+        (("projects", p) for p in projects), (("users", u) for u in users)
+    ):
+        _merge_modified(modified, b.sitemap_bucket, b.modified)
+
+        hasher = fingerprints.setdefault(
+            b.sitemap_bucket, hashlib.sha256(usedforsecurity=False)
+        )
+        hasher.update(f"{kind}:{b.fingerprint};".encode("utf8"))
+
+    return {
+        name: (Bucket(name=name, modified=modified[name]), hasher.hexdigest())
+        for name, hasher in sorted(fingerprints.items())
+    }
+
+
+def sitemap_bucket_urls(request, bucket):
+    """
+    Return the sorted list of URLs that belong within the given bucket.
+    """
+    projects = (
+        request.db.query(Project.normalized_name)
+        .filter(_project_filter())
+        .filter(Project.sitemap_bucket == bucket)
+        .all()
+    )
+    users = (
+        request.db.query(User.username)
+        .filter(User.sitemap_bucket == bucket)
+        .filter(_user_filter())
+        .all()
+    )
+
+    urls = [
+        request.route_url("packaging.project", name=project.normalized_name)
+        for project in projects
+    ]
+    urls += [
+        request.route_url("accounts.profile", username=user.username) for user in users
+    ]
+
+    # If the length of our bucket name isn't enough to ensure that all of our
+    # buckets have less than our maximum number of URLs then we want to error
+    # out so that we can adjust our bucket size to spread the URLs out over
+    # more buckets.
+    if len(urls) > SITEMAP_MAXSIZE:
+        raise BucketTooSmallError(
+            f"Too many URLs in the sitemap for bucket: {bucket!r}."
+        )
+
+    return sorted(urls)
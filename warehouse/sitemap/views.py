@@ -1,30 +1,39 @@
 # SPDX-License-Identifier: Apache-2.0
 
-import collections
-import datetime
-import itertools
-
+from pyramid.response import Response
 from pyramid.view import view_config
-from sqlalchemy import func, or_
 
-from warehouse.accounts.models import User
 from warehouse.cache.http import cache_control
 from warehouse.cache.origin import origin_cache
-from warehouse.packaging.models import Project
-
-AGE_BEFORE_INDEX = datetime.timedelta(days=14)
-SITEMAP_MAXSIZE = 50000
+from warehouse.sitemap.interfaces import ISitemapStorage
+from warehouse.sitemap.tasks import (
+    SITEMAP_CACHE_KEY,
+    SITEMAP_INDEX_PATH,
+    sitemap_bucket_path,
+)
+from warehouse.sitemap.utils import sitemap_bucket_urls, sitemap_index_buckets
 
 
-Bucket = collections.namedtuple("Bucket", ["name", "modified"])
+def _stored_sitemap(request, path):
+    # Our sitemaps are periodically rendered into storage by the
+    # generate_sitemaps task, if they're available there then we'll serve them
+    # directly rather than rendering them from the database on each request.
+    try:
+        storage = request.find_service(ISitemapStorage)
+    except LookupError:
+        return None
 
+    try:
+        body = storage.get(path).read()
+    except FileNotFoundError:
+        return None
 
-class BucketTooSmallError(ValueError):
-    pass
+    return Response(body=body, content_type="text/xml", charset="utf-8")
 
 
 @view_config(
     route_name="index.sitemap.xml",
+    read_only=True,
     renderer="warehouse:templates/sitemap/index.xml",
     decorator=[
         cache_control(1 * 60 * 60),  # 1 hour
@@ -32,11 +41,15 @@ class BucketTooSmallError(ValueError):
             1 * 24 * 60 * 60,  # 1 day
             stale_while_revalidate=6 * 60 * 60,  # 6 hours
             stale_if_error=1 * 24 * 60 * 60,  # 1 day
-            keys=["all-projects"],
+            keys=[SITEMAP_CACHE_KEY],
         ),
     ],
 )
 def sitemap_index(request):
+    stored = _stored_sitemap(request, SITEMAP_INDEX_PATH)
+    if stored is not None:
+        return stored
+
     request.response.content_type = "text/xml"
 
     # We have > 50,000 URLs on PyPI and a single sitemap file can only support
@@ -54,43 +67,12 @@ def sitemap_index(request):
     # characters of the hash instead of just the first. Since the hash is a
     # property of the URL what bucket an URL goes into won't be influenced by
     # what other URLs exist in the system.
-    projects = (
-        request.db.query(
-            Project.sitemap_bucket, func.max(Project.created).label("modified")
-        )
-        .filter(
-            Project.created < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX
-        )
-        .group_by(Project.sitemap_bucket)
-        .all()
-    )
-    users = (
-        request.db.query(
-            User.sitemap_bucket, func.max(User.date_joined).label("modified")
-        )
-        .filter(
-            or_(
-                User.date_joined
-                < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX,
-                User.date_joined.is_(None),
-            )
-        )
-        .group_by(User.sitemap_bucket)
-        .all()
-    )
-    buckets: dict[str, datetime.datetime] = {}
-    for b in itertools.chain(projects, users):
-        current = buckets.setdefault(b.sitemap_bucket, b.modified)
-        if current is None or (b.modified is not None and b.modified > current):
-            buckets[b.sitemap_bucket] = b.modified
-    bucket_list = [Bucket(name=k, modified=v) for k, v in buckets.items()]
-    bucket_list.sort(key=lambda x: x.name)
-
-    return {"buckets": bucket_list}
+    return {"buckets": sitemap_index_buckets(request.db)}
 
 
 @view_config(
     route_name="bucket.sitemap.xml",
+    read_only=True,
     renderer="warehouse:templates/sitemap/bucket.xml",
     decorator=[
         cache_control(1 * 60 * 60),  # 1 hour
@@ -98,53 +80,20 @@ def sitemap_index(request):
             1 * 24 * 60 * 60,  # 1 day
             stale_while_revalidate=6 * 60 * 60,  # 6 hours
             stale_if_error=1 * 24 * 60 * 60,  # 1 day
-            keys=["all-projects"],
+            keys=[SITEMAP_CACHE_KEY],
         ),
     ],
 )
 def sitemap_bucket(request):
-    request.response.content_type = "text/xml"
-
     bucket = request.matchdict["bucket"]
 
-    projects = (
-        request.db.query(Project.normalized_name)
-        .filter(
-            Project.created < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX
-        )
-        .filter(Project.sitemap_bucket == bucket)
-        .all()
-    )
-    users = (
-        request.db.query(User.username)
-        .filter(User.sitemap_bucket == bucket)
-        .filter(
-            or_(
-                User.date_joined
-                < datetime.datetime.now(datetime.UTC) - AGE_BEFORE_INDEX,
-                User.date_joined.is_(None),
-            )
-        )
-        .all()
-    )
+    # Our buckets are always a prefix of a hex digest, so anything else can't
+    # possibly have been stored.
+    if bucket.isalnum():
+        stored = _stored_sitemap(request, sitemap_bucket_path(bucket))
+        if stored is not None:
+            return stored
 
-    urls = [
-        request.route_url("packaging.project", name=project.normalized_name)
-        for project in projects
-    ]
-    urls += [
-        request.route_url("accounts.profile", username=user.username) for user in users
-    ]
-
-    # If the length of our bucket name isn't enough to ensure that all of our
-    # buckets have less than our maximum number of URLs then we want to error
-    # out so that we can adjust our bucket size to spread the URLs out over
-    # more buckets.
-    if len(urls) > SITEMAP_MAXSIZE:
-        raise BucketTooSmallError(
-            "Too many URLs in the sitemap for bucket: {!r}.".format(
-                request.matchdict["bucket"]
-            )
-        )
+    request.response.content_type = "text/xml"
 
-    return {"urls": sorted(urls)}
+    return {"urls": sitemap_bucket_urls(request, bucket)}
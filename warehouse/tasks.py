@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import functools
 import hashlib
+import json
 import logging
 import time
 import typing
@@ -17,8 +18,9 @@ import pyramid_retry
 import transaction
 import venusian
 
+from celery.schedules import crontab
 from kombu import Queue
-from pyramid.threadlocal import get_current_request
+from pyramid.threadlocal import RequestContext, get_current_request
 
 from warehouse.config import Environment
 from warehouse.metrics import IMetricsService
@@ -35,6 +37,16 @@ celery.app.backends.BACKEND_ALIASES["rediss"] = (
 
 logger = logging.getLogger(__name__)
 
+# The queues that our tasks can be routed to, in the order that a worker which
+# consumes from more than one of them will prefer them in.
+#
+#   critical: Short tasks that something user facing is waiting on, such as
+#             getting an uploaded file into our cache or purging the CDN.
+#   default:  Everything else.
+#   email:    Sending email.
+#   bulk:     Long running or batch jobs, which can wait.
+QUEUES = ["critical", "default", "email", "bulk"]
+
 
 class TLSRedisBackend(celery.backends.redis.RedisBackend):
     def _params_from_url(self, url, defaults):
@@ -52,6 +64,10 @@ class WarehouseTask(celery.Task):
     __header__: typing.Callable
     _wh_original_run: typing.Callable
 
+    # Tasks which don't use the database can say so with `uses_db=False`, which
+    # guarantees that they never check out a database connection.
+    uses_db: bool = True
+
     def __new__(cls, *args, **kwargs) -> WarehouseTask:
         """
         Override to wrap the `run` method of the task with a new method that
@@ -71,6 +87,16 @@ class WarehouseTask(celery.Task):
             metrics = request.find_service(IMetricsService, context=None)
             metric_tags = [f"task:{obj.name}"]
 
+            # Tasks that we sent are stamped with the time that they were due to
+            # run at, which lets us measure how long they waited in their queue.
+            if (due_at := getattr(obj.request, "warehouse_due_at", None)) is not None:
+                queue = getattr(obj, "queue", None) or "default"
+                metrics.timing(
+                    "warehouse.task.queue_wait",
+                    max(time.time() - due_at, 0) * 1000,
+                    tags=metric_tags + [f"queue:{queue}"],
+                )
+
             with request.tm, metrics.timed("warehouse.task.run", tags=metric_tags):
                 metrics.increment("warehouse.task.start", tags=metric_tags)
                 try:
@@ -105,8 +131,8 @@ class WarehouseTask(celery.Task):
         Get a request object to use for this task.
 
         This will either return the request object that was injected into the
-        task when it was called, or it will create a new request object to use
-        for the task.
+        task when it was called, or it will take a request object for the task
+        to use from this worker's pool of them.
 
         Note: The `type: ignore` comments are necessary because the `pyramid_env`
         attribute is not defined on the request object, but we're adding it
@@ -114,13 +140,7 @@ class WarehouseTask(celery.Task):
         """
         if not hasattr(self.request, "pyramid_env"):
             registry = self.app.pyramid_config.registry  # type: ignore[attr-defined]
-            env = pyramid.scripting.prepare(registry=registry)
-            env["request"].tm = transaction.TransactionManager(explicit=True)
-            env["request"].timings = {"new_request_start": time.time() * 1000}
-            env["request"].remote_addr = "127.0.0.1"
-            env["request"].remote_addr_hashed = hashlib.sha256(
-                ("127.0.0.1" + registry.settings["warehouse.ip_salt"]).encode("utf8")
-            ).hexdigest()
+            env = registry["celery.request_pool"].acquire(uses_db=self.uses_db)
             self.request.update(pyramid_env=env)
 
         return self.request.pyramid_env["request"]  # type: ignore[attr-defined]
@@ -137,9 +157,9 @@ class WarehouseTask(celery.Task):
 
     def apply_async(self, *args, **kwargs):
         """
-        Override the apply_async method to add an after commit hook to the
-        transaction manager to send the task after the transaction has been
-        committed.
+        Override the apply_async method to hold the task back until the
+        transaction has been committed, and then send it along with every other
+        task sent during the same transaction.
 
         This is necessary because we want to ensure that the task is only sent
         after the transaction has been committed. This is important because we
@@ -153,15 +173,13 @@ class WarehouseTask(celery.Task):
         # If for whatever reason we were unable to get a request we'll just
         # skip this and call the original method to send this immediately.
         if request is None or not hasattr(request, "tm"):
-            return super().apply_async(*args, **kwargs)
+            return self._send(*args, **kwargs)
 
         # This will break things that expect to get an AsyncResult because
         # we're no longer going to be returning an async result from this when
         # called from within a request, response cycle. Ideally we shouldn't be
         # waiting for responses in a request/response cycle anyways though.
-        request.tm.get().addAfterCommitHook(
-            self._after_commit_hook, args=args, kws=kwargs
-        )
+        PendingTasks.for_request(request).add(self, args, kwargs)
 
     def retry(self, *args, **kwargs):
         """
@@ -175,13 +193,155 @@ class WarehouseTask(celery.Task):
         metrics.increment("warehouse.task.retried", tags=[f"task:{self.name}"])
         return super().retry(*args, **kwargs)
 
-    def _after_commit_hook(self, success, *args, **kwargs):
+    def _send(self, *args, **kwargs):
+        """
+        Actually send the task, stamped with the time that it is due to run at.
+        """
+        due_at = time.time()
+        if (eta := kwargs.get("eta")) is not None:
+            due_at = eta.timestamp()
+        elif (countdown := kwargs.get("countdown")) is not None:
+            due_at += countdown
+        kwargs["headers"] = {
+            **(kwargs.get("headers") or {}),
+            "warehouse_due_at": due_at,
+        }
+
+        return super().apply_async(*args, **kwargs)
+
+
+class _NoDatabase:
+    """
+    Stands in for the database session of a task which doesn't use one.
+    """
+
+    def __getattr__(self, name):
+        raise RuntimeError("This task was declared with uses_db=False")
+
+
+class TaskRequestPool:
+    """
+    The requests that our tasks are run with, which are reset and reused from
+    one task to the next rather than building a new one for every task.
+
+    Building a request applies every request extension that we've registered,
+    which adds up across the many tasks that are over in a few milliseconds.
+    Everything that is expensive to set up on a request, such as the database
+    session and services, is created lazily on first use, and thrown away when
+    the request is reset.
+
+    Each worker process has its own pool, which usually holds a single request
+    as a worker process only runs one task at a time.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._idle: list[tuple[Request, dict, dict]] = []
+
+    def _create(self) -> tuple[Request, dict, dict]:
+        env = pyramid.scripting.prepare(registry=self.registry)
+        # Preparing the request also makes it the current request, which we do
+        # ourselves each time that it is acquired instead.
+        env["closer"]()
+
+        request = env["request"]
+        request.remote_addr = "127.0.0.1"
+        request.remote_addr_hashed = hashlib.sha256(
+            ("127.0.0.1" + self.registry.settings["warehouse.ip_salt"]).encode("utf8")
+        ).hexdigest()
+
+        return request, dict(request.__dict__), dict(request.environ)
+
+    def acquire(self, *, uses_db: bool = True) -> dict:
         """
-        This is the hook that gets called after the transaction has been
-        committed. We'll only send the task if the transaction was successful.
+        Take a request from the pool, or create a new one if they are all in use,
+        returning a dictionary with the `request` and a `closer` which returns
+        the request to the pool once the task is done with it.
         """
-        if success:
-            super().apply_async(*args, **kwargs)
+        try:
+            request, attributes, environ = self._idle.pop()
+        except IndexError:
+            request, attributes, environ = self._create()
+
+        request.tm = transaction.TransactionManager(explicit=True)
+        request.timings = {"new_request_start": time.time() * 1000}
+        if not uses_db:
+            request.db = _NoDatabase()
+
+        context = RequestContext(request)
+        context.begin()
+
+        def closer():
+            request._process_finished_callbacks()
+            context.end()
+
+            # Throw away everything that was set or cached on the request while
+            # it was in use, including anything that was lazily created.
+            request.__dict__.clear()
+            request.__dict__.update(attributes, environ=dict(environ))
+            self._idle.append((request, attributes, environ))
+
+        return {"request": request, "closer": closer}
+
+
+class PendingTasks:
+    """
+    The tasks that have been sent during a transaction, which are held back
+    until the transaction has been committed and then sent all together, over a
+    single connection to our broker.
+
+    Sending the same task with the same arguments more than once during a
+    transaction, such as purging the same key or reindexing the same project,
+    only sends it once.
+    """
+
+    def __init__(self, metrics: IMetricsService):
+        self.metrics = metrics
+        self.tasks: dict[str, tuple[WarehouseTask, tuple, dict]] = {}
+        self.coalesced = 0
+
+    @classmethod
+    def for_request(cls, request: Request) -> PendingTasks:
+        """
+        Get the pending tasks for the current transaction of the given request,
+        creating them if this is the first task sent during that transaction.
+        """
+        txn = request.tm.get()
+        try:
+            pending = txn.data(cls)
+        except KeyError:
+            pending = cls(request.find_service(IMetricsService, context=None))
+            txn.set_data(cls, pending)
+            txn.addAfterCommitHook(pending.send)
+        return pending
+
+    def add(self, task: WarehouseTask, args: tuple, kwargs: dict) -> None:
+        key = json.dumps([task.name, args, kwargs], sort_keys=True, default=repr)
+        if key in self.tasks:
+            self.coalesced += 1
+        else:
+            self.tasks[key] = (task, args, kwargs)
+
+    def send(self, success: bool) -> None:
+        """
+        Send every pending task, if the transaction was committed successfully.
+        """
+        if not success or not self.tasks:
+            return
+
+        celery_app = next(iter(self.tasks.values()))[0].app
+        with celery_app.producer_or_acquire() as producer:
+            for task, args, kwargs in self.tasks.values():
+                # One task failing to send shouldn't stop the rest from being
+                # sent, just as it wouldn't if they were sent individually.
+                try:
+                    task._send(*args, **{"producer": producer, **kwargs})
+                except Exception:
+                    logger.exception("Error sending task %s", task.name)
+
+        self.metrics.histogram("warehouse.task.send.batch_size", len(self.tasks))
+        if self.coalesced:
+            self.metrics.increment("warehouse.task.send.coalesced", self.coalesced)
 
 
 def task(**kwargs):
@@ -202,14 +362,24 @@ def task(**kwargs):
     configuration scanner. This is important because we use this category to
     find all the tasks that have been defined in the configuration.
 
+    Tasks are routed to the `default` queue unless another one of our `QUEUES`
+    is given with `queue`, and can be given a `priority` within their queue.
+    With Redis as our broker, a lower `priority` is consumed first, and tasks
+    without one are treated as the highest priority (0).
+
+    Tasks which never touch the database can be declared with `uses_db=False`,
+    which makes any attempt to use `request.db` within them an error.
+
     Example usage:
     ```
-    @tasks.task(...)
+    @tasks.task(..., queue="bulk")
     def my_task(self, *args, **kwargs):
         pass
     ```
     """
     kwargs.setdefault("shared", False)
+    if kwargs.get("queue", "default") not in QUEUES:
+        raise ValueError(f"Unknown task queue: {kwargs['queue']!r}")
 
     def deco(wrapped):
         def callback(scanner, name, wrapped):
@@ -223,6 +393,21 @@ def task(**kwargs):
     return deco
 
 
+@task(ignore_result=True, acks_late=True, uses_db=False)
+def report_queue_depths(request):
+    """
+    Report how many tasks are waiting in each of our queues.
+    """
+    metrics = request.find_service(IMetricsService, context=None)
+    with request.registry["celery.app"].connection_for_read() as conn:
+        for queue in QUEUES:
+            metrics.gauge(
+                "warehouse.task.queue_depth",
+                conn.default_channel.queue_declare(queue=queue).message_count,
+                tags=[f"queue:{queue}"],
+            )
+
+
 def _get_task(celery_app, task_func):
     task_name = celery_app.gen_task_name(task_func.__name__, task_func.__module__)
     return celery_app.tasks[task_name]
@@ -254,7 +439,11 @@ def _add_periodic_task(config, schedule, func, args=(), kwargs=(), name=None, **
 def includeme(config):
     s = config.registry.settings
 
-    broker_transport_options: dict[str, str | dict] = {}
+    # Workers that consume from several queues should always take tasks from the
+    # first of them that has any, rather than taking turns between them.
+    broker_transport_options: dict[str, str | dict] = {
+        "queue_order_strategy": "priority"
+    }
 
     broker_url = s["celery.broker_redis_url"]
 
@@ -294,7 +483,10 @@ def includeme(config):
         task_default_queue="default",
         task_default_routing_key="task.default",
         task_queue_ha_policy="all",
-        task_queues=(Queue("default", routing_key="task.#"),),
+        task_queues=tuple(
+            Queue(name, routing_key="task.#" if name == "default" else f"task.{name}")
+            for name in QUEUES
+        ),
         task_routes={},
         task_serializer="json",
         worker_disable_rate_limits=True,
@@ -304,6 +496,7 @@ def includeme(config):
     )
     config.registry["celery.app"].Task = WarehouseTask
     config.registry["celery.app"].pyramid_config = config
+    config.registry["celery.request_pool"] = TaskRequestPool(config.registry)
 
     config.action(("celery", "finalize"), config.registry["celery.app"].finalize)
 
@@ -311,3 +504,6 @@ def includeme(config):
     config.add_directive("make_celery_app", _get_celery_app, action_wrap=False)
     config.add_directive("task", _get_task_from_config, action_wrap=False)
     config.add_request_method(_get_task_from_request, name="task", reify=True)
+
+    # Keep track of how backed up each of our queues are
+    config.add_periodic_task(crontab(minute="*"), report_queue_depths)
@@ -1,16 +1,120 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import base64
+import collections
+import functools
 import hashlib
+import struct
+import threading
+import zlib
 
 from collections.abc import Sequence
 
-ENCODINGS = ["identity", "gzip"]
+import brotli
+import zstandard
+
+# When a client accepts several of these equally, the first is used.
+ENCODINGS = ["identity", "zstd", "br", "gzip"]
 DEFAULT_ENCODING = "identity"
 BUFFER_MAX = 1 * 1024 * 1024  # We'll buffer up to 1MB
 
+# The compression level used for each encoding, unless overridden by the
+# compression.<encoding>_level settings.
+DEFAULT_LEVELS = {"gzip": 9, "br": 5, "zstd": 6}
+
+# Bodies at least this large have their compressed variants kept, up to a total
+# size, so that identical bodies are only compressed once per process.
+CACHE_MIN_LENGTH = 8 * 1024
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff"
+
+
+def _gzip_app_iter(app_iter, level):
+    # This is webob.response.gzip_app_iter, but with a configurable level.
+    size = 0
+    crc = zlib.crc32(b"") & 0xFFFFFFFF
+    compress = zlib.compressobj(
+        level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0
+    )
+
+    yield _GZIP_HEADER
+    for item in app_iter:
+        size += len(item)
+        crc = zlib.crc32(item, crc) & 0xFFFFFFFF
+        if result := compress.compress(item):
+            yield result
+    if result := compress.flush():
+        yield result
+    yield struct.pack("<2L", crc, size & 0xFFFFFFFF)
+
+
+def _compressed_app_iter(app_iter, encoding, level):
+    match encoding:
+        case "gzip":
+            yield from _gzip_app_iter(app_iter, level)
+            return
+        case "br":
+            compressor = brotli.Compressor(quality=level)
+            compress, flush = compressor.process, compressor.finish
+        case "zstd":
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            compress, flush = compressor.compress, compressor.flush
+
+    for item in app_iter:
+        if result := compress(item):
+            yield result
+    if result := flush():
+        yield result
+
+
+class _CompressedCache:
+    """
+    A size bounded, least recently used, cache of the compressed variants of
+    response bodies, keyed by a hash of the uncompressed body.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, body):
+        with self._lock:
+            if key in self._entries or len(body) > self.max_bytes:
+                return
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def encoded_etag(etag, encoding):
+    """
+    Derive the ETag of a response compressed with the given encoding from the
+    ETag it had before it was compressed.
+    """
+    # We don't just append the encoding to this because we don't want people to
+    # try and use it to infer any information about it.
+    md5_digest = hashlib.md5(
+        (etag + f";{encoding}").encode("utf8"), usedforsecurity=False
+    )
+    md5_digest = md5_digest.digest()
+    md5_digest = base64.b64encode(md5_digest)
+    md5_digest = md5_digest.replace(b"\n", b"").decode("utf8")
+    return md5_digest.strip("=")
+
 
-def _compressor(request, response):
+def _compressor(request, response, *, levels=DEFAULT_LEVELS, cache=None):
     # Skip items with a Vary: Cookie/Authorization Header because we don't know
     # if they are safe from the CRIME attack.
     if response.vary is not None and (set(response.vary) & {"Cookie", "Authorization"}):
@@ -29,6 +133,9 @@ def _compressor(request, response):
     target_encoding = request.accept_encoding.best_match(
         ENCODINGS, default_match=DEFAULT_ENCODING
     )
+    if target_encoding == "identity":
+        return
+    level = levels[target_encoding]
 
     # If we have a Sequence, we'll assume that we aren't streaming the
     # response because it's probably a list or similar.
@@ -45,41 +152,59 @@ def _compressor(request, response):
         streaming = False
 
     if streaming:
-        response.encode_content(encoding=target_encoding, lazy=True)
+        response.app_iter = _compressed_app_iter(
+            response.app_iter, target_encoding, level
+        )
+        response.content_encoding = target_encoding
 
         # We need to remove the content_length from this response, since
         # we no longer know what the length of the content will be.
         response.content_length = None
 
         # If this has a streaming response, then we need to adjust the ETag
-        # header, if it has one, so that it reflects this. We don't just append
-        # ;gzip to this because we don't want people to try and use it to infer
-        # any information about it.
+        # header, if it has one, so that it reflects this.
         if response.etag is not None:
-            md5_digest = hashlib.md5(
-                (response.etag + ";gzip").encode("utf8"), usedforsecurity=False
-            )
-            md5_digest = md5_digest.digest()
-            md5_digest = base64.b64encode(md5_digest)
-            md5_digest = md5_digest.replace(b"\n", b"").decode("utf8")
-            response.etag = md5_digest.strip("=")
+            response.etag = encoded_etag(response.etag, target_encoding)
     else:
-        original_length = len(response.body)
-        response.encode_content(encoding=target_encoding, lazy=False)
+        body = response.body
+
+        key = compressed = None
+        if cache is not None and len(body) >= CACHE_MIN_LENGTH:
+            key = (hashlib.blake2b(body).digest(), target_encoding, level)
+            compressed = cache.get(key)
+
+        # A cached body is only ever one that was worth compressing.
+        if compressed is None:
+            compressed = b"".join(_compressed_app_iter([body], target_encoding, level))
 
-        # If the original length is less than our new, compressed length
-        # then we'll go back to the original. There is no reason to encode
-        # the content if it increases the length of the body.
-        if original_length < len(response.body):
-            response.decode_content()
+            # If the original length is less than our new, compressed length
+            # then we'll keep the original. There is no reason to encode the
+            # content if it increases the length of the body.
+            if len(body) < len(compressed):
+                return
 
-        # If we've added an encoding to the content, then we'll want to
-        # recompute the ETag.
-        if response.content_encoding is not None:
-            response.md5_etag()
+            if key is not None:
+                cache.set(key, compressed)
+
+        response.body = compressed
+        response.content_encoding = target_encoding
+
+        # We've added an encoding to the content, so we'll want to adjust the
+        # ETag. The conditional HTTP tween has already given every response that
+        # can be conditional one, so we derive ours from that rather than hashing
+        # the compressed body all over again.
+        if response.etag is not None:
+            response.etag = encoded_etag(response.etag, target_encoding)
 
 
 def compression_tween_factory(handler, registry):
+    settings = registry.settings
+    levels = {
+        encoding: settings.get(f"compression.{encoding}_level", level)
+        for encoding, level in DEFAULT_LEVELS.items()
+    }
+    compressor = functools.partial(_compressor, levels=levels, cache=_CompressedCache())
+
     def compression_tween(request):
         response = handler(request)
 
@@ -87,7 +212,7 @@ def compression_tween_factory(handler, registry):
         # other response callbacks are called. This is important because
         # otherwise we won't be able to check Vary headers and such that are
         # set by response callbacks.
-        request.add_response_callback(_compressor)
+        request.add_response_callback(compressor)
 
         return response
 
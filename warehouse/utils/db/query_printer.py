@@ -1,11 +1,18 @@
 # SPDX-License-Identifier: Apache-2.0
 
-"""Logs the query with the parameters embedded into the query."""
+"""Logs the query with the parameters embedded into the query, or without any."""
 
 import logging
+import re
 
 from sqlalchemy.dialects import postgresql
 
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_EXPANDED_PARAMETERS = re.compile(
+    r"IN \(%\((\w+)_\d+\)s(::\w+|)(?:, %\(\1_\d+\)s\2)*\)"
+)
+_WHITESPACE = re.compile(r"\s+")
+
 
 def print_query(query) -> None:
     """
@@ -21,3 +28,16 @@ def print_query(query) -> None:
             )
         )
     )
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalizes a statement, as it was sent to the database, so that every execution
+    of the same query has the same fingerprint no matter what it was executed with.
+
+    Useful for grouping the statements that we've executed.
+    """
+    statement = _LITERALS.sub("?", statement)
+    # Expanding IN parameters get one parameter per value.
+    statement = _EXPANDED_PARAMETERS.sub(r"IN (%(\1)s\2, ...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
@@ -1,33 +1,123 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import collections
+
 from celery.schedules import crontab
-from sqlalchemy import BigInteger, func, sql
+from sqlalchemy import BigInteger, SmallInteger, func, sql
 from sqlalchemy.orm import Mapped, mapped_column
 
 from warehouse import db, tasks
-from warehouse.accounts.models import User
-from warehouse.packaging.models import File, Project, Release
-
-COUNTED_TABLES = [User, Project, Release, File]
 
 
 class RowCount(db.Model):
     __tablename__ = "row_counts"
 
     table_name: Mapped[str] = mapped_column(unique=True)
+    # Set by the previous version of compute_row_counts, only used until our own
+    # count has been taken.
     count: Mapped[int] = mapped_column(BigInteger, server_default=sql.text("0"))
+    # The number of rows in the table, excluding any ``RowCountDelta`` that has
+    # not been folded into it yet, or None if the table hasn't been counted yet.
+    folded_count: Mapped[int | None] = mapped_column(BigInteger)
+
+
+class RowCountDelta(db.ModelBase):
+    """
+    The change in the number of rows in a counted table since its ``RowCount``
+    was last folded, kept up to date by statement level triggers on each of
+    the counted tables. The change is spread across a fixed number of shards,
+    keyed on the database backend, so that concurrent writes to the same table
+    don't all contend over a single row.
+    """
+
+    __tablename__ = "row_count_deltas"
+
+    table_name: Mapped[str] = mapped_column(primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    delta: Mapped[int] = mapped_column(BigInteger, server_default=sql.text("0"))
+
+
+def get_row_counts(db, tables):
+    """
+    Return a mapping of table name to the exact number of rows in each of the
+    given tables, including any changes that haven't been folded yet.
+    """
+    pending = (
+        sql.select(func.coalesce(func.sum(RowCountDelta.delta), 0))
+        .where(RowCountDelta.table_name == RowCount.table_name)
+        .scalar_subquery()
+    )
+    return dict(
+        db.query(
+            RowCount.table_name,
+            func.coalesce(RowCount.folded_count + pending, RowCount.count),
+        )
+        .filter(RowCount.table_name.in_([table.__tablename__ for table in tables]))
+        .all()
+    )
 
 
 @tasks.task(ignore_result=True, acks_late=True)
 def compute_row_counts(request):
-    for table in COUNTED_TABLES:
+    """
+    Fold the changes recorded by our triggers into our row counts, counting any
+    table that hasn't been counted yet.
+    """
+    # This is a single statement, so the count of the table and the deltas that
+    # it already includes are taken from the same snapshot, and the deltas are
+    # left for the fold below. Only tables that have been counted are folded, so
+    # nothing can clear those deltas before this commits.
+    for table_name in request.db.scalars(
+        sql.select(RowCount.table_name).where(
+            RowCount.folded_count.is_(None),
+            RowCount.table_name.in_(sql.select(RowCountDelta.table_name)),
+        )
+    ).all():
+        pending = (
+            sql.select(func.coalesce(func.sum(RowCountDelta.delta), 0))
+            .where(RowCountDelta.table_name == table_name)
+            .scalar_subquery()
+        )
+        request.db.execute(
+            sql.update(RowCount)
+            .where(RowCount.table_name == table_name, RowCount.folded_count.is_(None))
+            .values(
+                folded_count=sql.select(func.count())
+                .select_from(sql.table(table_name))
+                .scalar_subquery()
+                - pending
+            )
+        )
+
+    # A shard is locked by every transaction that writes to its table, until it
+    # commits, so we skip any that are locked rather than wait on them (and risk
+    # deadlocking with them), leaving their changes for the next fold. The ones
+    # we do lock are locked in a consistent order, and can't change under us.
+    deltas = request.db.execute(
+        sql.select(RowCountDelta.table_name, RowCountDelta.shard, RowCountDelta.delta)
+        .join(RowCount, RowCount.table_name == RowCountDelta.table_name)
+        .where(RowCountDelta.delta != 0, RowCount.folded_count.is_not(None))
+        .order_by(RowCountDelta.table_name, RowCountDelta.shard)
+        .with_for_update(skip_locked=True, of=RowCountDelta)
+    ).all()
+
+    totals = collections.Counter()
+    for table_name, shard, delta in deltas:
+        request.db.execute(
+            sql.update(RowCountDelta)
+            .where(RowCountDelta.table_name == table_name, RowCountDelta.shard == shard)
+            .values(delta=0)
+        )
+        totals[table_name] += delta
+
+    for table_name, delta in totals.items():
         request.db.execute(
             sql.update(RowCount)
-            .where(RowCount.table_name == table.__tablename__)
-            .values(count=sql.select(func.count()).select_from(table).scalar_subquery())
+            .where(RowCount.table_name == table_name)
+            .values(folded_count=RowCount.folded_count + delta)
         )
 
 
 def includeme(config):
-    # Setup our Row Counts to be maintained on a 5 minute interval
+    # Fold our Row Count changes on a 5 minute interval
     config.add_periodic_task(crontab(minute="*/5"), compute_row_counts)
@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+
+import jinja2
+
+from jinja2.bccache import FileSystemBytecodeCache
+from pyramid.path import AssetResolver
+from pyramid.threadlocal import get_current_request
+from pyramid_jinja2 import (
+    ENV_CONFIG_PHASE,
+    PARENT_RELATIVE_DELIM,
+    IJinja2Environment,
+)
+
+from warehouse.metrics import IMetricsService
+
+# The packages whose templates/ directories hold all of our templates, these are
+# referred to by asset spec (e.g. ``warehouse:templates/index.html``).
+TEMPLATE_PACKAGES = ["warehouse", "warehouse.admin"]
+
+
+def _metrics():
+    request = get_current_request()
+    if request is not None:
+        return request.find_service(IMetricsService, context=None)
+
+
+def _template_name(name):
+    # Templates that are included (or extended) relative to another template
+    # have the name of that template appended to their own, we don't want that.
+    return name.split(PARENT_RELATIVE_DELIM)[0]
+
+
+class MeteredBytecodeCache(FileSystemBytecodeCache):
+    """
+    A bytecode cache, shared on disk by every process, that records how often a
+    template was missing from it and so had to be compiled.
+    """
+
+    def get_bucket(self, environment, name, filename, source):
+        bucket = super().get_bucket(environment, name, filename, source)
+        if bucket.code is None and (metrics := _metrics()) is not None:
+            metrics.increment(
+                "warehouse.template.compiled", tags=[f"template:{_template_name(name)}"]
+            )
+        return bucket
+
+
+class MeteredTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        metrics = _metrics()
+        if metrics is None:
+            return super().render(*args, **kwargs)
+
+        with metrics.timed(
+            "warehouse.template.render", tags=[f"template:{_template_name(self.name)}"]
+        ):
+            return super().render(*args, **kwargs)
+
+
+def compile_templates(registry):
+    """
+    Load every one of our templates into the Jinja environment that renders it,
+    compiling (and caching the bytecode for) any that aren't already cached.
+
+    Returns the number of templates that were loaded.
+    """
+    environments = dict(registry.getUtilitiesFor(IJinja2Environment))
+    resolver = AssetResolver()
+
+    loaded = 0
+    for package in TEMPLATE_PACKAGES:
+        directory = resolver.resolve(f"{package}:templates").abspath()
+        for root, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                env = environments.get(os.path.splitext(filename)[1])
+                if env is None:
+                    continue
+                path = os.path.relpath(os.path.join(root, filename), directory)
+                env.get_template(f"{package}:templates/{path}")
+                loaded += 1
+    return loaded
+
+
+def includeme(config):
+    # Cache the compiled bytecode of our templates on disk, so that it can be
+    # shared between processes and survive them being restarted.
+    directory = config.registry.settings.get("jinja2.bytecode_caching_directory")
+    if directory is not None:
+        os.makedirs(directory, exist_ok=True)
+    config.add_settings({"jinja2.bytecode_caching": MeteredBytecodeCache(directory)})
+
+    # Once our environments have been created, time how long rendering with
+    # each of our templates takes.
+    def set_template_class():
+        for _, env in config.registry.getUtilitiesFor(IJinja2Environment):
+            env.template_class = MeteredTemplate
+
+    config.action(None, set_template_class, order=ENV_CONFIG_PHASE + 1)
@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: Apache-2.0
 
+import functools
 import re
 
 import packaging.tags
@@ -70,20 +71,33 @@ def _format_version(s: str) -> str:
     return f"{s[0]}.{s[1:]}"
 
 
-def filename_to_tags(filename: str) -> set[packaging.tags.Tag]:
+# The file names of a release never change, but are parsed every time a release
+# is rendered, so we keep a bounded cache of the results of parsing them. This
+# is large enough to hold every file for even the largest releases.
+_CACHE_SIZE = 16384
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def filename_to_tags(filename: str) -> frozenset[packaging.tags.Tag]:
     """Parse a wheel file name to extract the tags."""
     try:
         _, _, _, tags = packaging.utils.parse_wheel_filename(filename)
-        return set(tags)
+        return frozenset(tags)
     except packaging.utils.InvalidWheelFilename:
-        return set()
+        return frozenset()
 
 
 def filename_to_pretty_tags(filename: str) -> list[str]:
+    # Return a new list each time, so that callers can't mutate our cache.
+    return list(_filename_to_pretty_tags(filename))
+
+
+@functools.lru_cache(maxsize=_CACHE_SIZE)
+def _filename_to_pretty_tags(filename: str) -> tuple[str, ...]:
     if filename.endswith(".egg"):
-        return ["Egg"]
+        return ("Egg",)
     elif not filename.endswith(".whl"):
-        return ["Source"]
+        return ("Source",)
 
     tags = filename_to_tags(filename)
 
@@ -124,11 +138,11 @@ def filename_to_pretty_tags(filename: str) -> list[str]:
             # the interpreter tag, just add it directly.
             pretty_tags.add(tag.interpreter)
 
-    return sorted(pretty_tags)
+    return tuple(sorted(pretty_tags))
 
 
 def filenames_to_filters(filenames: list[str]) -> dict[str, list[str]]:
-    tags = set()
+    tags: set[packaging.tags.Tag] = set()
     for filename in filenames:
         tags.update(filename_to_tags(filename))
     return tags_to_filters(tags)
@@ -139,7 +153,9 @@ def filename_to_filters(filename: str) -> dict[str, list[str]]:
     return tags_to_filters(tags)
 
 
-def tags_to_filters(tags: set[packaging.tags.Tag]) -> dict[str, list[str]]:
+def tags_to_filters(
+    tags: set[packaging.tags.Tag] | frozenset[packaging.tags.Tag],
+) -> dict[str, list[str]]:
     interpreters = set()
     abis = set()
     platforms = set()
@@ -53,6 +53,7 @@ from warehouse.packaging.models import (
     File,
     Project,
     ProjectFactory,
+    ProjectSizeTotal,
     Release,
     ReleaseClassifiers,
 )
@@ -61,7 +62,7 @@ from warehouse.search.queries import SEARCH_FILTER_ORDER, get_opensearch_query
 from warehouse.utils.cors import _CORS_HEADERS
 from warehouse.utils.http import is_safe_url
 from warehouse.utils.paginate import OpenSearchPage, paginate_url_factory
-from warehouse.utils.row_counter import RowCount
+from warehouse.utils.row_counter import get_row_counts
 
 if typing.TYPE_CHECKING:
     from pyramid.request import Request
@@ -291,20 +292,7 @@ def opensearchxml(request):
     has_translations=True,
 )
 def index(request):
-    counts = dict(
-        request.db.query(RowCount.table_name, RowCount.count)
-        .filter(
-            RowCount.table_name.in_(
-                [
-                    Project.__tablename__,
-                    Release.__tablename__,
-                    File.__tablename__,
-                    User.__tablename__,
-                ]
-            )
-        )
-        .all()
-    )
+    counts = get_row_counts(request.db, [Project, Release, File, User])
 
     return {
         "num_projects": counts.get(Project.__tablename__, 0),
@@ -355,6 +343,7 @@ def list_classifiers(request):
 
 @view_config(
     route_name="search",
+    read_only=True,
     renderer="warehouse:templates/search/results.html",
     decorator=[
         origin_cache(
@@ -482,6 +471,7 @@ def search(request):
 
 @view_config(
     route_name="stats",
+    read_only=True,
     renderer="warehouse:templates/pages/stats.html",
     decorator=[
         add_vary("Accept"),
@@ -496,6 +486,7 @@ def search(request):
 )
 @view_config(
     route_name="stats.json",
+    read_only=True,
     renderer="json",
     decorator=[
         add_vary("Accept"),
@@ -509,7 +500,15 @@ def search(request):
     accept="application/json",
 )
 def stats(request):
-    total_size = int(request.db.query(func.sum(Project.total_size)).first()[0])
+    # Our total size is maintained incrementally as files are added and
+    # removed, so we only need to sum up a handful of shards here.
+    total_size = int(
+        request.db.query(
+            func.coalesce(func.sum(ProjectSizeTotal.total_size), 0)
+        ).scalar()
+    )
+    # This ordering matches projects_total_size_idx, so this only needs to read
+    # the first 100 entries off of that index.
     top_100_packages = (
         request.db.query(Project)
         .with_entities(Project.name, Project.total_size)
@@ -1,5 +1,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
-from warehouse.config import configure
+from warehouse.config import Environment, configure
+from warehouse.utils.templates import compile_templates
 
-application = configure().make_wsgi_app()
+config = configure()
+
+# Load every template up front, so that the workers that are forked from this
+# process start with them already loaded, rather than each having to load (or
+# compile) them again on first use.
+if config.registry.settings["warehouse.env"] == Environment.production:
+    compile_templates(config.registry)
+
+application = config.make_wsgi_app()